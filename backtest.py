@@ -0,0 +1,215 @@
+"""
+Author: Jason Gill
+
+Description:
+This file backtests fight_result_predictor.py the way it would actually be used: fights are replayed in date order and
+every event's card is predicted using only the fights before it, then those fights are added to the training history.
+The random train_test_split of the predictor leaks future fights into training and gives one noisy number, while this
+reports accuracy, the Brier score and calibration over time.
+Refitting the scaler + KNN pipeline at every event re-scales the whole history each time, so instead the MinMaxScaler is
+updated w/ partial_fit and the history is kept in a neighbour index that grows w/ every card: the scaled rows and their
+squared norms are appended to preallocated buffers, and when a card widens a column's range only that column is
+re-scaled (min-max scaling only divides every column by its range). Each card is still compared against every earlier
+fight, so the neighbour search itself stays linear in the history per event
+"""
+
+import argparse
+import time
+
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+
+import helper
+import fight_result_predictor
+
+MIN_TRAINING_FIGHTS = 500 # events before this many fights have been seen are only used for training
+
+# RETURN (FEATURES, WINNERS, DATES) W/ THE FIGHTS IN DATE ORDER
+def chronological_fights(df):
+    dates = pd.to_datetime(df['date']).to_numpy()
+    order = np.argsort(dates, kind='stable')
+    X = df.select_dtypes(include=['number']).to_numpy(dtype=float)[order]
+    return X, df['Winner'].to_numpy()[order], dates[order]
+
+# ------------------------------------------------------------------------------------------
+
+# GROWING NEIGHBOUR INDEX
+# an index is a dict w/ the raw rows, the rows times 'scale', their squared norms and winner codes in buffers of
+# 'capacity' rows, of which the first 'size' are filled
+def new_neighbour_index(n_columns, capacity=1024):
+    return {
+        'X': np.empty((capacity, n_columns)),
+        'scaled': np.empty((capacity, n_columns)),
+        'norms': np.empty(capacity),
+        'codes': np.empty(capacity, dtype=np.int64),
+        'scale': np.ones(n_columns),
+        'size': 0,
+    }
+
+def grow_neighbour_index(index, capacity):
+    for name in ['X', 'scaled', 'norms', 'codes']:
+        buffer = np.empty((capacity,) + index[name].shape[1:], dtype=index[name].dtype)
+        buffer[:index['size']] = index[name][:index['size']]
+        index[name] = buffer
+
+# RESCALE ONLY THE COLUMNS WHOSE SCALE CHANGED, THEN APPEND THE CARD
+def add_to_neighbour_index(index, card_X, card_codes, scale):
+    size = index['size']
+    changed = np.flatnonzero(scale != index['scale'])
+    if len(changed) and size:
+        old_columns = index['scaled'][:size, changed]
+        new_columns = index['X'][:size, changed] * scale[changed]
+        index['norms'][:size] += (new_columns ** 2).sum(axis=1) - (old_columns ** 2).sum(axis=1)
+        index['scaled'][:size, changed] = new_columns
+    index['scale'] = scale.copy()
+
+    if size + len(card_X) > len(index['X']):
+        grow_neighbour_index(index, max(2 * len(index['X']), size + len(card_X)))
+    end = size + len(card_X)
+    index['X'][size:end] = card_X
+    index['scaled'][size:end] = card_X * scale
+    index['norms'][size:end] = (index['scaled'][size:end] ** 2).sum(axis=1)
+    index['codes'][size:end] = card_codes
+    index['size'] = end
+
+# RETURN (n_card, n_classes) WIN PROBABILITIES OF A CARD FROM THE k NEAREST FIGHTS OF THE INDEX (uniform KNN vote)
+def knn_card_probabilities(index, card_X, n_classes, n_neighbors):
+    size = index['size']
+    scaled_card = card_X * index['scale']
+    squared_distances = index['norms'][:size] - 2 * scaled_card @ index['scaled'][:size].T # + |card|^2, which doesn't change the order
+
+    k = min(n_neighbors, size)
+    neighbours = np.argpartition(squared_distances, k - 1, axis=1)[:, :k]
+    votes = np.zeros((len(card_X), n_classes))
+    np.add.at(votes, (np.arange(len(card_X))[:, None], index['codes'][neighbours]), 1)
+    return votes / k
+
+# ------------------------------------------------------------------------------------------
+
+# RETURN DATAFRAME W/ THE PREDICTION FOR EVERY FIGHT, MADE ONLY FROM THE FIGHTS OF EARLIER EVENTS
+# incremental=False refits the whole pipeline at every event instead (much slower, kept to check the incremental path)
+def walk_forward_backtest(df, n_neighbors=fight_result_predictor.N_NEIGHBORS, min_training_fights=MIN_TRAINING_FIGHTS, incremental=True):
+    X, y, dates = chronological_fights(df)
+    classes, y_codes = np.unique(y, return_inverse=True)
+    event_dates, event_starts = np.unique(dates, return_index=True)
+    event_ends = np.append(event_starts[1:], len(X))
+
+    scaler = MinMaxScaler()
+    history = new_neighbour_index(X.shape[1])
+    probabilities = np.full((len(X), len(classes)), np.nan)
+    first_scored = None
+
+    for start, end in zip(event_starts, event_ends):
+        if start >= min_training_fights:
+            first_scored = start if first_scored is None else first_scored
+
+            if incremental:
+                probabilities[start:end] = knn_card_probabilities(history, X[start:end], len(classes), n_neighbors)
+            else:
+                model = make_pipeline(MinMaxScaler(), KNeighborsClassifier(n_neighbors=n_neighbors))
+                model.fit(X[:start], y[:start])
+                card_probabilities = model.predict_proba(X[start:end])
+                probabilities[start:end] = 0
+                probabilities[start:end, np.searchsorted(classes, model.classes_)] = card_probabilities
+
+        scaler.partial_fit(X[start:end]) # the card's results are now known
+        if incremental:
+            # scaled distances only depend on each column's range, which partial_fit keeps up to date
+            add_to_neighbour_index(history, X[start:end], y_codes[start:end], scaler.scale_)
+
+    scored = slice(first_scored, None)
+    results = pd.DataFrame(probabilities[scored], columns=['P_' + winner for winner in classes])
+    results.insert(0, 'date', dates[scored])
+    results.insert(1, 'Winner', y[scored])
+    results.insert(2, 'predicted_winner', classes[probabilities[scored].argmax(axis=1)])
+    return results
+
+# ------------------------------------------------------------------------------------------
+
+def probability_columns(results):
+    return [column for column in results.columns if column.startswith('P_')]
+
+# RETURN PER-FIGHT BRIER SCORE (squared error of the predicted probabilities against the one-hot result, summed over classes)
+def brier_scores(results):
+    columns = probability_columns(results)
+    outcomes = (results['Winner'].to_numpy()[:, None] == np.array([column[2:] for column in columns])).astype(float)
+    return ((results[columns].to_numpy() - outcomes) ** 2).sum(axis=1)
+
+# RETURN DATAFRAME W/ THE NUMBER OF FIGHTS, ACCURACY AND BRIER SCORE OF EACH YEAR
+def accuracy_over_time(results):
+    per_fight = pd.DataFrame({
+        'year': pd.DatetimeIndex(results['date']).year,
+        'correct': (results['predicted_winner'] == results['Winner']).to_numpy(),
+        'brier': brier_scores(results),
+    })
+    return per_fight.groupby('year').agg(fights=('correct', 'size'), accuracy=('correct', 'mean'), brier=('brier', 'mean'))
+
+# RETURN DATAFRAME W/ HOW OFTEN THE PREDICTED WINNER WON FOR EACH BAND OF PREDICTED PROBABILITY (a calibrated model has accuracy ~ confidence)
+def reliability_table(results, n_bins=10):
+    confidence = results[probability_columns(results)].max(axis=1).to_numpy()
+    correct = (results['predicted_winner'] == results['Winner']).to_numpy()
+    bins = np.minimum((confidence * n_bins).astype(int), n_bins - 1)
+
+    table = pd.DataFrame({'bin': bins, 'confidence': confidence, 'correct': correct}).groupby('bin').agg(
+        fights=('correct', 'size'), mean_confidence=('confidence', 'mean'), accuracy=('correct', 'mean'))
+    table.index = [f'{b / n_bins:.1f}-{(b + 1) / n_bins:.1f}' for b in table.index]
+    return table
+
+# RETURN EXPECTED CALIBRATION ERROR (fight-weighted mean gap between confidence and accuracy over the bins)
+def expected_calibration_error(reliability):
+    return np.average(np.abs(reliability['mean_confidence'] - reliability['accuracy']), weights=reliability['fights'])
+
+def plot_backtest(yearly, reliability):
+    helper.create_folder('plots/backtest_plots')
+
+    fig, (accuracy_axis, reliability_axis) = plt.subplots(1, 2, figsize=(14, 5))
+    accuracy_axis.plot(yearly.index, yearly['accuracy'], marker='o', label='Accuracy')
+    accuracy_axis.plot(yearly.index, yearly['brier'], marker='o', label='Brier score')
+    accuracy_axis.set_xlabel('Year')
+    accuracy_axis.set_title('Walk-forward accuracy and Brier score')
+    accuracy_axis.legend()
+
+    reliability_axis.plot([0, 1], [0, 1], linestyle='--', color='grey', label='Perfect calibration')
+    reliability_axis.plot(reliability['mean_confidence'], reliability['accuracy'], marker='o', label='KNN')
+    reliability_axis.set_xlabel('Predicted probability of the predicted winner')
+    reliability_axis.set_ylabel('Fraction of those fights won')
+    reliability_axis.set_title('Reliability diagram')
+    reliability_axis.legend()
+
+    fig.savefig('plots/backtest_plots/walk_forward_backtest.png', bbox_inches='tight')
+    plt.close(fig)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Walk-forward backtest of the fight result predictor')
+    parser.add_argument('--check-refit', action='store_true', help='also refit the pipeline at every event and compare the predictions')
+    args = parser.parse_args(argv)
+
+    df = helper.load_dataset('data_sets/preprocessed_data.csv')
+
+    start = time.perf_counter()
+    results = walk_forward_backtest(df)
+    print(f"Backtested {len(results)} fights over {results['date'].nunique()} events in {time.perf_counter() - start:.2f}s")
+
+    if args.check_refit:
+        start = time.perf_counter()
+        refit_results = walk_forward_backtest(df, incremental=False)
+        agreement = np.mean(refit_results['predicted_winner'] == results['predicted_winner'])
+        print(f"Refitting at every event took {time.perf_counter() - start:.2f}s, same prediction for {agreement:.2%} of fights")
+
+    yearly = accuracy_over_time(results)
+    reliability = reliability_table(results)
+
+    print('Overall accuracy:', np.mean(results['predicted_winner'] == results['Winner']))
+    print('Overall Brier score:', brier_scores(results).mean())
+    print('Expected calibration error:', expected_calibration_error(reliability))
+    print(yearly)
+    print(reliability)
+
+    plot_backtest(yearly, reliability)
+
+if __name__=='__main__':
+    main()
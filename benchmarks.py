@@ -0,0 +1,443 @@
+"""
+Author: Jason Gill
+
+Description:
+This file contains benchmarks for the vectorized helper functions. Each benchmark runs on synthetic fight histories
+of increasing size, checks the vectorized output against the original row-by-row implementation and prints how
+the runtime scales with the number of rows. The neighbour search backends of fight_result_predictor.py are compared
+the same way, against the exact search
+"""
+
+import json
+import os
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from scipy.stats import gaussian_kde, kruskal, levene
+
+import pandas as pd
+import numpy as np
+
+import density
+import effective_strikes_analysis
+import event_index
+import fighter_index
+import helper
+import opponent_graph
+import fight_result_predictor
+import prediction_service
+import stratified_analysis
+
+def make_synthetic_fights(n_rows, n_fighters=None, seed=0):
+    rng = np.random.default_rng(seed)
+    if n_fighters is None:
+        n_fighters = max(10, n_rows // 3) # roughly matches the fights per fighter of the real dataset
+
+    fighter_names = np.array(['Fighter ' + str(i) for i in range(n_fighters)], dtype=object)
+    stances = np.array(['Orthodox', 'Southpaw', 'Switch', 'Open Stance', 'Sideways'], dtype=object)
+
+    fights_df = pd.DataFrame({
+        'R_fighter': fighter_names[rng.integers(0, n_fighters, n_rows)],
+        'B_fighter': fighter_names[rng.integers(0, n_fighters, n_rows)],
+        'Winner': rng.choice(['Red', 'Blue', 'Draw'], size=n_rows, p=[0.6, 0.38, 0.02]),
+        'R_Stance': stances[rng.integers(0, len(stances), n_rows)],
+        'B_Stance': stances[rng.integers(0, len(stances), n_rows)],
+    })
+    return fights_df
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+# ------------------------------------------------------------------------------------------
+
+# ORIGINAL ROW-BY-ROW IMPLEMENTATION (kept as the reference output for the benchmark)
+def legacy_fighter_win_loss_stats(fights_df):
+    preprocessed_data_without_draws = helper.further_preprocessing_for_removing_draws(fights_df)
+
+    win_count_map = {}
+    lose_count_map = {}
+
+    for index, row in preprocessed_data_without_draws.iterrows():
+        winner = row['Winner'][0]
+        loser = 'B' # default value checked in following conditional
+
+        if (winner == 'B'):
+            loser = 'R'
+
+        winner_name = row[winner + "_fighter"]
+        loser_name = row[loser + "_fighter"]
+
+        win_count_map[winner_name] = win_count_map.get(winner_name, 0) + 1
+        lose_count_map[loser_name] = lose_count_map.get(loser_name, 0) + 1
+
+    win_count_df = pd.DataFrame(list(win_count_map.items()), columns=['Name', 'Win_count'])
+    lose_count_df = pd.DataFrame(list(lose_count_map.items()), columns=['Name', 'Lose_count'])
+
+    fighter_data = win_count_df.merge(lose_count_df, on='Name', how='outer')
+    fighter_data['Lose_count'] = fighter_data['Lose_count'].fillna(0)
+    fighter_data['Win_count'] = fighter_data['Win_count'].fillna(0)
+    fighter_data['Win_ratio'] = fighter_data['Win_count'] / (fighter_data['Win_count'] + fighter_data['Lose_count'])
+
+    return fighter_data
+
+def benchmark_fighter_win_loss_stats(row_counts=(1_000, 10_000, 100_000, 1_000_000), legacy_max_rows=100_000):
+    print("fighter_win_loss_stats")
+    print(f"{'rows':>10} {'vectorized (s)':>15} {'iterrows (s)':>13} {'speedup':>8}")
+
+    for n_rows in row_counts:
+        fights_df = make_synthetic_fights(n_rows)
+        vectorized_result, vectorized_time = time_call(helper.fighter_win_loss_stats_from_df, fights_df.copy())
+
+        if n_rows > legacy_max_rows: # the row-by-row version takes minutes at this size
+            print(f"{n_rows:>10} {vectorized_time:>15.4f} {'-':>13} {'-':>8}")
+            continue
+
+        legacy_result, legacy_time = time_call(legacy_fighter_win_loss_stats, fights_df.copy())
+        pd.testing.assert_frame_equal(vectorized_result, legacy_result)
+        print(f"{n_rows:>10} {vectorized_time:>15.4f} {legacy_time:>13.4f} {legacy_time / vectorized_time:>7.1f}x")
+
+# ORIGINAL ROW-BY-ROW IMPLEMENTATION (kept as the reference output for the benchmark)
+def legacy_fighter_win_loss_stats_with_stance(df):
+    preprocessed_data_for_stance_analysis = helper.further_preprocessing_for_stance_analysis(df)
+
+    winners_info = []
+    losers_info = []
+    win_count_map = {}
+    lose_count_map = {}
+
+    for index, row in preprocessed_data_for_stance_analysis.iterrows():
+        winner = row['Winner'][0]
+        loser = 'B' # default value checked in following conditional
+
+        if (winner == 'B'):
+            loser = 'R'
+
+        winner_name = row[winner + "_fighter"]
+        winner_stance = row[winner + "_Stance"]
+
+        loser_name = row[loser + "_fighter"]
+        loser_stance = row[loser + "_Stance"]
+
+        win_count_map[winner_name] = win_count_map.get(winner_name, 0) + 1
+        lose_count_map[loser_name] = lose_count_map.get(loser_name, 0) + 1
+
+        winners_info.append({"Name": winner_name, "Stance": winner_stance})
+        losers_info.append({"Name": loser_name, "Stance": loser_stance})
+
+    winners_df = pd.DataFrame(winners_info)
+    losers_df = pd.DataFrame(losers_info)
+    winners_df.drop_duplicates(inplace=True)
+    losers_df.drop_duplicates(inplace=True)
+
+    win_count_df = pd.DataFrame(list(win_count_map.items()), columns=['Name', 'Win_count'])
+    lose_count_df = pd.DataFrame(list(lose_count_map.items()), columns=['Name', 'Lose_count'])
+
+    winners_and_count = winners_df.merge(win_count_df, on='Name')
+    losers_and_count = losers_df.merge(lose_count_df, on='Name')
+
+    fighter_data = pd.merge(winners_and_count, losers_and_count, on=['Name', 'Stance'], how='outer')
+    fighter_data['Lose_count'] = fighter_data['Lose_count'].fillna(0)
+    fighter_data['Win_count'] = fighter_data['Win_count'].fillna(0)
+    fighter_data['Win_ratio'] = fighter_data['Win_count'] / (fighter_data['Win_count'] + fighter_data['Lose_count'])
+
+    return fighter_data
+
+def benchmark_fighter_win_loss_stats_with_stance(row_counts=(1_000, 10_000, 100_000, 1_000_000), legacy_max_rows=100_000):
+    print("fighter_win_loss_stats_with_stance")
+    print(f"{'rows':>10} {'vectorized (s)':>15} {'iterrows (s)':>13} {'speedup':>8}")
+
+    for n_rows in row_counts:
+        fights_df = make_synthetic_fights(n_rows)
+        vectorized_result, vectorized_time = time_call(helper.fighter_win_loss_stats_with_stance_from_df, fights_df.copy())
+
+        if n_rows > legacy_max_rows: # the row-by-row version takes minutes at this size
+            print(f"{n_rows:>10} {vectorized_time:>15.4f} {'-':>13} {'-':>8}")
+            continue
+
+        legacy_result, legacy_time = time_call(legacy_fighter_win_loss_stats_with_stance, fights_df.copy())
+        pd.testing.assert_frame_equal(vectorized_result, legacy_result)
+        print(f"{n_rows:>10} {vectorized_time:>15.4f} {legacy_time:>13.4f} {legacy_time / vectorized_time:>7.1f}x")
+
+# ------------------------------------------------------------------------------------------
+
+# RETURN (X, y) W/ 130 CORRELATED STAT COLUMNS LIKE preprocessed_data.csv (a few underlying skills drive every stat)
+def make_synthetic_fight_stats(n_rows, n_columns=130, n_skills=12, seed=0):
+    rng = np.random.default_rng(seed)
+    skills = rng.normal(size=(n_rows, n_skills))
+    X = skills @ rng.normal(size=(n_skills, n_columns)) + 0.3 * rng.normal(size=(n_rows, n_columns))
+    y = np.where(skills[:, 0] + rng.normal(size=n_rows) > 0, 'Red', 'Blue')
+    return X, y
+
+# the recall of the approximate backends depends on the number of fights, so it is summarized per dataset size
+def benchmark_neighbour_backends(row_counts=(6_000, 20_000, 60_000)):
+    print("fight_result_predictor neighbour backends")
+    comparisons = []
+    for n_rows in row_counts:
+        X, y = make_synthetic_fight_stats(n_rows)
+        split = int(0.75 * n_rows)
+        comparison = fight_result_predictor.compare_neighbour_backends(X[:split], X[split:], y[:split], y[split:], repeats=1)
+        print(f"{n_rows} rows")
+        print(comparison.to_string(index=False))
+        comparisons.append(comparison.assign(rows=n_rows))
+
+    recall_column = f'recall@{fight_result_predictor.N_NEIGHBORS}'
+    summary = pd.concat(comparisons).pivot(index='rows', columns='backend', values=[recall_column, 'queries_per_second'])
+    print(summary.to_string(float_format='{:.3f}'.format))
+
+# ------------------------------------------------------------------------------------------
+
+# STRATIFIED TESTS: ONE PASS OVER ALL STRATA VS FILTERING THE DATA AND CALLING scipy FOR EACH STRATUM
+def loop_stratified_tests(data, value, between, by):
+    rows = []
+    for stratum in data[by].drop_duplicates().sort_values(by).itertuples(index=False):
+        in_stratum = np.ones(len(data), dtype=bool)
+        for column, key in zip(by, stratum):
+            in_stratum &= (data[column] == key).to_numpy()
+        stratum_data = data[in_stratum]
+        groups = [stratum_data.loc[stratum_data[between] == group, value].to_numpy() for group in sorted(stratum_data[between].unique())]
+        levene_result = levene(*groups)
+        kruskal_result = kruskal(*groups)
+        rows.append(list(stratum) + [levene_result.statistic, levene_result.pvalue, kruskal_result.statistic, kruskal_result.pvalue])
+    return pd.DataFrame(rows, columns=by + ['levene_W', 'levene_pvalue', 'kruskal_H', 'kruskal_pvalue'])
+
+def benchmark_stratified_tests(row_counts=(10_000, 100_000, 1_000_000), n_strata=(30, 300)):
+    print("stratified_analysis.stratified_tests")
+    rng = np.random.default_rng(0)
+    for n_rows in row_counts:
+        for strata in n_strata:
+            data = pd.DataFrame({
+                'year': rng.integers(0, strata, n_rows),
+                'weight_class': rng.integers(0, 8, n_rows),
+                'value': rng.gamma(2, size=n_rows).round(2), # rounded so there are ties to correct for
+            })
+            result, seconds = time_call(stratified_analysis.stratified_tests, data, 'value', 'weight_class', ['year'])
+            expected, loop_seconds = time_call(loop_stratified_tests, data, 'value', 'weight_class', ['year'])
+            assert np.allclose(result[expected.columns[1:]].to_numpy(), expected[expected.columns[1:]].to_numpy())
+            print(f"{n_rows} rows, {strata} strata: {seconds:.3f}s vs {loop_seconds:.3f}s filtering each stratum ({loop_seconds / seconds:.0f}x)")
+
+# ------------------------------------------------------------------------------------------
+
+# FIGHTER INDEX: JOIN ON INTEGER IDS VS THE NAME STRINGS, W/ SOME NAMES SPELLED DIFFERENTLY IN THE TWO DATASETS
+def respell(name, rng):
+    return rng.choice([name.upper(), name.replace(' ', '  '), name + ' ', name.replace('e', 'é')])
+
+def benchmark_fighter_index(fighter_counts=(1_000, 10_000, 100_000), respelled_fraction=0.1):
+    print("fighter_index.add_fighter_ids")
+    rng = np.random.default_rng(0)
+    for n_fighters in fighter_counts:
+        names = np.array([f'Fighter {i} Silveira' for i in range(n_fighters)], dtype=object)
+        fighters_df = pd.DataFrame({'fighter_name': names, 'Height': rng.normal(70, 3, n_fighters)})
+        respelled = rng.random(n_fighters) < respelled_fraction
+        win_ratios = pd.DataFrame({'Name': [respell(name, rng) if r else name for name, r in zip(names, respelled)], 'Win_ratio': rng.random(n_fighters)})
+
+        with tempfile.TemporaryDirectory() as folder:
+            index_csv = os.path.join(folder, 'fighter_index.csv')
+            start = time.perf_counter()
+            id_fighters = fighter_index.add_fighter_ids(fighters_df, {'fighter_name': 'fighter_id'}, index_csv, add_new=True)
+            id_win_ratios = fighter_index.add_fighter_ids(win_ratios, {'Name': 'fighter_id'}, index_csv, add_new=True)
+            index_seconds = time.perf_counter() - start
+
+        id_merged, id_seconds = time_call(id_fighters.merge, id_win_ratios, 'inner', 'fighter_id')
+        name_merged, name_seconds = time_call(fighters_df.merge, win_ratios.rename(columns={'Name': 'fighter_name'}), 'inner', 'fighter_name')
+        assert len(id_merged) == n_fighters and len(name_merged) == n_fighters - respelled.sum()
+        print(f"{n_fighters} fighters: merge on IDs {id_seconds:.4f}s vs names {name_seconds:.4f}s, "
+              f"indexing both {index_seconds:.3f}s, {len(id_merged) - len(name_merged)} fighters only matched by ID")
+
+# ------------------------------------------------------------------------------------------
+
+# EVENT INDEX: DATE RANGE AND LAST-N-FIGHTS QUERIES VS PARSING AND SCANNING EVERY FIGHT'S DATE
+def benchmark_event_index(row_counts=(10_000, 100_000, 1_000_000), n_queries=100):
+    print("event_index.fights_between / fighter_fights")
+    rng = np.random.default_rng(0)
+    for n_rows in row_counts:
+        fights_df = make_synthetic_fights(n_rows)
+        event_days = pd.Timestamp('1993-11-12') + pd.to_timedelta(np.sort(rng.choice(10_000, size=min(10_000, max(10, n_rows // 12)), replace=False)), unit='D')
+        fights_df['date'] = event_days[rng.integers(0, len(event_days), n_rows)].strftime('%B %d, %Y') # raw_total_fight_data's format
+
+        with tempfile.TemporaryDirectory() as folder:
+            index_csv = os.path.join(folder, 'fighter_index.csv')
+            fighter_index.fighter_ids(np.concatenate([fights_df['R_fighter'].to_numpy(), fights_df['B_fighter'].to_numpy()]), index_csv, add_new=True)
+            events, build_seconds = time_call(event_index.build_event_index, fights_df, 'date', ('R_fighter', 'B_fighter'), index_csv)
+            starts = event_days[rng.integers(0, len(event_days), n_queries)]
+            ends = starts + pd.Timedelta(days=365)
+            fighters = fights_df['R_fighter'].to_numpy()[rng.integers(0, n_rows, n_queries)]
+
+            start = time.perf_counter()
+            ranges = [event_index.fights_between(events, query_start, query_end) for query_start, query_end in zip(starts, ends)]
+            range_seconds = (time.perf_counter() - start) / n_queries
+            start = time.perf_counter()
+            last_fights = [event_index.fighter_fights(events, fighter, last=5) for fighter in fighters]
+            fighter_seconds = (time.perf_counter() - start) / n_queries
+
+        # what the analyses did w/o the index: parse every date and compare it to the range for every query
+        start = time.perf_counter()
+        scan_dates = pd.to_datetime(fights_df['date'], format='%B %d, %Y')
+        scanned = np.flatnonzero(((scan_dates >= starts[0]) & (scan_dates < ends[0])).to_numpy())
+        scan_seconds = time.perf_counter() - start
+        assert np.array_equal(np.sort(ranges[0]), scanned)
+        fighter_rows = np.flatnonzero(((fights_df['R_fighter'] == fighters[0]) | (fights_df['B_fighter'] == fighters[0])).to_numpy())
+        assert np.array_equal(np.sort(last_fights[0]), np.sort(fighter_rows[np.argsort(scan_dates.to_numpy()[fighter_rows], kind='stable')][-5:]))
+
+        print(f"{n_rows} rows: built in {build_seconds:.3f}s, date range {range_seconds * 1e6:.0f}us, last 5 fights of a fighter "
+              f"{fighter_seconds * 1e6:.0f}us vs {scan_seconds:.3f}s parsing and scanning the dates ({scan_seconds / range_seconds:.0f}x)")
+
+# ------------------------------------------------------------------------------------------
+
+# OPPONENT GRAPH: ELO REPLAYED ONE CARD AT A TIME W/ SPARSE PRODUCTS VS ONE FIGHT AT A TIME IN PYTHON
+def loop_elo(fights, k=opponent_graph.ELO_K):
+    ratings = {}
+    for red, blue, red_score in zip(fights['red'].tolist(), fights['blue'].tolist(), fights['red_score'].tolist()):
+        red_rating, blue_rating = ratings.get(red, opponent_graph.INITIAL_RATING), ratings.get(blue, opponent_graph.INITIAL_RATING)
+        change = k * (red_score - 1 / (1 + 10 ** ((blue_rating - red_rating) / 400)))
+        ratings[red], ratings[blue] = red_rating + change, blue_rating - change
+    return ratings
+
+def benchmark_opponent_graph(row_counts=(6_000, 60_000, 600_000), fights_per_card=12):
+    print("opponent_graph.build_opponent_graph / add_card")
+    for n_rows in row_counts:
+        fights_df = make_synthetic_fights(n_rows)
+        fights_df['date'] = (pd.Timestamp('1993-11-12') + pd.to_timedelta(np.arange(n_rows)[::-1] // fights_per_card, unit='D')).strftime('%Y-%m-%d')
+        last_card = fights_df['date'] == fights_df['date'].iloc[0]
+
+        with tempfile.TemporaryDirectory() as folder:
+            index_csv = os.path.join(folder, 'fighter_index.csv')
+            fighter_index.fighter_ids(np.concatenate([fights_df['R_fighter'].to_numpy(), fights_df['B_fighter'].to_numpy()]), index_csv, add_new=True)
+            graph, seconds = time_call(opponent_graph.build_opponent_graph, fights_df[~last_card], opponent_graph.ELO_K, index_csv)
+            _, card_seconds = time_call(opponent_graph.add_card, graph, fights_df[last_card])
+
+            fights = opponent_graph.chronological_fights(fights_df, index_csv)
+            ratings = np.full(len(graph['elo']), opponent_graph.INITIAL_RATING)
+            _, elo_seconds = time_call(opponent_graph.replay_elo, ratings, fights)
+            expected, loop_seconds = time_call(loop_elo, fights)
+            assert np.allclose([ratings[fighter] for fighter in expected], list(expected.values()))
+            assert np.allclose(ratings, graph['elo'])
+        print(f"{n_rows} fights: whole graph {seconds:.3f}s, Elo replay {elo_seconds:.3f}s vs {loop_seconds:.3f}s fight by fight, "
+              f"adding a card {card_seconds * 1000:.1f}ms")
+
+# ------------------------------------------------------------------------------------------
+
+# ORIGINAL ROW-BY-ROW DOMINANT STRIKE (kept as the reference output for the benchmark)
+def legacy_determine_dominant_strike(row):
+    if ((row['Head_strikes'] > row['Leg_strikes']) & (row['Head_strikes'] > row['Body_strikes'])):
+        return 'Head'
+    elif ((row['Body_strikes'] > row['Head_strikes']) & (row['Body_strikes'] > row['Leg_strikes'])):
+        return 'Body'
+    elif ((row['Leg_strikes'] > row['Head_strikes']) & (row['Leg_strikes'] > row['Body_strikes'])):
+        return 'Leg'
+
+def benchmark_dominant_strike(row_counts=(1_000, 10_000, 100_000, 1_000_000, 10_000_000), legacy_max_rows=100_000):
+    print("effective_strikes_analysis.determine_dominant_strike")
+    print(f"{'rows':>10} {'vectorized (s)':>15} {'apply (s)':>10} {'speedup':>8}")
+    rng = np.random.default_rng(0)
+
+    for n_rows in row_counts:
+        strike_stats = pd.DataFrame(rng.poisson([30, 8, 8], size=(n_rows, 3)).astype(float), columns=['Head_strikes', 'Body_strikes', 'Leg_strikes'])
+        strike_stats.iloc[::97, 1] = np.nan # a missing count never has a dominant strike
+        vectorized_result, vectorized_time = time_call(effective_strikes_analysis.determine_dominant_strike, strike_stats)
+
+        if n_rows > legacy_max_rows: # a Python call per row takes minutes at this size
+            print(f"{n_rows:>10} {vectorized_time:>15.4f} {'-':>10} {'-':>8}")
+            continue
+
+        legacy_result, legacy_time = time_call(strike_stats.apply, legacy_determine_dominant_strike, 1)
+        legacy_result = legacy_result.to_numpy(dtype=object)
+        assert (pd.isna(vectorized_result) == pd.isna(legacy_result)).all()
+        assert (vectorized_result[pd.notna(legacy_result)] == legacy_result[pd.notna(legacy_result)]).all()
+        print(f"{n_rows:>10} {vectorized_time:>15.4f} {legacy_time:>10.4f} {legacy_time / vectorized_time:>7.1f}x")
+
+# ------------------------------------------------------------------------------------------
+
+# KDE CURVES: BINNED FFT FOR ALL SERIES AT ONCE VS A gaussian_kde PER SERIES (what seaborn fits for every plot)
+def benchmark_kde_curves(sample_sizes=(1_000, 10_000, 100_000, 1_000_000), n_series=5, exact_max_size=100_000):
+    print("density.kde_curves")
+    rng = np.random.default_rng(0)
+    for n_values in sample_sizes:
+        series_list = [np.sqrt(rng.gamma(1 + i, size=n_values)) for i in range(n_series)]
+        density.DENSITY_CACHE.clear()
+        curves, seconds = time_call(density.kde_curves, series_list)
+        _, cached_seconds = time_call(density.kde_curves, series_list)
+
+        if n_values > exact_max_size:
+            print(f"{n_series} x {n_values} values: {seconds:.3f}s ({cached_seconds:.4f}s cached)")
+            continue
+        start = time.perf_counter()
+        error = 0
+        for values, (support, curve_density) in zip(series_list, curves):
+            exact = gaussian_kde(values)(support)
+            error = max(error, np.abs(curve_density - exact).max() / exact.max())
+        exact_seconds = time.perf_counter() - start
+        print(f"{n_series} x {n_values} values: {seconds:.3f}s ({cached_seconds:.4f}s cached) vs {exact_seconds:.3f}s w/ gaussian_kde, max error {error:.1e} of the peak")
+
+# ------------------------------------------------------------------------------------------
+
+# FIRE CONCURRENT /predict REQUESTS AT A LOCAL prediction_service AND PRINT ITS LATENCY METRICS
+def benchmark_prediction_service(n_requests=2_000, n_clients=16, preprocessed_data_csv='data_sets/preprocessed_data.csv'):
+    if not os.path.exists(preprocessed_data_csv):
+        print(f"Skipping prediction service benchmark: {preprocessed_data_csv} not found")
+        return
+
+    service = prediction_service.load_service(preprocessed_data_csv)
+    server = prediction_service.start_server(service)
+    base_url = 'http://%s:%d' % server.server_address[:2]
+
+    fighters = np.array(sorted(service['profiles']['fighter_rows']), dtype=object)
+    pairs = fighters[np.random.default_rng(0).integers(0, len(fighters), size=(n_requests, 2))]
+
+    def request_prediction(pair):
+        query = urllib.parse.urlencode({'red': pair[0], 'blue': pair[1]})
+        with urllib.request.urlopen(f'{base_url}/predict?{query}') as response:
+            return json.load(response)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_clients) as executor:
+        results = list(executor.map(request_prediction, pairs))
+    seconds = time.perf_counter() - start
+
+    # the batched answers must match scoring each fight on its own
+    rows = [service['profiles']['fighter_rows'][name] for name in pairs.ravel()]
+    X = prediction_service.feature_rows(service, rows[0::2], rows[1::2], [prediction_service.DEFAULT_ROUNDS] * n_requests)
+    expected = service['pipeline'].predict_proba(X)
+    served = np.array([[result['probabilities'][str(winner)] for winner in service['pipeline'].classes_] for result in results])
+    assert np.allclose(served, expected)
+
+    with urllib.request.urlopen(f'{base_url}/metrics') as response:
+        metrics = json.load(response)
+    server.shutdown()
+
+    print("prediction_service")
+    print(f"{n_requests} requests from {n_clients} clients in {seconds:.2f}s ({n_requests / seconds:.0f} requests/s)")
+    print(metrics)
+
+# ------------------------------------------------------------------------------------------
+
+# CHECK THE VECTORIZED FUNCTIONS AGAINST THE ORIGINAL ONES ON THE REAL DATASET (if it has been preprocessed)
+def check_against_preprocessed_data(preprocessed_data_csv='data_sets/preprocessed_data.csv'):
+    if not os.path.exists(preprocessed_data_csv):
+        print(f"Skipping regression check: {preprocessed_data_csv} not found (run preprocessing_data.py first)")
+        return
+
+    df = pd.read_csv(preprocessed_data_csv)
+    pd.testing.assert_frame_equal(helper.fighter_win_loss_stats_from_df(df.copy()), legacy_fighter_win_loss_stats(df.copy()))
+    pd.testing.assert_frame_equal(helper.fighter_win_loss_stats_with_stance_from_df(df.copy()), legacy_fighter_win_loss_stats_with_stance(df.copy()))
+    print(f"Vectorized outputs match the original implementations on {preprocessed_data_csv}")
+
+def main():
+    check_against_preprocessed_data()
+    benchmark_fighter_win_loss_stats()
+    benchmark_fighter_win_loss_stats_with_stance()
+    benchmark_neighbour_backends()
+    benchmark_stratified_tests()
+    benchmark_fighter_index()
+    benchmark_event_index()
+    benchmark_opponent_graph()
+    benchmark_dominant_strike()
+    benchmark_kde_curves()
+    benchmark_prediction_service()
+
+if __name__=='__main__':
+    main()
@@ -5,11 +5,8 @@ Description:
 We analyse the data to determine the best grappler.
 """
 
-import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
-
-# Load your dataset
-ufc_data = pd.read_csv('data_sets/preprocessed_data.csv')
+import helper
+import fighter_rankings
 
 # List of relevant grappling metrics with 'R_avg_' and 'B_avg_' prefixes
 grappling_metrics = ['TD_landed', 'TD_pct', 'SUB_ATT', 'REV']
@@ -29,39 +26,16 @@ weights_grappling = {
     'REV': 0.10
 }
 
-# Columns for red and blue corner stats
-red_columns_grappling = ['R_avg_' + col for col in grappling_metrics]
-blue_columns_grappling = ['B_avg_' + col for col in grappling_metrics]
-
-# Create separate dataframes for red and blue corner stats
-red_fighter_stats_grappling = ufc_data[['R_fighter'] + red_columns_grappling]
-blue_fighter_stats_grappling = ufc_data[['B_fighter'] + blue_columns_grappling]
-
-# Rename columns to be common for both red and blue stats
-common_column_names_grappling = ['fighter'] + grappling_metrics
-red_fighter_stats_grappling.columns = common_column_names_grappling
-blue_fighter_stats_grappling.columns = common_column_names_grappling
-
-# Combine the red and blue stats into one dataframe
-combined_fighter_stats_grappling = pd.concat([red_fighter_stats_grappling, blue_fighter_stats_grappling], axis=0)
-
-# Group by fighter and calculate mean for each stat
-fighter_stats_aggregated_grappling = combined_fighter_stats_grappling.groupby('fighter').mean().reset_index()
-
-# Normalizing the grappling metrics using MinMaxScaler
-scaler = MinMaxScaler()
-fighter_stats_aggregated_grappling[grappling_metrics] = scaler.fit_transform(
-    fighter_stats_aggregated_grappling[grappling_metrics]
-)
+def main():
+    # Load your dataset
+    ufc_data = helper.load_dataset('data_sets/preprocessed_data.csv')
 
-# Calculate the weighted sum for each fighter
-for column in grappling_metrics:
-    fighter_stats_aggregated_grappling[column] *= weights_grappling[column]
-fighter_stats_aggregated_grappling['grappler_score'] = fighter_stats_aggregated_grappling[grappling_metrics].sum(axis=1)
+    # Average each fighter's red and blue corner stats, normalize them and calculate the weighted sum (see fighter_rankings.py)
+    top_grapplers = fighter_rankings.rank_fighters(ufc_data, grappling_metrics, weights_grappling, 'grappler_score', k=10)
+    top_10_grapplers = top_grapplers[['fighter', 'grappler_score']]
 
-# Identifying the top grapplers
-top_grapplers = fighter_stats_aggregated_grappling.sort_values(by='grappler_score', ascending=False)
-top_10_grapplers = top_grapplers[['fighter', 'grappler_score']].head(10)
+    # Display the top 10 grapplers
+    print(top_10_grapplers)
 
-# Display the top 10 grapplers
-print(top_10_grapplers)
+if __name__=='__main__':
+    main()
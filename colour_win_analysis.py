@@ -6,25 +6,44 @@ Our goal in this program is to determine if there is a difference in the number
 Further, we want to determine if one of the colours wins significantly more than the other. Conclusion can be found in the report.
 """
 
+import argparse
+
 import pandas as pd
 import numpy as np
 from scipy import stats
 
+import event_index
 import helper
+import resampling
 
-def wins_per_event(red_wins, blue_wins):
-    red_wins_per_event = red_wins.groupby('date').count()['R_fighter']
-    blue_wins_per_event = blue_wins.groupby('date').count()['B_fighter']
+# RETURN RED AND BLUE WINS OF EVERY EVENT W/ AT LEAST ONE WIN OF EACH COLOUR (indexed by the event date)
+# the events come from the event index, so the dates are parsed once and the wins are counted w/ a bincount per colour
+# rows (row positions, e.g. from event_index.fights_between) limits the count to those fights
+def wins_per_event(fight_data, events, rows=None):
+    if rows is None:
+        rows = events['order']
+    event_of_row = events['event_of_row'][rows]
+    winners = fight_data['Winner'].to_numpy()[rows]
+    red_wins_per_event = np.bincount(event_of_row[winners == 'Red'], minlength=len(events['event_dates']))
+    blue_wins_per_event = np.bincount(event_of_row[winners == 'Blue'], minlength=len(events['event_dates']))
 
-    colour_wins_per_event = pd.merge(red_wins_per_event, blue_wins_per_event, left_index=True, right_index=True)
-    colour_wins_per_event = colour_wins_per_event.rename(columns={'R_fighter': 'red_wins_per_event', 'B_fighter': 'blue_wins_per_event'})
+    both_colours_won = (red_wins_per_event > 0) & (blue_wins_per_event > 0)
+    event_dates = pd.Index(events['event_dates'][both_colours_won], name='date')
+    return (pd.Series(red_wins_per_event[both_colours_won], index=event_dates, name='red_wins_per_event'),
+            pd.Series(blue_wins_per_event[both_colours_won], index=event_dates, name='blue_wins_per_event'))
 
-    return colour_wins_per_event['red_wins_per_event'], colour_wins_per_event['blue_wins_per_event']
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the wins per event of red-gloved and blue-gloved fighters')
+    parser.add_argument('--start', help='only the events from this date on, e.g. 2015')
+    parser.add_argument('--end', help='only the events before this date, e.g. 2020')
+    args = parser.parse_args(argv)
 
-def main():
-    red_wins, blue_wins = helper.seperate_colour_wins("data_sets/preprocessed_data.csv")
+    fight_data = helper.further_preprocessing_for_removing_draws(helper.load_dataset("data_sets/preprocessed_data.csv"))
+    events = event_index.build_event_index(fight_data, fighter_columns=None) # only sliced by date
 
-    red_wins_per_event, blue_wins_per_event = wins_per_event(red_wins, blue_wins)
+    # era slice: two binary searches over the sorted dates instead of comparing every fight's date
+    rows = event_index.fights_between(events, args.start, args.end)
+    red_wins_per_event, blue_wins_per_event = wins_per_event(fight_data, events, rows)
 
     # pre-transformed average colour wins per event (left for debugging/curiosity) ----------------------------------
     # red_wins_per_event_avg = red_wins_per_event.mean()
@@ -44,5 +63,15 @@ def main():
     print("Levene p-value:", levene_result.pvalue)
     print("T_test_statistic (Group1 - Red; Group2 - Blue):", t_test_result.statistic, "T_test p-value:", t_test_result.pvalue)
 
+    # same comparisons w/o the normality assumption: permute the red/blue labels and bootstrap the difference in means
+    colour_groups = [red_wins_per_event_sqrt, blue_wins_per_event_sqrt]
+    levene_permutation = resampling.permutation_test(colour_groups, resampling.levene_w)
+    t_test_permutation = resampling.permutation_test(colour_groups, resampling.welch_t, alternative='two-sided')
+    mean_difference_ci = resampling.bootstrap_confidence_interval(colour_groups, resampling.mean_difference)
+
+    print("Permutation Levene p-value:", levene_permutation['pvalue'])
+    print("Permutation T_test p-value:", t_test_permutation['pvalue'])
+    print(f"Bootstrap 95% CI of mean sqrt(wins per event), Red - Blue: {mean_difference_ci['statistic']:.4f} [{mean_difference_ci['ci_low']:.4f}, {mean_difference_ci['ci_high']:.4f}]")
+
 if __name__=='__main__':
     main()
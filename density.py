@@ -0,0 +1,97 @@
+"""
+Author: Jason Gill
+
+Description:
+This file computes the kernel density curves drawn by the histogram and KDE plots, instead of letting seaborn fit a
+gaussian_kde for every plot (which evaluates every sample at every grid point). The series of a plot are binned together
+onto one fine common grid w/ linear binning, every series is convolved w/ its own Gaussian kernel through one batched
+FFT, and each curve is read off at the same 200 points seaborn would use (Scott's bandwidth, `cut` bandwidths past the
+data). The cost is O(n + bins log bins) per series instead of O(n x grid), and the curves are cached by the data they came
+from, so a series shared by several plots is only smoothed once
+"""
+
+import hashlib
+
+import pandas as pd
+import numpy as np
+import seaborn as sns
+
+GRID_SIZE = 200 # points per curve, same as seaborn
+BIN_COUNT = 16384 # points of the common grid the samples are binned onto
+PADDING_BANDWIDTHS = 5 # the common grid extends this many bandwidths past every series so the FFT doesn't wrap around
+DENSITY_CACHE = {} # (data fingerprint, cut, gridsize) -> (support, density)
+
+# RETURN SCOTT'S RULE BANDWIDTH, SAME AS scipy's gaussian_kde (and so seaborn)
+def scott_bandwidth(values):
+    return values.std(ddof=1) * len(values) ** (-1 / 5)
+
+def curve_key(values, cut, gridsize):
+    return hashlib.sha1(np.ascontiguousarray(values).tobytes()).hexdigest(), cut, gridsize
+
+# RETURN (n_series, BIN_COUNT) DENSITIES OF THE SERIES ON THE COMMON GRID AND THE GRID
+def binned_kdes(series_list, bandwidths):
+    low = min(values.min() - PADDING_BANDWIDTHS * bw for values, bw in zip(series_list, bandwidths))
+    high = max(values.max() + PADDING_BANDWIDTHS * bw for values, bw in zip(series_list, bandwidths))
+    grid = np.linspace(low, high, BIN_COUNT)
+    dx = grid[1] - grid[0]
+
+    # linear binning: each sample splits its weight between the two grid points around it
+    values = np.concatenate(series_list)
+    series = np.repeat(np.arange(len(series_list)), [len(values) for values in series_list])
+    position = (values - low) / dx
+    left = np.minimum(position.astype(np.int64), BIN_COUNT - 2)
+    right_weight = position - left
+    counts = np.bincount(series * BIN_COUNT + left, weights=1 - right_weight, minlength=len(series_list) * BIN_COUNT)
+    counts += np.bincount(series * BIN_COUNT + left + 1, weights=right_weight, minlength=len(series_list) * BIN_COUNT)
+    counts = counts.reshape(len(series_list), BIN_COUNT)
+
+    # convolve w/ each series' Gaussian kernel (its Fourier transform is known), zero padded to twice the grid
+    frequencies = np.fft.rfftfreq(2 * BIN_COUNT, dx)
+    kernels = np.exp(-2 * (np.pi * frequencies[None, :] * np.asarray(bandwidths)[:, None]) ** 2)
+    smoothed = np.fft.irfft(np.fft.rfft(counts, n=2 * BIN_COUNT, axis=1) * kernels, n=2 * BIN_COUNT, axis=1)[:, :BIN_COUNT]
+
+    sizes = np.array([len(values) for values in series_list])
+    return np.maximum(smoothed, 0) / (sizes[:, None] * dx), grid
+
+# RETURN LIST W/ A (support, density) CURVE FOR EVERY SERIES (None where seaborn draws no curve: < 2 values or no spread)
+# the support runs from cut bandwidths below the smallest value to cut bandwidths above the largest, like seaborn's
+# kdeplot (cut=3) and histplot(kde=True) (cut=0)
+def kde_curves(series_list, cut=3, gridsize=GRID_SIZE):
+    series_list = [np.asarray(values, dtype=float) for values in series_list]
+    series_list = [values[~np.isnan(values)] for values in series_list]
+    keys = [curve_key(values, cut, gridsize) for values in series_list]
+
+    missing = [i for i, (values, key) in enumerate(zip(series_list, keys)) if key not in DENSITY_CACHE
+               and len(values) > 1 and values.var() > 0]
+    if missing:
+        bandwidths = [scott_bandwidth(series_list[i]) for i in missing]
+        densities, grid = binned_kdes([series_list[i] for i in missing], bandwidths)
+
+        for i, bw, density in zip(missing, bandwidths, densities):
+            support = np.linspace(series_list[i].min() - cut * bw, series_list[i].max() + cut * bw, gridsize)
+            DENSITY_CACHE[keys[i]] = (support, np.interp(support, grid, density))
+
+    return [DENSITY_CACHE.get(key) for key in keys]
+
+# ------------------------------------------------------------------------------------------
+
+# DRAWING FROM PRECOMPUTED CURVES
+# DRAW A CURVE LIKE sns.kdeplot (no autoscale margin below 0), RETURN THE LINE
+def plot_curve(ax, curve, **plot_kwargs):
+    support, curve_density = curve
+    line, = ax.plot(support, curve_density, **plot_kwargs)
+    line.sticky_edges.y[:] = (0, np.inf)
+    return line
+
+# DRAW sns.histplot(values, kde=True) W/ THE PRECOMPUTED CURVE: the curve is scaled from a density to the bar counts
+def histogram_with_curve(ax, values, curve, bins='auto', **histplot_kwargs):
+    values = pd.Series(values, dtype=float).dropna() # a Series keeps its name, which histplot uses as the x label
+    edges = np.histogram_bin_edges(values, bins=bins)
+    histplot_kwargs.setdefault('alpha', 0.5) # histplot's bars are lighter when it draws a KDE
+    sns.histplot(values, bins=edges, ax=ax, **histplot_kwargs)
+
+    if curve is not None:
+        support, curve_density = curve
+        color = histplot_kwargs.get('color', ax.patches[0].get_facecolor()[:3])
+        plot_curve(ax, (support, curve_density * len(values) * np.diff(edges).mean()), color=color)
+    return ax
@@ -7,27 +7,47 @@ The strike types to be analyzed are head strikes, body strikes and leg strikes.
 between how effective each strike type is compared to the others.
 """
 
-import pandas as pd
+import argparse
+
+import numpy as np
 from scipy import stats
-import pingouin as pg
 
 import helper
+import posthoc
+import raw_fight_stream
+import resampling
+
+# strike count columns of helper.fight_strike_stats_for_winners, by where the strike landed and where it was thrown from
+STRIKE_TARGETS = {'Head': 'Head_strikes', 'Body': 'Body_strikes', 'Leg': 'Leg_strikes'}
+STRIKE_POSITIONS = {'Distance': 'Distance_strikes', 'Clinch': 'Clinch_strikes', 'Ground': 'Ground_strikes'}
+
+# RETURN OBJECT ARRAY W/ THE STRIKE TYPE THE WINNER LANDED THE MOST OF IN EVERY FIGHT
+# None when the most strikes are tied between types (or a count is missing) - argmax over the (n, types) matrix
+def determine_dominant_strike(strike_stats, strike_columns=STRIKE_TARGETS):
+    strikes = strike_stats[list(strike_columns.values())].to_numpy(dtype=float)
+    labels = np.array(list(strike_columns) + [None], dtype=object)
 
-def determine_dominant_strike(row):
-    if ((row['Head_strikes'] > row['Leg_strikes']) & (row['Head_strikes'] > row['Body_strikes'])):
-        return 'Head'
-    elif ((row['Body_strikes'] > row['Head_strikes']) & (row['Body_strikes'] > row['Leg_strikes'])):
-        return 'Body'
-    elif ((row['Leg_strikes'] > row['Head_strikes']) & (row['Leg_strikes'] > row['Body_strikes'])):
-        return 'Leg'
+    dominant = np.argmax(strikes, axis=1)
+    most_strikes = np.take_along_axis(strikes, dominant[:, None], axis=1)
+    has_single_most = ((strikes == most_strikes).sum(axis=1) == 1) & ~np.isnan(strikes).any(axis=1)
+    return labels[np.where(has_single_most, dominant, len(labels) - 1)]
 
-def main():
-    winner_strike_stats = helper.fight_strike_stats_for_winners("data_sets/raw_total_fight_data.csv")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the strike types that win UFC fights')
+    parser.add_argument('--chunk-rows', type=int, help='stream the raw fight data in chunks of this many rows instead of loading it at once')
+    args = parser.parse_args(argv)
+
+    if args.chunk_rows:
+        winner_strike_stats = raw_fight_stream.fight_strike_stats_for_winners("data_sets/raw_total_fight_data.csv", args.chunk_rows)
+    else:
+        winner_strike_stats = helper.fight_strike_stats_for_winners("data_sets/raw_total_fight_data.csv")
     # print(winner_strike_stats)
     
-    # adding dominant strike stat
-    winner_strike_stats['dominant_strike'] = winner_strike_stats.apply(determine_dominant_strike, axis=1)
-    winner_strike_stats.dropna(inplace=True)
+    winner_strike_stats = winner_strike_stats.dropna(subset=['Name']) # fights w/o a winner (no contests)
+
+    # adding dominant strike stat (fights w/o a single dominant strike type are left out by the selections below)
+    winner_strike_stats['dominant_strike'] = determine_dominant_strike(winner_strike_stats)
+    winner_strike_stats['dominant_position'] = determine_dominant_strike(winner_strike_stats, STRIKE_POSITIONS)
     # print(winner_strike_stats)
 
     head_strikes = winner_strike_stats[winner_strike_stats['dominant_strike'] == 'Head']['Head_strikes']
@@ -52,19 +72,33 @@ def main():
     # dealing with unequal sample sizes: https://www.statology.org/anova-unequal-sample-size/
     # data has unequal variance and roughly normal distribution => kruskal-wallis test
     levene_result = stats.levene(head_strikes, body_strikes, leg_strikes)
-    kruskal_result = stats.kruskal(head_strikes, body_strikes, levene_result)
+    kruskal_result = stats.kruskal(head_strikes, body_strikes, leg_strikes)
 
     print("Levene p-value:", levene_result.pvalue)
     print("Kruskal p-value:", kruskal_result.pvalue)
-    
-    strike_types_and_counts = pd.concat([head_strikes, body_strikes, leg_strikes], axis=1, keys=['head_strikes', 'body_strikes', 'leg_strikes'])    
-    melted_df = strike_types_and_counts.melt().dropna()
 
+    # same comparisons w/o the distribution assumptions: permute the strike type labels and bootstrap each type's mean
+    strike_groups = [head_strikes, body_strikes, leg_strikes]
+    levene_permutation = resampling.permutation_test(strike_groups, resampling.levene_w)
+    kruskal_permutation = resampling.kruskal_permutation_test(strike_groups)
+    mean_ci = resampling.bootstrap_confidence_interval(strike_groups, resampling.group_means)
+
+    print("Permutation Levene p-value:", levene_permutation['pvalue'])
+    print("Permutation Kruskal p-value:", kruskal_permutation['pvalue'])
+    for strike_type, mean, low, high in zip(['head', 'body', 'leg'], mean_ci['statistic'], mean_ci['ci_low'], mean_ci['ci_high']):
+        print(f"Bootstrap 95% CI of mean {strike_type} strikes: {mean:.2f} [{low:.2f}, {high:.2f}]")
+    
     # games-howell handles unequal sample sizes much better than tukey
     # http://bayes.acs.unt.edu:8083/BayesContent/class/Jon/ISSS_SC/Module009/isss_m91_onewayanova/node7.html
-    posthoc = pg.pairwise_gameshowell(data=melted_df, dv='value', between='variable')
+    posthoc_result = posthoc.pairwise_gameshowell_from_groups({'head_strikes': head_strikes, 'body_strikes': body_strikes, 'leg_strikes': leg_strikes})
+
+    print(posthoc_result)
 
-    print(posthoc)
+    # same question by position: are winners who mostly strike at distance, in the clinch or on the ground more effective
+    position_strikes = {position: winner_strike_stats[winner_strike_stats['dominant_position'] == position][column] for position, column in STRIKE_POSITIONS.items()}
+    print("\nFights won w/ each dominant strike position:", {position: len(strikes) for position, strikes in position_strikes.items()})
+    print("Kruskal p-value (positions):", stats.kruskal(*position_strikes.values()).pvalue)
+    print(posthoc.pairwise_gameshowell_from_groups({position.lower() + '_strikes': strikes for position, strikes in position_strikes.items()}))
 
 if __name__=='__main__':
     main()
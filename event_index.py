@@ -0,0 +1,152 @@
+"""
+Author: Jason Gill
+
+Description:
+This file builds a chronological index over the fight history so it can be sliced by date without scanning every fight.
+The dates (e.g. "2021-03-20" in preprocessed_data.csv or "March 20, 2021" in raw_total_fight_data.csv) are parsed once,
+only the distinct ones, and the fights are sorted by date a single time. A date range is then two binary searches over
+the sorted dates, and every event (all the fights on one date) is a slice between two offsets. Each fighter's fights are
+stored the same way (CSR: one offsets array into one array of fights, keyed by the fighter_index IDs), so "the last N
+fights of a fighter" is a slice too. Queries return row positions into the frame the index was built from
+"""
+
+import argparse
+
+import pandas as pd
+import numpy as np
+
+import fighter_index
+import helper
+
+DATE_FORMATS = ['ISO8601', '%B %d, %Y'] # preprocessed_data.csv, raw_total_fight_data.csv
+
+# RETURN datetime64 ARRAY OF THE DATES, PARSING EVERY DISTINCT DATE STRING ONLY ONCE
+def parse_dates(dates):
+    codes, unique_dates = pd.factorize(pd.Series(dates, dtype=object))
+    unique_dates = pd.Series(unique_dates, dtype=object)
+    for date_format in DATE_FORMATS + ['mixed']: # the known formats are much faster than guessing every date's format
+        try:
+            parsed = pd.to_datetime(unique_dates, format=date_format).to_numpy()
+            break
+        except ValueError:
+            if date_format == 'mixed':
+                raise
+    return np.append(parsed, np.datetime64('NaT')).astype('datetime64[ns]')[codes] # code -1 (missing date) takes the NaT
+
+def to_datetime64(date):
+    return pd.Timestamp(date).to_datetime64()
+
+# RETURN (OFFSETS, ITEMS): THE ITEMS OF GROUP g ARE items[offsets[g]:offsets[g + 1]], IN THE ORDER OF items_in_order
+def csr_groups(group_of_item, items_in_order, n_groups):
+    groups = group_of_item[items_in_order]
+    offsets = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(groups, minlength=n_groups), out=offsets[1:])
+    return offsets, items_in_order[np.argsort(groups, kind='stable')]
+
+# ------------------------------------------------------------------------------------------
+
+# RETURN THE EVENT INDEX OF A FIGHT FRAME, a dict w/:
+# 'order': row positions sorted by date ('dates' holds their dates), fights w/o a date are left out
+# 'event_dates', 'event_offsets': the fights of event e are order[event_offsets[e]:event_offsets[e + 1]]
+# 'event_of_row': event number of every row (-1 w/o a date)
+# 'fighter_offsets', 'fighter_rows': the fights of fighter ID f, oldest first, are fighter_rows[fighter_offsets[f]:fighter_offsets[f + 1]]
+# (the IDs are the ones in fighter_index_csv) - fighter_columns=None leaves them out (None), for callers that only slice
+# by date and shouldn't pay for looking up, or registering, every fighter
+def build_event_index(df, date_column='date', fighter_columns=('R_fighter', 'B_fighter'), fighter_index_csv=fighter_index.FIGHTER_INDEX_CSV):
+    row_dates = parse_dates(df[date_column].to_numpy(dtype=object))
+    order = np.argsort(row_dates, kind='stable') # NaT sorts last
+    order = order[:np.count_nonzero(~np.isnat(row_dates))]
+    dates = row_dates[order]
+
+    event_dates, event_starts = np.unique(dates, return_index=True)
+    event_offsets = np.append(event_starts, len(order)).astype(np.int64)
+    event_of_row = np.full(len(df), -1, dtype=np.int64)
+    event_of_row[order] = np.repeat(np.arange(len(event_dates)), np.diff(event_offsets))
+
+    index = {
+        'order': order,
+        'dates': dates,
+        'event_dates': event_dates,
+        'event_offsets': event_offsets,
+        'event_of_row': event_of_row,
+        'fighter_offsets': None,
+        'fighter_rows': None,
+        'fighter_index_csv': fighter_index_csv,
+    }
+    if fighter_columns is None:
+        return index
+
+    # one entry per fighter per fight: fight row, position in date order and fighter ID (fighters w/o a name are left out)
+    ids = fighter_index.fighter_ids(np.concatenate([df[column].to_numpy(dtype=object) for column in fighter_columns]), fighter_index_csv)
+    entry_rows = np.concatenate([order] * len(fighter_columns))
+    entry_positions = np.tile(np.arange(len(order)), len(fighter_columns))
+    entry_ids = ids.reshape(len(fighter_columns), len(df))[:, order].ravel()
+    entries_by_date = np.argsort(entry_positions, kind='stable')
+    entries_by_date = entries_by_date[entry_ids[entries_by_date] != fighter_index.MISSING_ID]
+    fighter_offsets, fighter_entries = csr_groups(entry_ids, entries_by_date, entry_ids.max(initial=-1) + 1)
+
+    index['fighter_offsets'] = fighter_offsets
+    index['fighter_rows'] = entry_rows[fighter_entries]
+    return index
+
+# ------------------------------------------------------------------------------------------
+
+# RANGE QUERIES
+# RETURN (FIRST, LAST + 1) POSITION IN index['order'] OF THE FIGHTS FROM start UP TO (NOT INCLUDING) end (None = unbounded)
+def date_range_positions(index, start=None, end=None):
+    first = 0 if start is None else np.searchsorted(index['dates'], to_datetime64(start), side='left')
+    last = len(index['dates']) if end is None else np.searchsorted(index['dates'], to_datetime64(end), side='left')
+    return int(first), int(max(first, last))
+
+# RETURN ROW POSITIONS OF THE FIGHTS FROM start UP TO (NOT INCLUDING) end, OLDEST FIRST, e.g. fights_between(index, '2015', '2020')
+def fights_between(index, start=None, end=None):
+    first, last = date_range_positions(index, start, end)
+    return index['order'][first:last]
+
+# RETURN EVENT NUMBERS OF THE EVENTS FROM start UP TO (NOT INCLUDING) end
+def events_between(index, start=None, end=None):
+    first = 0 if start is None else np.searchsorted(index['event_dates'], to_datetime64(start), side='left')
+    last = len(index['event_dates']) if end is None else np.searchsorted(index['event_dates'], to_datetime64(end), side='left')
+    return np.arange(first, max(first, last))
+
+# RETURN ROW POSITIONS OF EVERY FIGHT OF AN EVENT
+def event_fights(index, event):
+    return index['order'][index['event_offsets'][event]:index['event_offsets'][event + 1]]
+
+# RETURN ROW POSITIONS OF A FIGHTER'S FIGHTS, OLDEST FIRST (only the last `last` of them if given)
+def fighter_fights(index, name, last=None):
+    if index['fighter_offsets'] is None:
+        raise ValueError('the event index was built w/ fighter_columns=None, so it has no per-fighter fights')
+    fighter_id = fighter_index.fighter_ids([name], index['fighter_index_csv'])[0]
+    if fighter_id == fighter_index.MISSING_ID or fighter_id >= len(index['fighter_offsets']) - 1:
+        return np.empty(0, dtype=np.int64) # fighter isn't in this frame
+    first, end = index['fighter_offsets'][fighter_id], index['fighter_offsets'][fighter_id + 1]
+    if last is not None:
+        first = max(first, end - last)
+    return index['fighter_rows'][first:end]
+
+# RETURN EVENT NUMBERS OF THE LAST n EVENTS A FIGHTER FOUGHT AT
+def fighter_last_events(index, name, n):
+    return np.unique(index['event_of_row'][fighter_fights(index, name)])[-n:]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Slice the fight history by date or by fighter')
+    parser.add_argument('--start', help='first date, e.g. 2015 or 2015-06-01')
+    parser.add_argument('--end', help='date after the last one, e.g. 2020')
+    parser.add_argument('--fighter', help='list the last --last fights of this fighter instead')
+    parser.add_argument('--last', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    df = helper.load_dataset('data_sets/preprocessed_data.csv')
+    index = build_event_index(df)
+    columns = ['date', 'R_fighter', 'B_fighter', 'Winner', 'weight_class']
+
+    if args.fighter:
+        print(df.iloc[fighter_fights(index, args.fighter, last=args.last)][columns].to_string(index=False))
+    else:
+        rows = fights_between(index, args.start, args.end)
+        print(f"{len(rows)} fights at {len(events_between(index, args.start, args.end))} events")
+        print(df.iloc[rows][columns].to_string(index=False))
+
+if __name__=='__main__':
+    main()
@@ -2,29 +2,139 @@
 Author: Jason Gill
 
 Description:
-Our goal in this part of the project is to develop an ML model that is able to predict 
-the winner of the match given the fight statistics of both the red and blue fighter 
+Our goal in this part of the project is to develop an ML model that is able to predict
+the winner of the match given the fight statistics of both the red and blue fighter
+The neighbour search of the KNN model can be swapped out: 'exact' is the original brute-force search over every
+scaled column, while 'pca_brute' first projects the columns onto the principal components that keep 95% of the variance
+(the fight statistics are strongly correlated, so far fewer dimensions are needed) and then searches them by brute
+force. Its recall drops as the number of fights grows, so run with --compare-backends to see the recall/throughput
+trade-off on the current data
+The fitted model is saved as a versioned artifact (see model_artifacts.py), so `--predict <csv>` scores new fights
+without retraining
 """
 
+import argparse
+import time
+
 import pandas as pd
+import numpy as np
+from sklearn.decomposition import PCA
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import make_pipeline
-from sklearn.preprocessing import MinMaxScaler
 
-def main():
-    df = pd.read_csv('data_sets/preprocessed_data.csv')
+import helper
+import model_artifacts
+
+MODEL_NAME = 'fight_result_predictor'
+N_NEIGHBORS = 50 # k used until knn_search.py has saved a cross-validated one
+DEFAULT_KNN_CONFIG = {'k': N_NEIGHBORS, 'weights': 'uniform', 'scaler': 'minmax'}
+
+# backend name -> reduce w/ PCA first (KD and ball trees were slower than brute force at k=50, even after PCA)
+NEIGHBOUR_BACKENDS = {
+    'exact': False,
+    'pca_brute': True,
+}
+
+# RETURN UNFITTED PIPELINE (SCALER, OPTIONAL PCA, KNN) USING THE GIVEN NEIGHBOUR BACKEND
+def make_model(backend='exact', n_neighbors=N_NEIGHBORS, pca_variance=0.95, weights='uniform', scaler='minmax'):
+    steps = [model_artifacts.KNN_SCALERS[scaler]()]
+    if NEIGHBOUR_BACKENDS[backend]:
+        steps.append(PCA(n_components=pca_variance, svd_solver='full')) # keep the fewest components w/ pca_variance of the variance
+    steps.append(KNeighborsClassifier(n_neighbors=n_neighbors, weights=weights, algorithm='brute'))
+    return make_pipeline(*steps)
+
+# RETURN (n_queries, k) INDICES OF EACH QUERY'S NEAREST TRAINING FIGHTS FOR A FITTED MODEL
+def nearest_training_fights(model, X):
+    return model[-1].kneighbors(model[:-1].transform(X), return_distance=False)
+
+# RETURN FRACTION OF THE EXACT k NEAREST NEIGHBOURS THAT THE APPROXIMATE SEARCH ALSO FINDS (recall@k)
+def neighbour_recall(exact_neighbours, approximate_neighbours):
+    k = exact_neighbours.shape[1]
+    found = [len(np.intersect1d(exact, approximate, assume_unique=True)) for exact, approximate in zip(exact_neighbours, approximate_neighbours)]
+    return np.sum(found) / (k * len(exact_neighbours))
+
+# RETURN DATAFRAME W/ THE ACCURACY, RECALL@k VS THE EXACT SEARCH AND QUERY THROUGHPUT OF EVERY NEIGHBOUR BACKEND
+def compare_neighbour_backends(X_train, X_valid, y_train, y_valid, n_neighbors=N_NEIGHBORS, repeats=3):
+    results = []
+    exact_neighbours = None
+
+    for backend in NEIGHBOUR_BACKENDS:
+        start = time.perf_counter()
+        model = make_model(backend, n_neighbors).fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            y_pred = model.predict(X_valid)
+        predict_seconds = (time.perf_counter() - start) / repeats
+
+        neighbours = nearest_training_fights(model, X_valid)
+        if exact_neighbours is None:
+            exact_neighbours = neighbours # 'exact' is listed first
 
-    y = df['Winner'].values
+        results.append({
+            'backend': backend,
+            'dimensions': model[-1].n_features_in_,
+            'accuracy': np.mean(y_pred == y_valid),
+            f'recall@{n_neighbors}': neighbour_recall(exact_neighbours, neighbours),
+            'fit_seconds': fit_seconds,
+            'queries_per_second': len(X_valid) / predict_seconds,
+        })
+
+    return pd.DataFrame(results)
+
+# PRINT THE PREDICTED WINNER AND WIN PROBABILITIES OF EVERY FIGHT IN A CSV (same columns as preprocessed_data.csv)
+def predict_fights(fights_csv):
+    fights_df = helper.load_dataset(fights_csv, cache=False)
+    classes, probabilities = model_artifacts.predict_proba_with_artifact(MODEL_NAME, fights_df)
+
+    predictions = fights_df[['R_fighter', 'B_fighter']].copy()
+    predictions['predicted_winner'] = classes[probabilities.argmax(axis=1)]
+    for column, winner in enumerate(classes):
+        predictions[f'P({winner})'] = probabilities[:, column]
+    print(predictions.to_string(index=False))
+
+# RETURN (FEATURE DATAFRAME, WINNERS) USED TO TRAIN THE MODEL
+def load_training_data():
+    df = helper.load_dataset('data_sets/preprocessed_data.csv')
+
+    y = df['Winner'].to_numpy()
 
     stat_columns = df.select_dtypes(include=['number'])
-    X = stat_columns.values
+    return stat_columns, y
+
+# FIT THE MODEL ON THE PREPROCESSED FIGHTS, PRINT ITS SCORE AND SAVE IT AS THE NEXT ARTIFACT VERSION
+def train(backend, compare_backends):
+    stat_columns, y = load_training_data()
+    X = stat_columns.to_numpy()
 
     X_train, X_valid, y_train, y_valid = train_test_split(X, y)
 
-    model = make_pipeline(MinMaxScaler(), KNeighborsClassifier(n_neighbors=50)) # 50 or 100 seem to work pretty well
+    knn_config = model_artifacts.load_knn_config(MODEL_NAME, DEFAULT_KNN_CONFIG)
+    model = make_model(backend, knn_config['k'], weights=knn_config['weights'], scaler=knn_config['scaler'])
     model.fit(X_train, y_train)
-    print('Model Accuracy Score:', model.score(X_valid, y_valid))
+    validation_score = model.score(X_valid, y_valid)
+    print(f"KNN w/ k={knn_config['k']}, weights={knn_config['weights']}, scaler={knn_config['scaler']}")
+    print('Model Accuracy Score:', validation_score)
+
+    artifact = model_artifacts.save_model_artifact(MODEL_NAME, model, stat_columns.columns, backend=backend, knn_config=knn_config, validation_score=validation_score, n_train_rows=len(X_train))
+    print(f"Saved {MODEL_NAME} version {artifact['version']}")
+
+    if compare_backends:
+        print(compare_neighbour_backends(X_train, X_valid, y_train, y_valid).to_string(index=False))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Predict the winner of a fight from both fighters\' statistics')
+    parser.add_argument('--backend', choices=list(NEIGHBOUR_BACKENDS), default='exact', help='how the nearest neighbours are searched')
+    parser.add_argument('--compare-backends', action='store_true', help='print the accuracy, recall and throughput of every backend')
+    parser.add_argument('--predict', metavar='CSV', help='score the fights in CSV w/ the latest saved model instead of training')
+    args = parser.parse_args(argv)
+
+    if args.predict:
+        predict_fights(args.predict)
+    else:
+        train(args.backend, args.compare_backends)
 
 if __name__=='__main__':
     main()
@@ -0,0 +1,165 @@
+"""
+Author: Jason Gill
+
+Description:
+This file keeps a persistent index that gives every fighter a stable integer ID, so the fight and fighter-detail datasets
+can be joined and grouped on integer keys instead of the name strings. Names are normalized before they are looked up
+(accents removed, whitespace collapsed, case folded, the aliases in `data_sets/fighter_aliases.csv` mapped to one
+spelling), which means two spellings
+of the same fighter get the same ID instead of silently dropping out of a merge. The index is a normalized name -> ID
+dict stored in `data_sets/fighter_index.csv`; a fighter keeps their ID across runs and new fighters get the next free one
+
+Running `python3 fighter_index.py` registers every fighter of the preprocessed datasets and prints how many spellings
+were merged into an existing fighter
+"""
+
+import argparse
+import os
+import unicodedata
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None # not on Windows - concurrent runs there could still hand out an ID twice
+
+import pandas as pd
+import numpy as np
+
+import helper
+
+FIGHTER_INDEX_CSV = 'data_sets/fighter_index.csv'
+FIGHTER_ALIASES_CSV = 'data_sets/fighter_aliases.csv' # other spellings (alias) of a fighter_name in the datasets
+MISSING_ID = -1 # ID of a missing (NaN) name
+
+# letters NFKD doesn't split into a base letter + accent
+LETTER_REPLACEMENTS = str.maketrans({'ł': 'l', 'Ł': 'L', 'ø': 'o', 'Ø': 'O', 'đ': 'd', 'Đ': 'D', 'ß': 'ss', 'æ': 'ae', 'Æ': 'AE'})
+
+LOADED_INDEX = {} # path -> (mtime_ns, index) so the CSV is only parsed again after it changes
+
+# ------------------------------------------------------------------------------------------
+
+# NAME NORMALIZATION
+def strip_accents(name):
+    if name.isascii():
+        return name
+    decomposed = unicodedata.normalize('NFKD', name.translate(LETTER_REPLACEMENTS))
+    return ''.join(character for character in decomposed if not unicodedata.combining(character))
+
+# RETURN THE KEY A NAME IS INDEXED UNDER, e.g. ' B.J.  Peñá ' -> 'bj pena'
+def normalize_name(name, aliases=True):
+    key = ' '.join(strip_accents(name).replace('.', '').split()).casefold()
+    return ALIASES.get(key, key) if aliases else key
+
+# RETURN DICT normalized alias -> normalized name the fighter is indexed under (both as returned by normalize_name w/o aliases)
+def load_aliases(path=FIGHTER_ALIASES_CSV):
+    if not os.path.exists(path):
+        return {}
+    aliases_df = pd.read_csv(path, keep_default_na=False)
+    return {normalize_name(alias, aliases=False): normalize_name(name, aliases=False) for alias, name in zip(aliases_df['alias'], aliases_df['fighter_name'])}
+
+ALIASES = load_aliases()
+
+# ------------------------------------------------------------------------------------------
+
+# PERSISTENT INDEX
+# an index is a dict: {'ids': {normalized name: ID}, 'names': {ID: name as first seen}}
+def read_fighter_index(path):
+    if not os.path.exists(path):
+        return {'ids': {}, 'names': {}}
+    index_df = pd.read_csv(path, keep_default_na=False)
+    fighter_ids = index_df['fighter_id'].tolist()
+    return {'ids': dict(zip(index_df['name_key'].tolist(), fighter_ids)), 'names': dict(zip(fighter_ids, index_df['fighter_name'].tolist()))}
+
+def load_fighter_index(path=FIGHTER_INDEX_CSV):
+    mtime_ns = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+    if path not in LOADED_INDEX or LOADED_INDEX[path][0] != mtime_ns:
+        LOADED_INDEX[path] = (mtime_ns, read_fighter_index(path))
+    return LOADED_INDEX[path][1]
+
+# RETURN THE INDEX W/ THE NEW {normalized name: name} FIGHTERS ADDED AND SAVED
+def add_fighters(new_fighters, path=FIGHTER_INDEX_CSV):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # analyses running at the same time share the file, so new IDs are handed out from what is on disk while holding a
+    # lock on it, otherwise two processes could give different fighters the same ID
+    with open(f'{path}.lock', 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX) # released when the file is closed
+        return add_fighters_locked(new_fighters, path)
+
+def add_fighters_locked(new_fighters, path):
+    index = read_fighter_index(path)
+    next_id = max(index['names'], default=-1) + 1
+    for key in sorted(new_fighters):
+        if key not in index['ids']:
+            index['ids'][key] = next_id
+            index['names'][next_id] = new_fighters[key]
+            next_id += 1
+
+    index_df = pd.DataFrame({'fighter_id': list(index['ids'].values()), 'name_key': list(index['ids'])})
+    index_df['fighter_name'] = index_df['fighter_id'].map(index['names'])
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    index_df.sort_values('fighter_id').to_csv(temporary_path, index=False)
+    os.replace(temporary_path, path)
+
+    LOADED_INDEX[path] = (os.stat(path).st_mtime_ns, index)
+    return index
+
+# ------------------------------------------------------------------------------------------
+
+# LOOKUPS
+# RETURN INT64 ARRAY W/ THE ID OF EVERY NAME (MISSING_ID for NaN) - only the distinct names are normalized and looked up,
+# every row is then a single array take
+# the index is only written by fighter_index.py (add_new=True), the analyses read it: a name that isn't indexed yet
+# gets MISSING_ID and a warning, so analyses running at the same time never rewrite the file
+def fighter_ids(names, path=FIGHTER_INDEX_CSV, add_new=False):
+    codes, unique_names = pd.factorize(pd.Series(names, dtype=object))
+    keys = [normalize_name(name) for name in unique_names]
+
+    index = load_fighter_index(path)
+    new_fighters = {}
+    for key, name in zip(keys, unique_names):
+        if key not in index['ids']:
+            new_fighters.setdefault(key, name)
+    if new_fighters and add_new:
+        index = add_fighters(new_fighters, path)
+    elif new_fighters:
+        examples = ', '.join(list(new_fighters.values())[:3])
+        print(f"Warning: {len(new_fighters)} fighters aren't in {path} (e.g. {examples}) and are left out, run `python3 fighter_index.py` to add them")
+
+    unique_ids = np.array([index['ids'].get(key, MISSING_ID) for key in keys] + [MISSING_ID], dtype=np.int64)
+    return unique_ids[codes] # code -1 (NaN) takes the trailing MISSING_ID
+
+# RETURN OBJECT ARRAY W/ THE INDEXED NAME OF EVERY ID
+def fighter_names(ids, path=FIGHTER_INDEX_CSV):
+    names = load_fighter_index(path)['names']
+    return np.array([names.get(fighter_id, np.nan) for fighter_id in np.asarray(ids).tolist()], dtype=object)
+
+# RETURN COPY OF df W/ AN INTEGER ID COLUMN FOR EVERY NAME COLUMN, e.g. {'R_fighter': 'R_fighter_id'}
+def add_fighter_ids(df, id_columns, path=FIGHTER_INDEX_CSV, add_new=False):
+    df = df.copy()
+    names = np.concatenate([df[name_column].to_numpy(dtype=object) for name_column in id_columns])
+    ids = fighter_ids(names, path, add_new) # one lookup for every column, so a fighter only new to the index gets one ID
+    for i, id_column in enumerate(id_columns.values()):
+        df[id_column] = ids[i * len(df):(i + 1) * len(df)]
+    return df
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Register every fighter of the preprocessed datasets in the fighter index')
+    parser.add_argument('--fights-csv', default='data_sets/preprocessed_data.csv')
+    parser.add_argument('--fighters-csv', default='data_sets/preprocessed_fighter_details.csv')
+    args = parser.parse_args(argv)
+
+    fights_df = helper.load_dataset(args.fights_csv)
+    fighters_df = helper.load_dataset(args.fighters_csv)
+    names = pd.Series(np.concatenate([
+        fighters_df['fighter_name'].to_numpy(dtype=object),
+        fights_df['R_fighter'].to_numpy(dtype=object),
+        fights_df['B_fighter'].to_numpy(dtype=object),
+    ])).dropna().unique()
+
+    ids = fighter_ids(names, add_new=True)
+    print(f"{len(load_fighter_index()['ids'])} fighters in {FIGHTER_INDEX_CSV}")
+    print(f"{len(names) - len(np.unique(ids))} of the {len(names)} names in the datasets are another spelling of an indexed fighter")
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Author: Vishaal Bharadwaj
+
+Description:
+This file contains the scoring engine shared by the pound for pound, striker and grappler rankings. The per-fighter
+averages are built once as a NumPy matrix, normalized like sklearn's MinMaxScaler and then scored against any number
+of weight profiles with a single matrix multiply. The top fighters are picked with argpartition instead of a full sort.
+It also contains the weight-sensitivity sweep, which scores thousands of random weight profiles in memory-bounded chunks
+to see how stable each fighter's ranking is
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+import fighter_index
+
+# RETURN FIGHTER NAMES (SORTED) AND AN (n_fighters, n_metrics) MATRIX W/ EACH FIGHTER'S MEAN OF EVERY 'avg_' METRIC
+# (same result as concatenating the red/blue corner columns and running groupby('fighter').mean())
+# fighters are grouped on their fighter_index IDs, so different spellings of the same fighter are averaged together
+def aggregate_fighter_metrics(ufc_data, metrics):
+    names = np.concatenate([ufc_data['R_fighter'].to_numpy(dtype=object), ufc_data['B_fighter'].to_numpy(dtype=object)])
+    ids = fighter_index.fighter_ids(names)
+    metric_values = np.vstack([
+        ufc_data[['R_avg_' + metric for metric in metrics]].to_numpy(dtype=float),
+        ufc_data[['B_avg_' + metric for metric in metrics]].to_numpy(dtype=float),
+    ])
+
+    has_name = ids != fighter_index.MISSING_ID # groupby drops fights with a missing fighter name
+    fighter_ids, first_rows, codes = np.unique(ids[has_name], return_index=True, return_inverse=True)
+    metric_values = metric_values[has_name]
+
+    # each fighter is shown as spelled in ufc_data (the first spelling if there are several), then the codes are
+    # renumbered so the fighters come out in alphabetical order
+    fighters = names[has_name][first_rows]
+    alphabetical_order = np.argsort(fighters, kind='stable')
+    codes = np.argsort(alphabetical_order)[codes]
+    fighters = fighters[alphabetical_order]
+
+    # NaN values are skipped when averaging, same as pandas' mean
+    has_value = ~np.isnan(metric_values)
+    metric_values = np.where(has_value, metric_values, 0.0)
+
+    fighter_metrics = np.empty((len(fighters), len(metrics)))
+    for column in range(len(metrics)):
+        sums = np.bincount(codes, weights=metric_values[:, column], minlength=len(fighters))
+        counts = np.bincount(codes, weights=has_value[:, column], minlength=len(fighters))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fighter_metrics[:, column] = sums / counts
+
+    return fighters, fighter_metrics
+
+# RETURN MATRIX W/ EVERY COLUMN SCALED TO [0, 1] (same as MinMaxScaler, constant columns become 0)
+def min_max_scale(fighter_metrics):
+    column_min = np.nanmin(fighter_metrics, axis=0)
+    column_range = np.nanmax(fighter_metrics, axis=0) - column_min
+    column_range[column_range == 0] = 1.0
+    return (fighter_metrics - column_min) / column_range
+
+# RETURN (n_profiles, n_metrics) MATRIX FROM A LIST OF {metric: weight} DICTS
+def weight_profiles_to_matrix(weight_profiles, metrics):
+    return np.array([[profile[metric] for metric in metrics] for profile in weight_profiles], dtype=float)
+
+# RETURN (n_fighters, n_profiles) SCORES - every weight profile is scored in the same matrix multiply
+def score_weight_profiles(scaled_metrics, weight_matrix):
+    return np.nan_to_num(scaled_metrics) @ weight_matrix.T # a missing metric adds nothing to the weighted sum
+
+# RETURN INDICES OF THE k HIGHEST SCORES, HIGHEST FIRST
+# works on a single score vector or on (n_fighters, n_profiles) scores, giving a (k, n_profiles) matrix
+def top_k(scores, k):
+    k = min(k, scores.shape[0])
+    top_indices = np.argpartition(-scores, k - 1, axis=0)[:k] # only the top k get sorted
+    top_scores = np.take_along_axis(scores, top_indices, axis=0)
+    return np.take_along_axis(top_indices, np.argsort(-top_scores, axis=0, kind='stable'), axis=0)
+
+# RETURN FIGHTER NAMES AND THEIR NORMALIZED METRIC MATRIX - build once, then score as many weight profiles as needed
+def build_fighter_metric_matrix(ufc_data, metrics):
+    fighters, fighter_metrics = aggregate_fighter_metrics(ufc_data, metrics)
+    return fighters, min_max_scale(fighter_metrics)
+
+# RETURN DATAFRAME OF THE TOP k FIGHTERS W/ THEIR WEIGHTED (NORMALIZED) METRICS AND SCORE
+def rank_fighters(ufc_data, metrics, weights, score_column, k=10):
+    fighters, scaled_metrics = build_fighter_metric_matrix(ufc_data, metrics)
+
+    weight_matrix = weight_profiles_to_matrix([weights], metrics)
+    scores = score_weight_profiles(scaled_metrics, weight_matrix)[:, 0]
+    top_indices = top_k(scores, k)
+
+    # index is the fighter's position in the alphabetical list, same as the groupby(...).reset_index() version
+    top_fighters = pd.DataFrame(scaled_metrics[top_indices] * weight_matrix[0], columns=metrics, index=top_indices)
+    top_fighters.insert(0, 'fighter', fighters[top_indices])
+    top_fighters[score_column] = scores[top_indices]
+
+    return top_fighters
+
+# ------------------------------------------------------------------------------------------
+
+# WEIGHT-SENSITIVITY SWEEP
+# RETURN (n_profiles, n_metrics) WEIGHTS SAMPLED UNIFORMLY FROM THE SIMPLEX (every profile is >= 0 and sums to 1)
+def sample_weight_profiles(n_profiles, n_metrics, rng):
+    return rng.dirichlet(np.ones(n_metrics), size=n_profiles)
+
+# RETURN (n_fighters, n_profiles) RANKS, 1 BEING THE HIGHEST SCORE OF THAT PROFILE
+def rank_positions(scores):
+    order = np.argsort(-scores, axis=0, kind='stable')
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, np.arange(1, scores.shape[0] + 1)[:, None], axis=0)
+    return ranks
+
+# RETURN PER-FIGHTER RANK TOTALS FOR ONE CHUNK OF RANDOM WEIGHT PROFILES (totals from different chunks can be added up)
+def sweep_chunk(scaled_metrics, n_profiles, seed, k):
+    rng = np.random.default_rng(seed)
+    weight_matrix = sample_weight_profiles(n_profiles, scaled_metrics.shape[1], rng)
+    ranks = rank_positions(score_weight_profiles(scaled_metrics, weight_matrix))
+
+    return {
+        'top_k_count': (ranks <= k).sum(axis=1),
+        'rank_sum': ranks.sum(axis=1).astype(float),
+        'rank_squared_sum': (ranks.astype(float) ** 2).sum(axis=1),
+        'best_rank': ranks.min(axis=1),
+        'worst_rank': ranks.max(axis=1),
+    }
+
+def merge_sweep_chunks(chunk_results):
+    merged = dict(chunk_results[0])
+    for chunk_result in chunk_results[1:]:
+        for total in ['top_k_count', 'rank_sum', 'rank_squared_sum']:
+            merged[total] = merged[total] + chunk_result[total]
+        merged['best_rank'] = np.minimum(merged['best_rank'], chunk_result['best_rank'])
+        merged['worst_rank'] = np.maximum(merged['worst_rank'], chunk_result['worst_rank'])
+    return merged
+
+# RETURN DATAFRAME W/ EACH FIGHTER'S RANK-STABILITY STATISTICS OVER n_profiles RANDOM WEIGHT PROFILES
+# profiles are scored chunk_size at a time so memory stays at (n_fighters x chunk_size), chunks run in parallel if n_jobs > 1
+# (and this isn't already a pool worker)
+# every chunk gets its own seed spawned from `seed`, so the result doesn't depend on n_jobs
+def weight_sensitivity_sweep(fighters, scaled_metrics, n_profiles=5000, chunk_size=500, k=10, seed=0, n_jobs=1):
+    chunk_sizes = [chunk_size] * (n_profiles // chunk_size)
+    if n_profiles % chunk_size:
+        chunk_sizes.append(n_profiles % chunk_size)
+    chunk_seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    if multiprocessing.parent_process() is not None:
+        n_jobs = 1 # already a worker of a pool that keeps the CPUs busy (e.g. the analyses of run_pipeline.py)
+    if n_jobs == 1:
+        chunk_results = [sweep_chunk(scaled_metrics, size, chunk_seed, k) for size, chunk_seed in zip(chunk_sizes, chunk_seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            chunk_results = list(executor.map(sweep_chunk, [scaled_metrics] * len(chunk_sizes), chunk_sizes, chunk_seeds, [k] * len(chunk_sizes)))
+
+    totals = merge_sweep_chunks(chunk_results)
+    mean_rank = totals['rank_sum'] / n_profiles
+
+    sweep_stats = pd.DataFrame({
+        'fighter': fighters,
+        f'top_{k}_frequency': totals['top_k_count'] / n_profiles,
+        'mean_rank': mean_rank,
+        'std_rank': np.sqrt(np.maximum(totals['rank_squared_sum'] / n_profiles - mean_rank ** 2, 0)),
+        'best_rank': totals['best_rank'],
+        'worst_rank': totals['worst_rank'],
+    })
+    return sweep_stats.sort_values(by=[f'top_{k}_frequency', 'mean_rank'], ascending=[False, True])
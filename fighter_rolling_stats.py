@@ -0,0 +1,222 @@
+"""
+Author: Jason Gill
+
+Description:
+This file derives each fighter's running averages (the `R_avg_*`/`B_avg_*` style features) directly from
+`raw_total_fight_data.csv`. Fights are sorted by date once and every average is computed with per-fighter cumulative
+sums, so each fight only sees the fights that came before it. Exponentially decayed averages and rolling-window averages
+are optional. New events can be added with `update_rolling_stats`, which only touches the new fights
+"""
+
+import argparse
+
+import pandas as pd
+import numpy as np
+
+import helper
+
+# per-fight stats (after helper.parse_raw_fight_stats) that get averaged for each fighter
+STAT_COLUMNS = [
+    'KD', 'SIG_STR_landed', 'SIG_STR_att', 'SIG_STR_pct', 'TOTAL_STR_landed', 'TOTAL_STR_att',
+    'TD_landed', 'TD_att', 'TD_pct', 'SUB_ATT', 'REV', 'CTRL',
+    'HEAD_landed', 'HEAD_att', 'BODY_landed', 'BODY_att', 'LEG_landed', 'LEG_att',
+    'DISTANCE_landed', 'DISTANCE_att', 'CLINCH_landed', 'CLINCH_att', 'GROUND_landed', 'GROUND_att'
+]
+AVERAGED_COLUMNS = STAT_COLUMNS + ['opp_' + column for column in STAT_COLUMNS]
+
+# RETURN LONG DATAFRAME W/ ONE ROW PER FIGHTER PER FIGHT (their own stats and their opponent's), SORTED BY DATE
+def fighter_fight_stats(raw_fights):
+    parsed_fights = helper.parse_raw_fight_stats(raw_fights)
+    fight_dates = pd.to_datetime(parsed_fights['date'], format='%B %d, %Y')
+
+    corner_frames = []
+    for corner, opponent_corner in [('R', 'B'), ('B', 'R')]:
+        corner_frame = pd.DataFrame({
+            'fight_index': parsed_fights.index,
+            'corner': corner,
+            'fighter': parsed_fights[corner + '_fighter'].to_numpy(),
+            'date': fight_dates.to_numpy(),
+        })
+        for column in STAT_COLUMNS:
+            corner_frame[column] = parsed_fights[corner + '_' + column].to_numpy(dtype=float)
+            corner_frame['opp_' + column] = parsed_fights[opponent_corner + '_' + column].to_numpy(dtype=float)
+        corner_frames.append(corner_frame)
+
+    # within a date the raw file lists the later fights first (early tournaments had several fights per fighter per night)
+    fighter_fights = pd.concat(corner_frames, ignore_index=True)
+    return fighter_fights.sort_values(by=['date', 'fight_index'], ascending=[True, False], ignore_index=True)
+
+# RETURN DATAFRAME (SAME ROWS AS fighter_fights) W/ EACH FIGHTER'S AVERAGES OVER THEIR PREVIOUS FIGHTS
+# NaN stats (e.g. "---" percentages) are skipped, and a fighter's debut gets NaN averages
+def running_averages(fighter_fights, ewm_alpha=None, window=None):
+    values = fighter_fights[AVERAGED_COLUMNS]
+    filled_values = values.fillna(0)
+    has_value = values.notna().astype(int)
+    fighters = fighter_fights['fighter']
+
+    # cumulative sums minus the current fight = totals over the previous fights only
+    previous_sums = filled_values.groupby(fighters).cumsum() - filled_values
+    previous_counts = has_value.groupby(fighters).cumsum() - has_value
+
+    averages = [
+        pd.DataFrame({'fights_before': fighter_fights.groupby('fighter').cumcount()}),
+        (previous_sums / previous_counts.replace(0, np.nan)).add_prefix('avg_'),
+    ]
+
+    if ewm_alpha is not None:
+        averages.append(exponential_averages(values, filled_values, has_value, fighters, ewm_alpha).add_prefix('ewm_'))
+
+    if window is not None:
+        # totals over the previous `window` fights = previous totals minus the ones from `window` fights earlier
+        window_sums = previous_sums - previous_sums.groupby(fighters).shift(window).fillna(0)
+        window_counts = previous_counts - previous_counts.groupby(fighters).shift(window).fillna(0)
+        averages.append((window_sums / window_counts.replace(0, np.nan)).add_prefix(f'last{window}_'))
+
+    return pd.concat(averages, axis=1)
+
+# RETURN EXPONENTIALLY DECAYED AVERAGES OVER THE PREVIOUS FIGHTS (same as pandas' ewm(alpha, ignore_na=True) shifted by one)
+# the newest fight gets weight 1, the one before (1 - ewm_alpha), then (1 - ewm_alpha)^2...
+def exponential_averages(values, filled_values, has_value, fighters, ewm_alpha):
+    # scaling the k-th value of a fighter by (1 - ewm_alpha)^-k turns the decayed sums into plain cumulative sums
+    # (the common factor cancels out when dividing by the decayed weights)
+    values_seen = has_value.groupby(fighters).cumsum()
+    with np.errstate(divide='ignore'):
+        largest_exponent = values_seen.to_numpy().max(initial=0) * -np.log(1 - ewm_alpha)
+
+    if largest_exponent > 700: # the scale factors would overflow - use pandas' own (slower) grouped ewm instead
+        ewm_means = values.groupby(fighters).ewm(alpha=ewm_alpha, ignore_na=True).mean().reset_index(level=0, drop=True).sort_index()
+        return ewm_means.groupby(fighters).shift()
+
+    scale = (1 - ewm_alpha) ** -values_seen
+    scaled_values = filled_values * scale
+    scaled_weights = has_value * scale
+
+    previous_scaled_sums = scaled_values.groupby(fighters).cumsum() - scaled_values
+    previous_scaled_weights = scaled_weights.groupby(fighters).cumsum() - scaled_weights
+    return previous_scaled_sums / previous_scaled_weights.replace(0, np.nan)
+
+# RETURN DATAFRAME W/ ONE ROW PER FIGHT (same order as raw_fights) AND THE R_/B_ PREFIXED PRE-FIGHT AVERAGES OF BOTH FIGHTERS
+def corner_features(fighter_fights, averages):
+    features = pd.concat([fighter_fights[['fight_index', 'corner']], averages], axis=1)
+
+    fight_features = []
+    for corner in ['R', 'B']:
+        corner_averages = features[features['corner'] == corner].drop(columns='corner').set_index('fight_index')
+        fight_features.append(corner_averages.add_prefix(corner + '_'))
+
+    return pd.concat(fight_features, axis=1).sort_index()
+
+# RETURN RAW FIGHT IDENTIFIERS + PRE-FIGHT AVERAGES OF BOTH FIGHTERS FOR EVERY FIGHT IN raw_fights
+def rolling_fighter_stats(raw_fights, ewm_alpha=None, window=None):
+    fighter_fights = fighter_fight_stats(raw_fights)
+    averages = running_averages(fighter_fights, ewm_alpha, window)
+    features = corner_features(fighter_fights, averages)
+    return raw_fights[['R_fighter', 'B_fighter', 'date', 'Winner']].join(features)
+
+# ------------------------------------------------------------------------------------------
+
+# INCREMENTAL UPDATES
+# the state holds, per fighter, the running sums/counts (and decayed sums/weights) over every fight so far as NumPy arrays
+# rolling windows would need each fighter's last `window` fights, so only the cumulative and decayed averages are kept
+def build_rolling_state(raw_fights, ewm_alpha=None):
+    fighter_fights = fighter_fight_stats(raw_fights)
+    fighter_fights = fighter_fights[fighter_fights['fighter'].notna()]
+
+    codes, fighter_names = pd.factorize(fighter_fights['fighter'])
+    values = fighter_fights[AVERAGED_COLUMNS].to_numpy()
+    has_value = ~np.isnan(values)
+    filled_values = np.where(has_value, values, 0.0)
+
+    state = {'ewm_alpha': ewm_alpha, 'fighter_rows': {}}
+    add_fighters_to_state(state, fighter_names)
+    np.add.at(state['fights'], codes, 1)
+    np.add.at(state['sums'], codes, filled_values)
+    np.add.at(state['counts'], codes, has_value)
+
+    if ewm_alpha is not None:
+        # each value has decayed once for every later (non-NaN) value of the same fighter
+        later_values = state['counts'][codes] - pd.DataFrame(has_value.astype(int)).groupby(codes).cumsum().to_numpy()
+        decay_weights = (1 - ewm_alpha) ** later_values
+        np.add.at(state['ewm_sums'], codes, decay_weights * filled_values)
+        np.add.at(state['ewm_weights'], codes, decay_weights * has_value)
+
+    return state
+
+def add_fighters_to_state(state, fighter_names):
+    new_fighters = [name for name in pd.unique(np.asarray(fighter_names, dtype=object)) if name not in state['fighter_rows']]
+    first_row = len(state['fighter_rows'])
+    state['fighter_rows'].update(zip(new_fighters, range(first_row, first_row + len(new_fighters))))
+
+    totals = ['sums', 'counts'] + (['ewm_sums', 'ewm_weights'] if state['ewm_alpha'] is not None else [])
+    for total in totals:
+        new_rows = np.zeros((len(new_fighters), len(AVERAGED_COLUMNS)))
+        state[total] = np.vstack([state[total], new_rows]) if total in state else new_rows
+    new_fights = np.zeros(len(new_fighters), dtype=np.int64)
+    state['fights'] = np.concatenate([state['fights'], new_fights]) if 'fights' in state else new_fights
+
+# RETURN PRE-FIGHT AVERAGES (same columns as rolling_fighter_stats) FOR THE NEW FIGHTS AND ADD THEM TO THE STATE
+# new fights are applied one event at a time, so the work done only depends on the number of new fights
+def update_rolling_stats(state, new_raw_fights):
+    ewm_alpha = state['ewm_alpha']
+    fighter_fights = fighter_fight_stats(new_raw_fights)
+    fighter_fights = fighter_fights[fighter_fights['fighter'].notna()]
+
+    add_fighters_to_state(state, fighter_fights['fighter'])
+    rows = fighter_fights['fighter'].map(state['fighter_rows']).to_numpy()
+    values = fighter_fights[AVERAGED_COLUMNS].to_numpy()
+    has_value = ~np.isnan(values)
+    filled_values = np.where(has_value, values, 0.0)
+
+    # a fighter's 2nd fight on the same night (tournaments) has to wait until their 1st one is in the state
+    fight_of_the_night = fighter_fights.groupby(['date', 'fighter']).cumcount()
+    batches = fighter_fights.groupby([fighter_fights['date'], fight_of_the_night], sort=True).ngroup().to_numpy()
+    batch_order = np.argsort(batches, kind='stable')
+    batch_starts = np.searchsorted(batches[batch_order], np.arange(batches.max() + 1 if len(batches) else 0))
+
+    fights_before = np.empty(len(rows), dtype=np.int64)
+    averages = np.empty(values.shape)
+    ewm_averages = np.empty(values.shape)
+
+    for positions in np.split(batch_order, batch_starts[1:]):
+        batch_rows = rows[positions]
+        fights_before[positions] = state['fights'][batch_rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averages[positions] = state['sums'][batch_rows] / state['counts'][batch_rows] # 0 / 0 -> NaN for debuts
+
+        state['fights'][batch_rows] += 1
+        state['sums'][batch_rows] += filled_values[positions]
+        state['counts'][batch_rows] += has_value[positions]
+
+        if ewm_alpha is not None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ewm_averages[positions] = state['ewm_sums'][batch_rows] / state['ewm_weights'][batch_rows]
+
+            # older fights decay by (1 - ewm_alpha) each time a new (non-NaN) value comes in
+            decay = np.where(has_value[positions], 1 - ewm_alpha, 1.0)
+            state['ewm_sums'][batch_rows] = state['ewm_sums'][batch_rows] * decay + filled_values[positions]
+            state['ewm_weights'][batch_rows] = state['ewm_weights'][batch_rows] * decay + has_value[positions]
+
+    new_averages = [
+        pd.DataFrame({'fights_before': fights_before}, index=fighter_fights.index),
+        pd.DataFrame(averages, columns=AVERAGED_COLUMNS, index=fighter_fights.index).add_prefix('avg_'),
+    ]
+    if ewm_alpha is not None:
+        new_averages.append(pd.DataFrame(ewm_averages, columns=AVERAGED_COLUMNS, index=fighter_fights.index).add_prefix('ewm_'))
+
+    features = corner_features(fighter_fights, pd.concat(new_averages, axis=1))
+    return new_raw_fights[['R_fighter', 'B_fighter', 'date', 'Winner']].join(features)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Derive each fighter\'s running averages before every fight from the raw fight data')
+    parser.add_argument('--ewm-alpha', type=float, default=0.3, help='decay of the exponentially weighted averages')
+    parser.add_argument('--window', type=int, default=3, help='number of past fights in the rolling-window averages')
+    args = parser.parse_args(argv)
+
+    raw_fights = helper.load_dataset('data_sets/raw_total_fight_data.csv', sep=';')
+
+    rolling_stats = rolling_fighter_stats(raw_fights, ewm_alpha=args.ewm_alpha, window=args.window)
+    rolling_stats.to_csv('data_sets/rolling_fighter_stats.csv', index=False)
+    print(rolling_stats.head())
+
+if __name__=='__main__':
+    main()
@@ -8,8 +8,25 @@ This files contains various functions that help with further preprocessing and p
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import json
+import hashlib
+import pickle
+
+import density
+import plot_rendering
+import quantile_sketch
+
+try:
+    import pyarrow # noqa: F401 (only needed so pandas can write parquet files)
+    DATASET_CACHE_FORMAT = 'parquet'
+except ImportError:
+    DATASET_CACHE_FORMAT = 'pickle' # pyarrow isn't installed - fall back to pandas' own binary format
+
+DATASET_CACHE_FOLDER = 'data_sets/cache'
+LOADED_DATASETS = {} # datasets already loaded by this process, so analyses run together share one copy
+COMPACT_DATASETS = False # True makes load_dataset shrink every dataset w/ compact_dtypes (run_pipeline.py --compact)
+DATASET_MEMORY_USAGE = {} # memory before/after compact_dtypes of every dataset loaded compactly
 
 def fill_na_with_median(df, column_name):
     median = df[column_name].median()
@@ -39,131 +56,388 @@ def create_folder(folder_path):
 
 # ------------------------------------------------------------------------------------------
 
+# INCREMENTAL PREPROCESSING
+# the state is a small dict w/ a mergeable quantile sketch of every numerical column (as it was before filling) so the
+# medians can be kept up to date without re-reading the whole history, and the size of the preprocessed CSV and number of
+# keys it was saved w/. The 64-bit hashes of the keys of every row already preprocessed are kept apart in an append-only
+# <state_path>.keys file, so saving after an append only writes the new keys and the sketches
+def key_hashes(df, key_columns):
+    return pd.util.hash_pandas_object(df[key_columns].astype(str).astype(object), index=False).to_numpy(dtype=np.uint64)
+
+def build_preprocessing_state(df, key_columns):
+    numerical_columns = df.select_dtypes(include=['number']).columns
+    return {
+        'columns': list(df.columns),
+        'key_columns': key_columns,
+        'sketches': {column: quantile_sketch.update_sketch(quantile_sketch.new_quantile_sketch(), df[column].to_numpy()) for column in numerical_columns},
+        'integer_columns': [column for column in numerical_columns if pd.api.types.is_integer_dtype(df[column])],
+        'csv_size': 0,
+        'n_keys': 0,
+        'keys': np.empty(0, dtype=np.uint64), # keys already in the .keys file
+        'new_keys': key_hashes(df, key_columns), # keys not written to it yet
+    }
+
+# the state file is replaced in one step after csv_path has been written, so it is what commits an append: a run that
+# stopped between the two writes leaves extra rows and keys behind that load_preprocessing_state cuts off again
+def save_preprocessing_state(state, state_path, csv_path):
+    keys_path = f'{state_path}.keys'
+    with open(keys_path, 'ab' if state['n_keys'] else 'wb') as keys_file:
+        keys_file.write(state['new_keys'].tobytes())
+    state['keys'] = np.concatenate([state['keys'], state['new_keys']])
+    state['new_keys'] = np.empty(0, dtype=np.uint64)
+    state['n_keys'] = len(state['keys'])
+    state['csv_size'] = os.path.getsize(csv_path)
+
+    temporary_path = f'{state_path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as state_file:
+        pickle.dump({key: value for key, value in state.items() if key not in ['keys', 'new_keys']}, state_file)
+    os.replace(temporary_path, state_path)
+
+def remove_preprocessing_state(state_path):
+    if os.path.exists(state_path):
+        os.remove(state_path) # a full rebuild that stops halfway then leaves no state that could undo it
+
+def load_preprocessing_state(state_path, csv_path):
+    if not os.path.exists(state_path) or not os.path.exists(csv_path):
+        return None
+    with open(state_path, 'rb') as state_file:
+        state = pickle.load(state_file)
+
+    keys_path = f'{state_path}.keys'
+    for path, size in [(csv_path, state['csv_size']), (keys_path, state['n_keys'] * np.dtype(np.uint64).itemsize)]:
+        if os.path.getsize(path) > size:
+            os.truncate(path, size) # left behind by an append that stopped before its state was saved
+    state['keys'] = np.fromfile(keys_path, dtype=np.uint64)
+    state['new_keys'] = np.empty(0, dtype=np.uint64)
+    return state
+
+# RETURN ONLY THE ROWS OF new_df THAT AREN'T IN THE STATE YET, W/ NaN FILLED USING THE UPDATED RUNNING MEDIANS
+# (exact while a column has at most quantile_sketch.SKETCH_EXACT_VALUES distinct values, otherwise within 1%)
+def preprocess_new_rows(state, new_df):
+    new_keys = key_hashes(new_df, state['key_columns'])
+    keep = ~np.isin(new_keys, state['keys']) & ~pd.Series(new_keys).duplicated().to_numpy()
+    new_df = new_df[keep].copy()
+
+    for column, sketch in state['sketches'].items():
+        state['sketches'][column] = quantile_sketch.update_sketch(sketch, new_df[column].to_numpy())
+        new_df[column] = new_df[column].fillna(value=quantile_sketch.sketch_quantile(state['sketches'][column], 0.5))
+
+        if column in state['integer_columns'] and (new_df[column] % 1 == 0).all():
+            new_df[column] = new_df[column].astype(np.int64) # keep whole number columns as ints in the CSV
+
+    state['new_keys'] = np.concatenate([state['new_keys'], new_keys[keep]])
+    return new_df.reindex(columns=state['columns'])
+
+# ------------------------------------------------------------------------------------------
+
+def file_sha1(file_path):
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+def read_cached_dataset(cache_path):
+    if DATASET_CACHE_FORMAT == 'parquet':
+        return pd.read_parquet(cache_path)
+    return pd.read_pickle(cache_path)
+
+# the cache files are written to a temporary file and then replaced in one step, so an analysis loading the dataset at
+# the same time (or after a crash) never reads a half-written file
+def write_cached_dataset(df, cache_path):
+    temporary_path = f'{cache_path}.{os.getpid()}.tmp'
+    # the string columns are kept as they are instead of being cast to category: parquet already dictionary-encodes the
+    # repeated strings (names, weight classes, dates...) on disk, and category columns would change what every analysis
+    # gets back (run_pipeline.py --compact converts them in memory w/ compact_dtypes)
+    if DATASET_CACHE_FORMAT == 'parquet':
+        df.to_parquet(temporary_path)
+    else:
+        df.to_pickle(temporary_path, compression=None)
+    os.replace(temporary_path, cache_path)
+
+def write_cache_metadata(metadata, metadata_path):
+    temporary_path = f'{metadata_path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'w') as metadata_file:
+        json.dump(metadata, metadata_file)
+    os.replace(temporary_path, metadata_path)
+
+# RETURN DATAFRAME FOR A CSV, READ FROM A COLUMNAR CACHE THAT IS REBUILT WHENEVER THE CSV CHANGES
+# compact=True shrinks the dtypes w/ compact_dtypes (None uses COMPACT_DATASETS), cache=False just reads the CSV (for
+# one-off files like the ones scored w/ --predict, which shouldn't fill up the cache folder)
+def load_dataset(csv_path, sep=',', compact=None, cache=True):
+    if not cache:
+        return pd.read_csv(csv_path, sep=sep)
+    create_folder(DATASET_CACHE_FOLDER)
+    if compact is None:
+        compact = COMPACT_DATASETS
+
+    source = {'path': os.path.abspath(csv_path), 'sep': sep, 'format': DATASET_CACHE_FORMAT}
+    csv_stat = os.stat(csv_path)
+
+    # each caller gets its own copy since the analyses add/drop columns on the frames they load
+    loaded_key = (source['path'], sep, compact, csv_stat.st_size, csv_stat.st_mtime_ns)
+    if loaded_key in LOADED_DATASETS:
+        return LOADED_DATASETS[loaded_key].copy()
+
+    df = load_dataset_from_cache(csv_path, sep, source, csv_stat)
+    if compact:
+        compact_df = compact_dtypes(df)
+        DATASET_MEMORY_USAGE[source['path']] = compare_memory_usage(df, compact_df)
+        df = compact_df
+
+    for stale_key in [key for key in LOADED_DATASETS if key[:3] == loaded_key[:3]]:
+        del LOADED_DATASETS[stale_key] # the CSV was rewritten since it was last loaded
+    LOADED_DATASETS[loaded_key] = df
+    return df.copy()
+
+def load_dataset_from_cache(csv_path, sep, source, csv_stat):
+    # named after the CSV and a hash of its absolute path, so CSVs w/ the same name in different folders get their own cache
+    path_hash = hashlib.sha1(source['path'].encode()).hexdigest()[:10]
+    cache_name = os.path.splitext(os.path.basename(csv_path))[0] + '_' + path_hash
+    cache_path = os.path.join(DATASET_CACHE_FOLDER, cache_name + '.' + DATASET_CACHE_FORMAT)
+    metadata_path = os.path.join(DATASET_CACHE_FOLDER, cache_name + '.json')
+
+    metadata = None
+    if os.path.exists(metadata_path) and os.path.exists(cache_path):
+        with open(metadata_path) as metadata_file:
+            metadata = json.load(metadata_file)
+
+    if metadata is not None and metadata['source'] == source:
+        # same size and mtime => unchanged, otherwise only trust the cache if the contents hash the same
+        if metadata['size'] == csv_stat.st_size and metadata['mtime_ns'] == csv_stat.st_mtime_ns:
+            return read_cached_dataset(cache_path)
+
+        sha1 = file_sha1(csv_path)
+        if metadata['sha1'] == sha1:
+            metadata.update({'size': csv_stat.st_size, 'mtime_ns': csv_stat.st_mtime_ns})
+            write_cache_metadata(metadata, metadata_path)
+            return read_cached_dataset(cache_path)
+    else:
+        sha1 = file_sha1(csv_path)
+
+    # cache is missing or stale - parse the CSV once and store the typed columns
+    df = pd.read_csv(csv_path, sep=sep)
+    write_cached_dataset(df, cache_path)
+
+    metadata = {'source': source, 'sha1': sha1, 'size': csv_stat.st_size, 'mtime_ns': csv_stat.st_mtime_ns}
+    write_cache_metadata(metadata, metadata_path)
+
+    return df
+
+# ------------------------------------------------------------------------------------------
+
+# MEMORY-COMPACT DTYPES
+# floats become float32, integers the smallest int type and repeated strings (names, weight classes, referees...)
+# become category, but a column is only converted if every value comes back unchanged when converted back
+CATEGORY_MAX_UNIQUE_RATIO = 0.5 # at most 1 distinct value per 2 rows, otherwise the categories cost more than they save
+
+# RETURN SMALLEST INTEGER DTYPE THAT HOLDS TWICE THE COLUMN'S RANGE
+# (the analyses add the red and blue corner columns together, which must not overflow)
+def smallest_integer_dtype(column):
+    low = 2 * min(int(column.min()), 0)
+    high = 2 * max(int(column.max()), 0)
+    for dtype in [np.int8, np.int16, np.int32]:
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def compact_column(column):
+    if len(column) == 0 or pd.api.types.is_bool_dtype(column):
+        return column
+
+    if pd.api.types.is_integer_dtype(column) and isinstance(column.dtype, np.dtype):
+        compacted = column.astype(smallest_integer_dtype(column))
+    elif pd.api.types.is_float_dtype(column) and column.dtype == np.float64:
+        compacted = column.astype(np.float32)
+    elif pd.api.types.is_string_dtype(column) and column.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(column):
+        compacted = column.astype('category')
+    else:
+        return column
+
+    # downcast check - keep the original column unless converting back gives exactly the same values (NaN included)
+    if not compacted.astype(column.dtype).equals(column):
+        return column
+    return compacted
+
+# RETURN DATAFRAME W/ EVERY COLUMN IN THE SMALLEST DTYPE THAT LOSES NO VALUES
+def compact_dtypes(df):
+    return pd.DataFrame({column: compact_column(df[column]) for column in df.columns}, index=df.index)
+
+# RETURN DICT W/ THE MEMORY (MB, strings included) OF A DATAFRAME BEFORE AND AFTER compact_dtypes
+def compare_memory_usage(original_df, compact_df):
+    before_mb = original_df.memory_usage(deep=True).sum() / 2**20
+    after_mb = compact_df.memory_usage(deep=True).sum() / 2**20
+    return {
+        'rows': len(original_df),
+        'columns_compacted': int((original_df.dtypes != compact_df.dtypes).sum()),
+        'before_mb': before_mb,
+        'after_mb': after_mb,
+        'saved_pct': 100 * (1 - after_mb / before_mb) if before_mb else 0.0,
+    }
+
+# RETURN DATAFRAME W/ THE MEMORY SAVED ON EVERY DATASET LOADED COMPACTLY SO FAR
+def memory_usage_report():
+    report = pd.DataFrame.from_dict(DATASET_MEMORY_USAGE, orient='index')
+    report.index = [os.path.basename(path) for path in report.index]
+    return report.rename_axis('dataset')
+
+# ------------------------------------------------------------------------------------------
+
 # RETURN DATAFRAME W/ FIGHTER NAMES, WINS, LOSSES, WIN RATIO
 def fighter_win_loss_stats(preprocessed_data_csv):
-    fights_df = pd.read_csv(preprocessed_data_csv)
+    fights_df = load_dataset(preprocessed_data_csv)
+    return fighter_win_loss_stats_from_df(fights_df)
+
+def fighter_win_loss_stats_from_df(fights_df):
     preprocessed_data_without_draws = further_preprocessing_for_removing_draws(fights_df)
 
-    win_count_map = {}
-    lose_count_map = {}
+    winner_is_blue = (preprocessed_data_without_draws['Winner'].str[0] == 'B').to_numpy()
+    red_names = preprocessed_data_without_draws['R_fighter'].to_numpy()
+    blue_names = preprocessed_data_without_draws['B_fighter'].to_numpy()
 
-    for index, row in preprocessed_data_without_draws.iterrows():
-        winner = row['Winner'][0]
-        loser = 'B' # default value checked in following conditional
+    winner_names = np.where(winner_is_blue, blue_names, red_names)
+    loser_names = np.where(winner_is_blue, red_names, blue_names)
 
-        if (winner == 'B'):
-            loser = 'R'
+    # encode every fighter as an integer code - sorting the names gives the same row order as an outer merge on 'Name'
+    codes, names = pd.factorize(np.concatenate([winner_names, loser_names]), sort=True)
+    winner_codes = codes[:len(winner_names)]
+    loser_codes = codes[len(winner_names):]
 
-        winner_name = row[winner + "_fighter"]
-        loser_name = row[loser + "_fighter"]
+    # count wins/losses per fighter code (code -1 marks a missing name)
+    win_count = np.bincount(winner_codes[winner_codes >= 0], minlength=len(names))
+    lose_count = np.bincount(loser_codes[loser_codes >= 0], minlength=len(names))
 
-        win_count_map[winner_name] = win_count_map.get(winner_name, 0) + 1  # if it exists increment by 1, if not init to 1
-        lose_count_map[loser_name] = lose_count_map.get(loser_name, 0) + 1  # to track the amount of losses for a winner later on
-        
     # contains names and win/lose counts (each fighter will be a datapoint)
-    win_count_df = pd.DataFrame(list(win_count_map.items()), columns=['Name', 'Win_count']) # contains winner names and no. of wins
-    lose_count_df = pd.DataFrame(list(lose_count_map.items()), columns=['Name', 'Lose_count']) #
-
-    fighter_data = win_count_df.merge(lose_count_df, on='Name', how='outer')
-    fighter_data['Lose_count'] = fighter_data['Lose_count'].fillna(0) # if name not found in losses map, default to 0 losses
-    fighter_data['Win_count'] = fighter_data['Win_count'].fillna(0) # if name not found in wins map, default to 0 wins
+    fighter_data = pd.DataFrame({'Name': names, 'Win_count': win_count.astype(float), 'Lose_count': lose_count.astype(float)})
     fighter_data['Win_ratio'] = fighter_data['Win_count'] / (fighter_data['Win_count'] + fighter_data['Lose_count'])
-    
+
     return fighter_data
 
 # ------------------------------------------------------------------------------------------
 
 # RETURN DATAFRAME W/ FIGHTER NAMES, WINS, LOSSES, WIN RATIO, STANCE
 def fighter_win_loss_stats_with_stance(preprocessed_data_csv):
-    
-    df = pd.read_csv(preprocessed_data_csv)
+    df = load_dataset(preprocessed_data_csv)
+    return fighter_win_loss_stats_with_stance_from_df(df)
+
+def fighter_win_loss_stats_with_stance_from_df(df):
     preprocessed_data_for_stance_analysis = further_preprocessing_for_stance_analysis(df)
-    
-    # Extract stances and names of all the winners
-    winners_info = []
-    losers_info = []
-    win_count_map = {}
-    lose_count_map = {}
-
-    for index, row in preprocessed_data_for_stance_analysis.iterrows():
-        winner = row['Winner'][0]
-        loser = 'B' # default value checked in following conditional
-
-        if (winner == 'B'):
-            loser = 'R'
-
-        winner_name = row[winner + "_fighter"]
-        winner_stance = row[winner + "_Stance"]
-
-        loser_name = row[loser + "_fighter"]
-        loser_stance = row[loser + "_Stance"]
-
-        win_count_map[winner_name] = win_count_map.get(winner_name, 0) + 1  # if it exists increment by 1, if not init to 1
-        lose_count_map[loser_name] = lose_count_map.get(loser_name, 0) + 1  # to track the amount of losses for a winner later on
-
-        winners_info.append({"Name": winner_name, "Stance": winner_stance})
-        losers_info.append({"Name": loser_name, "Stance": loser_stance})
-        
-    winners_df = pd.DataFrame(winners_info) # contains winner names and stances
-    losers_df = pd.DataFrame(losers_info) # similar to above comment
-    winners_df.drop_duplicates(inplace=True)
-    losers_df.drop_duplicates(inplace=True)
-    
-    # contains names and win/lose counts (each fighter will be a datapoint)
-    win_count_df = pd.DataFrame(list(win_count_map.items()), columns=['Name', 'Win_count']) # contains winner names and no. of wins
-    lose_count_df = pd.DataFrame(list(lose_count_map.items()), columns=['Name', 'Lose_count']) #
-    
-    winners_and_count = winners_df.merge(win_count_df, on='Name') # merges winner's stances and win counts into single df
-    losers_and_count = losers_df.merge(lose_count_df, on='Name')
-    
-    fighter_data = pd.merge(winners_and_count, losers_and_count, on=['Name', 'Stance'], how='outer') # combined df with all fighters stances and win/lose counts
-    fighter_data['Lose_count'] = fighter_data['Lose_count'].fillna(0) # if name not found in losses map, default to 0 losses
-    fighter_data['Win_count'] = fighter_data['Win_count'].fillna(0) # if name not found in wins map, default to 0 wins
+
+    winner_is_blue = (preprocessed_data_for_stance_analysis['Winner'].str[0] == 'B').to_numpy()
+
+    # melt the red and blue corners into one long frame (one row per fighter per fight)
+    fighter_fights = pd.DataFrame({
+        'Name': np.concatenate([preprocessed_data_for_stance_analysis['R_fighter'].to_numpy(), preprocessed_data_for_stance_analysis['B_fighter'].to_numpy()]),
+        'Stance': np.concatenate([preprocessed_data_for_stance_analysis['R_Stance'].to_numpy(), preprocessed_data_for_stance_analysis['B_Stance'].to_numpy()]),
+        'Won': np.concatenate([~winner_is_blue, winner_is_blue]),
+    })
+
+    # single groupby over (Name, Stance) - rows come out sorted the same way as an outer merge on those keys
+    stance_counts = fighter_fights.groupby(['Name', 'Stance'])['Won'].agg(['sum', 'count']).reset_index()
+    stance_wins = stance_counts['sum'].to_numpy()
+    stance_losses = stance_counts['count'].to_numpy() - stance_wins
+
+    # a fighter's win/lose counts are their totals over every stance, but only listed under stances they won/lost with
+    total_wins = stance_counts.groupby('Name')['sum'].transform('sum').to_numpy()
+    total_losses = stance_counts.groupby('Name')['count'].transform('sum').to_numpy() - total_wins
+
+    fighter_data = stance_counts[['Name', 'Stance']].copy()
+    fighter_data['Win_count'] = np.where(stance_wins > 0, total_wins, 0).astype(float)
+    fighter_data['Lose_count'] = np.where(stance_losses > 0, total_losses, 0).astype(float)
     fighter_data['Win_ratio'] = fighter_data['Win_count'] / (fighter_data['Win_count'] + fighter_data['Lose_count'])
 
     return fighter_data
 
 # ------------------------------------------------------------------------------------------
 
+# "X of Y" (landed of attempted), "NN%" and "MM:SS" columns of raw_total_fight_data.csv
+LANDED_OF_ATTEMPTED_COLUMNS = [
+    'R_SIG_STR.', 'B_SIG_STR.', 'R_TOTAL_STR.', 'B_TOTAL_STR.', 'R_TD', 'B_TD',
+    'R_HEAD', 'B_HEAD', 'R_BODY', 'B_BODY', 'R_LEG', 'B_LEG',
+    'R_DISTANCE', 'B_DISTANCE', 'R_CLINCH', 'B_CLINCH', 'R_GROUND', 'B_GROUND'
+]
+PERCENTAGE_COLUMNS = ['R_SIG_STR_pct', 'B_SIG_STR_pct', 'R_TD_pct', 'B_TD_pct']
+TIME_COLUMNS = ['R_CTRL', 'B_CTRL', 'last_round_time']
+
+def parse_landed_of_attempted(columns_df):
+    # all columns are flattened into one array so the strings are only walked once
+    values = columns_df.to_numpy().ravel(order='F')
+    n_rows = len(columns_df)
+
+    try:
+        # fast path: every value is "X of Y", so joining on ' of ' and splitting again leaves X, Y, X, Y, ...
+        numbers = np.array(' of '.join(values).split(' of '), dtype=np.int64)
+        if len(numbers) != 2 * len(values):
+            raise ValueError('unexpected "X of Y" format')
+        landed, attempted = numbers[0::2], numbers[1::2]
+    except (TypeError, ValueError):
+        # slow path for missing or malformed values, which become NaN
+        landed_and_attempted = pd.Series(values, dtype=object).str.extract(r'^(\d+) of (\d+)$').apply(pd.to_numeric)
+        landed, attempted = landed_and_attempted[0].to_numpy(), landed_and_attempted[1].to_numpy()
+
+    return landed.reshape(columns_df.shape[1], n_rows), attempted.reshape(columns_df.shape[1], n_rows)
+
+def parse_percentage(column):
+    return pd.to_numeric(column.str.rstrip('%'), errors='coerce') / 100.0 # "---" (nothing attempted) becomes NaN
+
+def parse_minutes_seconds(column):
+    minutes_and_seconds = column.str.extract(r'^(\d+):(\d+)$').apply(pd.to_numeric) # "--" becomes NaN
+    return minutes_and_seconds[0] * 60 + minutes_and_seconds[1]
+
+# RETURN RAW FIGHT DATAFRAME W/ STRING STATS CONVERTED TO NUMBERS
+# "41 of 103" -> <column>_landed = 41, <column>_att = 103 ; "39%" -> 0.39 ; "1:15" -> 75 (seconds)
+def parse_raw_fight_stats(df):
+    strike_columns = [column for column in LANDED_OF_ATTEMPTED_COLUMNS if column in df.columns]
+    landed, attempted = parse_landed_of_attempted(df[strike_columns])
+
+    parsed_columns = {}
+    for column in df.columns:
+        if column in strike_columns:
+            position = strike_columns.index(column)
+            column_prefix = column.rstrip('.')
+            parsed_columns[column_prefix + '_landed'] = landed[position]
+            parsed_columns[column_prefix + '_att'] = attempted[position]
+        elif column in PERCENTAGE_COLUMNS:
+            parsed_columns[column] = parse_percentage(df[column]).to_numpy()
+        elif column in TIME_COLUMNS:
+            parsed_columns[column] = parse_minutes_seconds(df[column]).to_numpy()
+        else:
+            parsed_columns[column] = df[column].to_numpy()
+
+    return pd.DataFrame(parsed_columns, index=df.index)
+
+# ------------------------------------------------------------------------------------------
+
 # RETURN DATAFRAME W/ FIGHT HEAD STRIKES, BODY STRIKES, LEG STRIKES OF WINNING FIGHTERS OF EACH MATCH
 def fight_strike_stats_for_winners(raw_total_fight_data_csv):
-    df = pd.read_csv(raw_total_fight_data_csv, sep=';')
+    df = load_dataset(raw_total_fight_data_csv, sep=';')
     df = further_preprocessing_for_removing_draws(df)
 
     numerical_columns = df.select_dtypes(include=['number'])
     for column in numerical_columns:
         fill_na_with_median(df, column)
 
-    winner_strike_stats = []
-    for index, row in df.iterrows():
-        winner_name = row['Winner']
-        winner_colour = ''
+    df = parse_raw_fight_stats(df) # only the strikes that landed are used below
 
-        if (winner_name == row['R_fighter']):
-            winner_colour = 'R'
-        else:
-            winner_colour = 'B'
+    winner_is_red = (df['Winner'] == df['R_fighter']).to_numpy()
 
-        winner_head_strikes = row[winner_colour + "_HEAD"]
-        winner_body_strikes = row[winner_colour + "_BODY"]
-        winner_leg_strikes = row[winner_colour + "_LEG"]
+    winner_strike_stats = pd.DataFrame({
+        "Name": df['Winner'],
+        "Head_strikes": np.where(winner_is_red, df['R_HEAD_landed'], df['B_HEAD_landed']),
+        "Body_strikes": np.where(winner_is_red, df['R_BODY_landed'], df['B_BODY_landed']),
+        "Leg_strikes": np.where(winner_is_red, df['R_LEG_landed'], df['B_LEG_landed']),
+        "Distance_strikes": np.where(winner_is_red, df['R_DISTANCE_landed'], df['B_DISTANCE_landed']),
+        "Clinch_strikes": np.where(winner_is_red, df['R_CLINCH_landed'], df['B_CLINCH_landed']),
+        "Ground_strikes": np.where(winner_is_red, df['R_GROUND_landed'], df['B_GROUND_landed']),
+    })
 
-        winner_strike_stats.append({"Name": winner_name, "Head_strikes": winner_head_strikes, "Body_strikes": winner_body_strikes, "Leg_strikes": winner_leg_strikes})
-    
-    winner_strike_stats = pd.DataFrame(winner_strike_stats)
-    
-    # removing attempted strikes from the expression - we only care about the strikes that landed
-    winner_strike_stats['Head_strikes'] = winner_strike_stats['Head_strikes'].str.split(' ').str[0].astype(int)
-    winner_strike_stats['Body_strikes'] = winner_strike_stats['Body_strikes'].str.split(' ').str[0].astype(int)
-    winner_strike_stats['Leg_strikes'] = winner_strike_stats['Leg_strikes'].str.split(' ').str[0].astype(int)
-    
-    return winner_strike_stats # contains winner names and strike stats
+    return winner_strike_stats # contains winner names and strike stats (by target and by position)
 
 # ------------------------------------------------------------------------------------------
 
 # RETURN DATAFRAME W/ RED AND BLUE WINS SEPERATED
 def seperate_colour_wins(preprocessed_data_csv):
-    df = pd.read_csv(preprocessed_data_csv)
+    df = load_dataset(preprocessed_data_csv)
     fight_data = further_preprocessing_for_removing_draws(df)
     red_wins = fight_data[fight_data['Winner'] == 'Red']
     blue_wins = fight_data[fight_data['Winner'] == 'Blue']
@@ -172,85 +446,90 @@ def seperate_colour_wins(preprocessed_data_csv):
 
 # ------------------------------------------------------------------------------------------
 
-def draw_stance_plots(types_list):
+# figure functions, rendered (and skipped when their data hasn't changed) by plot_rendering
+# the KDE curves of the histograms come from density.kde_curves (cut=0 like histplot's kde=True)
+def stance_figure(types_list, curves):
     # Create histograms
-    plt.figure(figsize=(12, 8))
+    fig = plt.figure(figsize=(12, 8))
 
     plt.subplot(2, 3, 1)
-    sns.histplot(types_list[0], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[0], curves[0])
     plt.title('Orthodox Stance')
 
     plt.subplot(2, 3, 2)
-    sns.histplot(types_list[1], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[1], curves[1])
     plt.title('Southpaw Stance')
 
     plt.subplot(2, 3, 3)
-    sns.histplot(types_list[2], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[2], curves[2])
     plt.title('Switch Stance')
 
     plt.subplot(2, 3, 4)
-    sns.histplot(types_list[3], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[3], curves[3])
     plt.title('Open Stance')
 
     plt.subplot(2, 3, 5)
-    sns.histplot(types_list[4], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[4], curves[4])
     plt.title('Sideways Stance')
 
     plt.tight_layout()
+    return fig
 
-    plt.savefig('plots/stance_win_plots.png', bbox_inches='tight')
-    # plt.show()
+def draw_stance_plots(types_list):
+    plot_rendering.render_plot(stance_figure, 'plots/stance_win_plots.png', types_list, density.kde_curves(types_list, cut=0))
 
-def draw_strike_plots(types_list):
+def strike_figure(types_list, curves):
     # Create histograms
-    plt.figure(figsize=(12, 8))
+    fig = plt.figure(figsize=(12, 8))
 
     plt.subplot(1, 3, 1)
-    sns.histplot(types_list[0], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[0], curves[0])
     plt.title('Head strike counts in Head-strike heavy wins')
 
     plt.subplot(1, 3, 2)
-    sns.histplot(types_list[1], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[1], curves[1])
     plt.title('Body strike counts in Body-strike heavy wins')
 
     plt.subplot(1, 3, 3)
-    sns.histplot(types_list[2], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[2], curves[2])
     plt.title('Leg strike counts in Leg-strike heavy wins')
 
     plt.tight_layout()
+    return fig
 
-    plt.savefig('plots/strike_types_plot.png', bbox_inches='tight')
-    # plt.show()
+def draw_strike_plots(types_list):
+    plot_rendering.render_plot(strike_figure, 'plots/strike_types_plot.png', types_list, density.kde_curves(types_list, cut=0))
 
-def draw_colour_wins_plots(types_list):
+def colour_wins_figure(types_list, curves):
     # Create histograms
-    plt.figure(figsize=(12, 8))
+    fig = plt.figure(figsize=(12, 8))
 
     plt.subplot(2, 2, 1)
-    sns.histplot(types_list[0], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[0], curves[0])
     plt.title('Red wins per event')
 
     plt.subplot(2, 2, 2)
-    sns.histplot(types_list[1], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[1], curves[1])
     plt.title('Blue wins per event')
 
     plt.subplot(2, 2, 3)
-    sns.histplot(types_list[2], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[2], curves[2])
     plt.title('Red wins per event (sqrt)')
 
     plt.subplot(2, 2, 4)
-    sns.histplot(types_list[3], kde=True)
+    density.histogram_with_curve(plt.gca(), types_list[3], curves[3])
     plt.title('Blue wins per event (sqrt)')
 
     plt.tight_layout()
+    return fig
 
-    plt.savefig('plots/colour_wins_plot.png', bbox_inches='tight')
-    # plt.show()
+def draw_colour_wins_plots(types_list):
+    plot_rendering.render_plot(colour_wins_figure, 'plots/colour_wins_plot.png', types_list, density.kde_curves(types_list, cut=0))
 
-def plot_win_ratio_predictor(X_valid, y_valid, y_pred):
+def win_ratio_predictor_figure(X_valid, y_valid, y_pred):
     X_range = np.arange(0, X_valid.shape[0]).reshape(-1, 1)
     
-    plt.figure(figsize=(20, 6))
+    fig = plt.figure(figsize=(20, 6))
     plt.plot(X_range, y_valid, color='blue', label='True values')
     plt.plot(X_range, y_pred, color='red', label='Predicted values', alpha=0.5)
 
@@ -260,6 +539,7 @@ def plot_win_ratio_predictor(X_valid, y_valid, y_pred):
     plt.title('KNN Regression: True vs Predicted values')
 
     plt.gca().set_aspect(125, adjustable='box')  # Adjust the aspect ratio
+    return fig
 
-    plt.savefig('plots/win_ratio_predictor_plot', bbox_inches='tight')
-    # plt.show()
\ No newline at end of file
+def plot_win_ratio_predictor(X_valid, y_valid, y_pred):
+    plot_rendering.render_plot(win_ratio_predictor_figure, 'plots/win_ratio_predictor_plot.png', X_valid, y_valid, y_pred)
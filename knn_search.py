@@ -0,0 +1,130 @@
+"""
+Author: Jason Gill
+
+Description:
+This file replaces the hand-picked k of fight_result_predictor.py ("50 or 100 seem to work pretty well") and
+win_ratio_predictor.py ("5 seems to give best results") with a cross-validated search over k, the neighbour weighting
+and the scaler. Each fold's nearest neighbours are searched once at the largest k: the neighbours of any smaller k are
+the first k columns of that result, so every k/weighting is scored from the same neighbour graph instead of refitting.
+The (fold, scaler) pairs are spread over a process pool. The best configuration of each predictor is saved w/
+model_artifacts.save_knn_config, and the predictors train w/ it from then on
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.neighbors import NearestNeighbors
+
+import fight_result_predictor
+import model_artifacts
+import win_ratio_predictor
+
+SCALERS = model_artifacts.KNN_SCALERS
+WEIGHTS = ['uniform', 'distance']
+K_VALUES = list(range(1, 10, 2)) + list(range(10, 101, 5))
+
+# RETURN (n_valid, max_k) NEIGHBOUR WEIGHTS, SAME RULES AS sklearn'S weights='distance'
+# (1 / distance, but a point w/ an exact match only listens to its exact matches)
+def distance_weights(distances):
+    with np.errstate(divide='ignore'):
+        weights = 1 / distances
+    exact_match = distances[:, 0] == 0 # distances are sorted, so any exact match comes first
+    weights[exact_match] = distances[exact_match] == 0
+    return weights
+
+# RETURN {k: (n_valid, n_classes) VOTES} FOR EVERY k - cumulative sums give the votes of every k in one pass
+def class_votes(neighbour_classes, weights, n_classes, k_values):
+    one_hot = np.zeros(neighbour_classes.shape + (n_classes,))
+    np.put_along_axis(one_hot, neighbour_classes[..., None], weights[..., None], axis=2)
+    cumulative_votes = np.cumsum(one_hot, axis=1)
+    return {k: cumulative_votes[:, k - 1] for k in k_values}
+
+# RETURN {(k, weights): SCORE} FOR ONE FOLD AND ONE SCALER - accuracy for classifiers, R^2 for regressors
+def fold_scores(X, y, train_index, valid_index, scaler_name, k_values, task):
+    scaler = SCALERS[scaler_name]().fit(X[train_index])
+    X_train = scaler.transform(X[train_index])
+    X_valid = scaler.transform(X[valid_index])
+
+    max_k = min(max(k_values), len(train_index))
+    k_values = [k for k in k_values if k <= max_k]
+    distances, neighbours = NearestNeighbors(n_neighbors=max_k).fit(X_train).kneighbors(X_valid)
+
+    # fighters w/ identical stats are equally near - order them by training row so every k sees the same neighbours
+    # (refitting sklearn for each k may pick a different one of the tied fighters, so tied data can differ slightly)
+    order = np.lexsort((neighbours, distances), axis=1)
+    distances = np.take_along_axis(distances, order, axis=1)
+    neighbours = np.take_along_axis(neighbours, order, axis=1)
+
+    scores = {}
+    for weighting in WEIGHTS:
+        weights = np.ones(neighbours.shape) if weighting == 'uniform' else distance_weights(distances)
+
+        if task == 'classification':
+            classes, y_codes = np.unique(y, return_inverse=True)
+            votes = class_votes(y_codes[train_index][neighbours], weights, len(classes), k_values)
+            for k in k_values:
+                scores[(k, weighting)] = np.mean(votes[k].argmax(axis=1) == y_codes[valid_index]) # ties go to the first class, like sklearn
+        else:
+            y_valid = y[valid_index]
+            weighted_sums = np.cumsum(weights * y[train_index][neighbours], axis=1)
+            weight_totals = np.cumsum(weights, axis=1)
+            total_variance = np.sum((y_valid - y_valid.mean()) ** 2)
+            for k in k_values:
+                y_pred = weighted_sums[:, k - 1] / weight_totals[:, k - 1]
+                scores[(k, weighting)] = 1 - np.sum((y_valid - y_pred) ** 2) / total_variance
+
+    return scaler_name, scores
+
+# RETURN DATAFRAME W/ THE MEAN/STD CROSS-VALIDATED SCORE OF EVERY (scaler, weights, k), BEST FIRST
+def cross_validated_knn_search(X, y, task, k_values=K_VALUES, scalers=tuple(SCALERS), n_splits=5, seed=0, n_jobs=1):
+    if task == 'classification':
+        folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed).split(X, y)
+    else:
+        folds = KFold(n_splits=n_splits, shuffle=True, random_state=seed).split(X)
+    jobs = [(train_index, valid_index, scaler_name) for train_index, valid_index in folds for scaler_name in scalers]
+
+    if n_jobs == 1:
+        results = [fold_scores(X, y, train_index, valid_index, scaler_name, k_values, task) for train_index, valid_index, scaler_name in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(fold_scores, X, y, train_index, valid_index, scaler_name, k_values, task) for train_index, valid_index, scaler_name in jobs]
+            results = [future.result() for future in futures]
+
+    fold_results = pd.DataFrame([
+        {'scaler': scaler_name, 'k': k, 'weights': weighting, 'score': score}
+        for scaler_name, scores in results for (k, weighting), score in scores.items()
+    ])
+    search_results = fold_results.groupby(['scaler', 'weights', 'k'])['score'].agg(['mean', 'std']).reset_index()
+    return search_results.sort_values('mean', ascending=False, kind='stable').reset_index(drop=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cross-validated search over k, weighting and scaling for the KNN predictors')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--no-save', action='store_true', help='only print the results, keep the configurations the predictors train w/')
+    args = parser.parse_args(argv)
+
+    for predictor, task in [(fight_result_predictor, 'classification'), (win_ratio_predictor, 'regression')]:
+        name = predictor.MODEL_NAME
+        stat_columns, y = predictor.load_training_data()
+
+        start = time.perf_counter()
+        search_results = cross_validated_knn_search(stat_columns.to_numpy(dtype=float), y, task, n_splits=args.folds, n_jobs=args.jobs)
+        seconds = time.perf_counter() - start
+
+        print(f"{name}: {len(search_results)} configurations x {args.folds} folds in {seconds:.2f}s ({'accuracy' if task == 'classification' else 'R^2'})")
+        print(search_results.head(10).to_string(index=False))
+
+        if not args.no_save:
+            best = search_results.iloc[0]
+            model_artifacts.save_knn_config(name, {'k': int(best['k']), 'weights': best['weights'], 'scaler': best['scaler'], 'cv_score': float(best['mean'])})
+            print(f"Saved k={best['k']}, weights={best['weights']}, scaler={best['scaler']} for {name} to {model_artifacts.KNN_CONFIG_JSON}")
+        print()
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Author: Jason Gill
+
+Description:
+This file saves and loads the fitted predictor pipelines (scaler + KNN) so that new fights/fighters can be scored
+without re-reading the CSVs and re-fitting. Every save writes a new version `models/<name>_v<version>.joblib` holding the
+pipeline, the feature columns it was trained on and some metadata, and only the latest KEEP_VERSIONS versions are kept.
+Artifacts are only loaded from disk the first time they are used and then kept in memory. The k, neighbour weighting
+and scaler chosen by knn_search.py are saved in `models/knn_config.json` and used by the predictors the next time they
+are trained
+"""
+
+import glob
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import joblib
+import sklearn
+from sklearn.preprocessing import MinMaxScaler, RobustScaler, StandardScaler
+
+import helper
+
+MODELS_FOLDER = 'models'
+KEEP_VERSIONS = 10 # older versions of a model are deleted after each save
+KNN_CONFIG_JSON = os.path.join(MODELS_FOLDER, 'knn_config.json')
+KNN_SCALERS = {'minmax': MinMaxScaler, 'standard': StandardScaler, 'robust': RobustScaler}
+LOADED_ARTIFACTS = {} # artifacts already loaded by this process, keyed by their path
+
+def artifact_path(name, version):
+    return os.path.join(MODELS_FOLDER, f'{name}_v{version}.joblib')
+
+# RETURN LIST OF THE SAVED VERSIONS OF A MODEL, OLDEST FIRST
+def saved_versions(name):
+    versions = []
+    for path in glob.glob(os.path.join(MODELS_FOLDER, f'{name}_v*.joblib')):
+        match = re.fullmatch(re.escape(name) + r'_v(\d+)\.joblib', os.path.basename(path))
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions)
+
+# SAVE A FITTED PIPELINE AS THE NEXT VERSION OF `name` AND RETURN THE ARTIFACT
+def save_model_artifact(name, pipeline, feature_columns, **metadata):
+    helper.create_folder(MODELS_FOLDER)
+    artifact = {
+        'name': name,
+        'pipeline': pipeline,
+        'feature_columns': list(feature_columns),
+        'sklearn_version': sklearn.__version__,
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        **metadata,
+    }
+
+    # the artifact is written to a temporary file and then hard linked to its versioned path, which fails instead of
+    # overwriting if another process saved that version first (that process keeps it and this one takes the next)
+    temporary_path = os.path.join(MODELS_FOLDER, f'{name}.{os.getpid()}.tmp')
+    versions = saved_versions(name)
+    version = versions[-1] + 1 if versions else 1
+    try:
+        while True:
+            artifact['version'] = version
+            joblib.dump(artifact, temporary_path)
+            path = artifact_path(name, version)
+            try:
+                os.link(temporary_path, path)
+                break
+            except FileExistsError:
+                version += 1
+    finally:
+        os.remove(temporary_path)
+
+    LOADED_ARTIFACTS[path] = artifact
+    remove_old_versions(name)
+    return artifact
+
+# DELETE ALL BUT THE LATEST keep VERSIONS OF A MODEL
+def remove_old_versions(name, keep=KEEP_VERSIONS):
+    for version in saved_versions(name)[:-keep]:
+        path = artifact_path(name, version)
+        LOADED_ARTIFACTS.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass # another process removed it first
+
+# RETURN A SAVED ARTIFACT (THE LATEST VERSION BY DEFAULT), ONLY READING IT FROM DISK THE FIRST TIME
+def load_model_artifact(name, version=None):
+    if version is None:
+        versions = saved_versions(name)
+        if not versions:
+            raise FileNotFoundError(f"No saved '{name}' model in {MODELS_FOLDER}/ (train it first)")
+        version = versions[-1]
+
+    path = artifact_path(name, version)
+    if path not in LOADED_ARTIFACTS:
+        artifact = joblib.load(path)
+        if artifact['sklearn_version'] != sklearn.__version__:
+            print(f"Warning: {path} was saved w/ scikit-learn {artifact['sklearn_version']}, running {sklearn.__version__}")
+        LOADED_ARTIFACTS[path] = artifact
+    return LOADED_ARTIFACTS[path]
+
+# RETURN FEATURE MATRIX W/ THE ARTIFACT'S COLUMNS IN TRAINING ORDER (missing columns raise a KeyError)
+def feature_matrix(artifact, rows_df):
+    return rows_df[artifact['feature_columns']].to_numpy(dtype=float)
+
+# RETURN PREDICTIONS FOR NEW ROWS USING THE LATEST SAVED VERSION OF `name` (nothing is refitted)
+def predict_with_artifact(name, rows_df, version=None):
+    artifact = load_model_artifact(name, version)
+    return artifact['pipeline'].predict(feature_matrix(artifact, rows_df))
+
+# RETURN (classes, (n_rows, n_classes) PROBABILITIES) FOR NEW ROWS USING A SAVED CLASSIFIER
+def predict_proba_with_artifact(name, rows_df, version=None):
+    artifact = load_model_artifact(name, version)
+    pipeline = artifact['pipeline']
+    return pipeline.classes_, pipeline.predict_proba(feature_matrix(artifact, rows_df))
+
+# ------------------------------------------------------------------------------------------
+
+# TUNED KNN CONFIGURATIONS
+# a configuration is a dict: {'k': number of neighbours, 'weights': 'uniform' or 'distance', 'scaler': a KNN_SCALERS key}
+def load_knn_configs():
+    if not os.path.exists(KNN_CONFIG_JSON):
+        return {}
+    with open(KNN_CONFIG_JSON) as f:
+        return json.load(f)
+
+# RETURN THE CONFIGURATION knn_search.py CHOSE FOR `name`, OR default IF IT HASN'T BEEN RUN
+def load_knn_config(name, default):
+    return {**default, **load_knn_configs().get(name, {})}
+
+def save_knn_config(name, config):
+    configs = load_knn_configs()
+    configs[name] = config
+    helper.create_folder(MODELS_FOLDER)
+    temporary_path = f'{KNN_CONFIG_JSON}.{os.getpid()}.tmp'
+    with open(temporary_path, 'w') as f:
+        json.dump(configs, f, indent=2, sort_keys=True)
+    os.replace(temporary_path, KNN_CONFIG_JSON)
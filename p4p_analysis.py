@@ -5,11 +5,10 @@ Description:
 We analyse the data to determine the best pound for pound fighter.
 """
 
-import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
-
-# Load your dataset
-ufc_data = pd.read_csv('data_sets/preprocessed_data.csv')
+import helper
+import fighter_index
+import fighter_rankings
+import opponent_graph
 
 # List of relevant performance metrics with 'R_avg_' and 'B_avg_' prefixes
 adjusted_relevant_columns = [
@@ -50,36 +49,23 @@ weights = {
 # Ensure the weights sum to 1 (for a proper weighted average)
 assert sum(weights.values()) == 1, "Weights do not sum to 1!"
 
-# Columns for red and blue corner stats
-red_columns_final = ['R_avg_' + col for col in adjusted_relevant_columns]
-blue_columns_final = ['B_avg_' + col for col in adjusted_relevant_columns]
-
-# Create separate dataframes for red and blue corner stats
-red_fighter_stats = ufc_data[['R_fighter'] + red_columns_final]
-blue_fighter_stats = ufc_data[['B_fighter'] + blue_columns_final]
-
-# Rename columns to be common for both red and blue stats
-common_column_names = ['fighter'] + adjusted_relevant_columns
-red_fighter_stats.columns = common_column_names
-blue_fighter_stats.columns = common_column_names
-
-# Combine the red and blue stats into one dataframe
-combined_fighter_stats = pd.concat([red_fighter_stats, blue_fighter_stats], axis=0)
-
-# Group by fighter and calculate mean for each stat
-fighter_stats_aggregated = combined_fighter_stats.groupby('fighter').mean().reset_index()
+def main():
+    # Load your dataset
+    ufc_data = helper.load_dataset('data_sets/preprocessed_data.csv')
 
-# Normalize the aggregated data
-scaler = MinMaxScaler()
-fighter_stats_aggregated[adjusted_relevant_columns] = scaler.fit_transform(fighter_stats_aggregated[adjusted_relevant_columns])
+    # Average each fighter's red and blue corner stats, normalize them and calculate the weighted sum (see fighter_rankings.py)
+    top_p4p_fighters = fighter_rankings.rank_fighters(ufc_data, adjusted_relevant_columns, weights, 'p4p_score', k=10)
 
-# Calculate the weighted sum for each fighter
-for column in adjusted_relevant_columns:
-    fighter_stats_aggregated[column] *= weights[column]
-fighter_stats_aggregated['p4p_score'] = fighter_stats_aggregated[adjusted_relevant_columns].sum(axis=1)
+    # Display the first few rows of the ranked dataframe
+    print(top_p4p_fighters)
 
-# Sort the fighters by their pound-for-pound score in descending order
-fighter_stats_aggregated = fighter_stats_aggregated.sort_values(by='p4p_score', ascending=False)
+    # the p4p score only looks at each fighter's own averages, so show who they beat next to it (see opponent_graph.py)
+    fighter_ratings = opponent_graph.fighter_ratings(opponent_graph.build_opponent_graph(ufc_data)).set_index('fighter_id')
+    top_p4p_ids = fighter_index.fighter_ids(top_p4p_fighters['fighter'])
+    strength_of_schedule = fighter_ratings.reindex(top_p4p_ids)[['elo', 'dominance', 'beaten_opponent_elo']]
+    strength_of_schedule.insert(0, 'fighter', top_p4p_fighters['fighter'].to_numpy())
+    print("\nElo, dominance and mean Elo of the opponents beaten of the top p4p fighters:")
+    print(strength_of_schedule.reset_index(drop=True))
 
-# Display the first few rows of the ranked dataframe
-print(fighter_stats_aggregated.head(10))
+if __name__=='__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Author: Jason Gill
+
+Description:
+This file renders the analysis plots off the main process. A plot is a figure function (which builds and returns a
+matplotlib figure from its arguments) plus the path it is saved to. Every plot is fingerprinted from its arguments,
+the source code of its figure function and of the density helpers it draws with, and plots whose fingerprint matches
+the one recorded when the existing file was saved are skipped. The density curves are computed once in the calling
+process (density.kde_curves) and passed to the figure functions as arguments, so the remaining plots only draw them:
+they are rendered w/ the Agg backend in a process pool and every figure is closed as soon as it is saved. Inside a
+worker of another process pool (e.g. the analyses run concurrently by run_pipeline.py) the plots are rendered inline
+instead of starting a pool per worker
+"""
+
+import matplotlib
+matplotlib.use('Agg') # plots are only saved to files, never shown
+
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+import density
+
+FINGERPRINTS_JSON = 'plots/plot_fingerprints.json'
+FORCE_RENDER = False # True renders every plot even if it hasn't changed (run_pipeline.py --force-plots)
+RENDER_JOBS = None # number of processes rendering plots, None uses every CPU
+RENDERER_VERSION = 1 # bump to render every plot again after changing how plots are drawn outside the fingerprinted functions
+
+# functions the figure functions draw w/, fingerprinted along w/ every figure function
+PLOT_HELPERS = [density.plot_curve, density.histogram_with_curve]
+
+# RETURN A PLOT TO RENDER: figure_function(*args, **kwargs) IS SAVED TO path
+def plot_job(figure_function, path, *args, savefig_kwargs=None, **kwargs):
+    return {
+        'figure_function': figure_function,
+        'path': path,
+        'args': args,
+        'kwargs': kwargs,
+        'savefig_kwargs': {'bbox_inches': 'tight'} if savefig_kwargs is None else savefig_kwargs,
+    }
+
+# ------------------------------------------------------------------------------------------
+
+# FINGERPRINTS
+def update_hash(digest, value):
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        digest.update(repr((type(value).__name__, value.shape, getattr(value, 'name', None), list(getattr(value, 'columns', [])))).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}[{len(value)}]'.encode())
+        for item in value:
+            update_hash(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f'dict[{len(value)}]'.encode())
+        for key in sorted(value, key=repr):
+            update_hash(digest, key)
+            update_hash(digest, value[key])
+    else:
+        digest.update(repr(value).encode())
+
+# RETURN SHA1 OF EVERYTHING THAT DECIDES WHAT THE PLOT LOOKS LIKE
+def plot_fingerprint(job):
+    digest = hashlib.sha1()
+    for function in [job['figure_function']] + PLOT_HELPERS:
+        digest.update(inspect.getsource(function).encode())
+    digest.update(repr((RENDERER_VERSION, matplotlib.__version__, sns.__version__, job['savefig_kwargs'])).encode())
+    update_hash(digest, job['args'])
+    update_hash(digest, job['kwargs'])
+    return digest.hexdigest()
+
+def load_fingerprints():
+    if not os.path.exists(FINGERPRINTS_JSON):
+        return {}
+    with open(FINGERPRINTS_JSON) as f:
+        return json.load(f)
+
+def save_fingerprints(new_fingerprints):
+    # analyses running at the same time share the file, so merge w/ what is on disk right before replacing it
+    # (if two writes still race, the lost plots are only rendered again next time)
+    fingerprints = load_fingerprints()
+    fingerprints.update(new_fingerprints)
+    os.makedirs(os.path.dirname(FINGERPRINTS_JSON), exist_ok=True)
+    temporary_path = f'{FINGERPRINTS_JSON}.{os.getpid()}.tmp'
+    with open(temporary_path, 'w') as f:
+        json.dump(fingerprints, f, indent=2, sort_keys=True)
+    os.replace(temporary_path, FINGERPRINTS_JSON)
+
+# ------------------------------------------------------------------------------------------
+
+# RENDERING
+def render_job(job):
+    folder = os.path.dirname(job['path'])
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    fig = job['figure_function'](*job['args'], **job['kwargs'])
+    try:
+        fig.savefig(job['path'], **job['savefig_kwargs'])
+    finally:
+        plt.close(fig)
+    return job['path']
+
+# RENDER EVERY PLOT THAT ISN'T UP TO DATE, RETURN DICT W/ THE PATHS RENDERED AND SKIPPED
+def render_plots(jobs, n_jobs=None):
+    recorded = load_fingerprints()
+    fingerprints = {job['path']: plot_fingerprint(job) for job in jobs}
+    stale = [job for job in jobs if FORCE_RENDER or not os.path.exists(job['path']) or recorded.get(job['path']) != fingerprints[job['path']]]
+
+    if n_jobs is None:
+        n_jobs = RENDER_JOBS or os.cpu_count()
+    if multiprocessing.parent_process() is not None:
+        n_jobs = 1 # already a worker of a pool that keeps the CPUs busy, another pool per worker would oversubscribe them
+    n_jobs = min(n_jobs, len(stale))
+
+    if n_jobs <= 1:
+        rendered = [render_job(job) for job in stale]
+    else:
+        # with fork the workers inherit the imported modules (and the figure functions of scripts run as __main__)
+        mp_context = None
+        if 'fork' in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp_context) as executor:
+            rendered = list(executor.map(render_job, stale))
+
+    if rendered:
+        save_fingerprints({path: fingerprints[path] for path in rendered})
+    rendered_paths = set(rendered)
+    return {'rendered': rendered, 'skipped': [job['path'] for job in jobs if job['path'] not in rendered_paths]}
+
+def render_plot(figure_function, path, *args, **kwargs):
+    return render_plots([plot_job(figure_function, path, *args, **kwargs)])
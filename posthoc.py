@@ -0,0 +1,152 @@
+"""
+Author: Jason Gill
+
+Description:
+This file contains a vectorized Games-Howell post-hoc test that gives the same table as pingouin's
+pairwise_gameshowell. It only needs each group's sample size, mean and variance, so the summary can come straight from a
+groupby and every pair (of every stratum, see games_howell_stratified) is computed at once. The p-values come from the
+studentized range distribution like pingouin, but scipy evaluates it one pair at a time (~15 ms each), so here the
+distribution of the range of k normals is tabulated once per k and integrated against the distribution of the sample
+standard deviation for all pairs together (within 1e-9 of scipy)
+"""
+
+import pandas as pd
+import numpy as np
+from scipy.interpolate import CubicHermiteSpline
+from scipy.special import gammaln, ndtr
+from scipy.stats import chi
+
+# ------------------------------------------------------------------------------------------
+
+# STUDENTIZED RANGE DISTRIBUTION
+Z_GRID = np.linspace(-12, 12, 4001) # integration grid for the standard normal variable
+RANGE_GRID = np.linspace(0, 30, 3001) # ranges the CDF is tabulated at, the CDF is 1 beyond 30 for any k used here
+S_NODES, S_WEIGHTS = np.polynomial.legendre.leggauss(200)
+RANGE_CDF_SPLINES = {} # k -> spline of the CDF of the range of k standard normals
+
+def normal_pdf(z):
+    return np.exp(-z ** 2 / 2) / np.sqrt(2 * np.pi)
+
+# RETURN SPLINE OF P(range of k standard normals <= w), built from the CDF and its derivative on RANGE_GRID
+def range_cdf_spline(k):
+    if k not in RANGE_CDF_SPLINES:
+        dz = Z_GRID[1] - Z_GRID[0]
+        z = Z_GRID[None, :]
+        cdf = np.empty(len(RANGE_GRID))
+        derivative = np.empty(len(RANGE_GRID))
+
+        for start in range(0, len(RANGE_GRID), 250): # 250 ranges at a time keeps the (ranges x z) matrices small
+            w = RANGE_GRID[start:start + 250, None]
+
+            # P(range <= w) = k * integral of pdf(z) * (cdf(z) - cdf(z - w))^(k-1) dz
+            inside = np.clip(ndtr(z) - ndtr(z - w), 0, 1)
+            cdf[start:start + 250] = k * (normal_pdf(z) * inside ** (k - 1)).sum(axis=1) * dz
+            derivative[start:start + 250] = k * (k - 1) * (normal_pdf(z) * normal_pdf(z - w) * inside ** (k - 2)).sum(axis=1) * dz
+
+        RANGE_CDF_SPLINES[k] = CubicHermiteSpline(RANGE_GRID, np.minimum(cdf, 1), derivative)
+    return RANGE_CDF_SPLINES[k]
+
+# RETURN P(Q > q) FOR THE STUDENTIZED RANGE OF k GROUPS W/ df DEGREES OF FREEDOM (same as scipy's studentized_range.sf)
+# Q = range / s where s ~ chi(df) / sqrt(df), so the sf is 1 - E[P(range <= q * s)], integrated over log(s)
+def studentized_range_sf(q, k, df):
+    q = np.atleast_1d(np.asarray(q, dtype=float))
+    df = np.broadcast_to(np.asarray(df, dtype=float), q.shape)
+
+    # integrate between the 1e-17 and 1 - 1e-17 quantiles of s
+    low = np.log(chi.ppf(1e-17, df) / np.sqrt(df))[:, None]
+    high = np.log(chi.isf(1e-17, df) / np.sqrt(df))[:, None]
+    log_s = (high - low) / 2 * S_NODES + (high + low) / 2
+    weights = (high - low) / 2 * S_WEIGHTS
+
+    df = df[:, None]
+    log_density = df / 2 * np.log(df) - gammaln(df / 2) - (df / 2 - 1) * np.log(2) + df * log_s - df * np.exp(2 * log_s) / 2
+    ranges = q[:, None] * np.exp(log_s)
+    range_cdf = np.where(ranges >= RANGE_GRID[-1], 1.0, range_cdf_spline(k)(np.minimum(ranges, RANGE_GRID[-1])))
+
+    return np.clip(1 - (np.exp(log_density) * weights * range_cdf).sum(axis=1), 0, 1)
+
+# ------------------------------------------------------------------------------------------
+
+# GAMES-HOWELL
+# RETURN DATAFRAME W/ n, mean AND var (ddof=1) OF dv FOR EVERY GROUP OF `between` (sorted like pingouin's groupby)
+def group_summary(data, dv, between):
+    data = data[[dv] + ([between] if isinstance(between, str) else list(between))].dropna()
+    return data.groupby(between, observed=True)[dv].agg(n='count', mean='mean', var='var')
+
+# RETURN SAME SUMMARY AS group_summary FROM A {label: values} DICT, W/O BUILDING A LONG DATAFRAME FIRST
+def summarize_groups(groups):
+    values = {label: pd.Series(group_values, dtype=float).dropna() for label, group_values in groups.items()}
+    summary = pd.DataFrame({
+        'n': [len(group_values) for group_values in values.values()],
+        'mean': [group_values.mean() for group_values in values.values()],
+        'var': [group_values.var() for group_values in values.values()],
+    }, index=list(values))
+    return summary.sort_index()
+
+# RETURN (first, second) INDICES OF EVERY PAIR OF GROUPS WITHIN THE SAME STRATUM AND THE NUMBER OF GROUPS IN THAT STRATUM
+# (strata must be sorted)
+def pairs_within_strata(strata):
+    _, starts, counts = np.unique(strata, return_index=True, return_counts=True)
+    first, second = [], []
+    for start, count in zip(starts, counts):
+        pair_first, pair_second = np.triu_indices(count, k=1)
+        first.append(pair_first + start)
+        second.append(pair_second + start)
+    first = np.concatenate(first)
+    return first, np.concatenate(second), np.repeat(counts, counts)[first]
+
+# RETURN GAMES-HOWELL TABLE FOR THE GIVEN PAIRS OF GROUPS (k is the number of groups in each pair's stratum)
+def games_howell_pairs(labels, n, mean, var, first, second, k):
+    n = np.asarray(n, dtype=float)
+    mean = np.asarray(mean, dtype=float)
+    var = np.asarray(var, dtype=float)
+
+    # Welch standard error and Welch-Satterthwaite degrees of freedom of every pair
+    var_of_mean = var / n
+    se = np.sqrt(var_of_mean[first] + var_of_mean[second])
+    diff = mean[first] - mean[second]
+    T = diff / se
+    df = (var_of_mean[first] + var_of_mean[second]) ** 2 / (var_of_mean[first] ** 2 / (n[first] - 1) + var_of_mean[second] ** 2 / (n[second] - 1))
+
+    pval = np.empty(len(first))
+    for groups in np.unique(k):
+        same_k = k == groups
+        pval[same_k] = studentized_range_sf(np.sqrt(2) * np.abs(T[same_k]), groups, df[same_k])
+
+    # Hedges' g from the pooled standard deviation, same as pingouin's compute_effsize
+    pooled_sd = np.sqrt(((n[first] - 1) * var[first] + (n[second] - 1) * var[second]) / (n[first] + n[second] - 2))
+    hedges = diff / pooled_sd * (1 - 3 / (4 * (n[first] + n[second]) - 9))
+
+    return pd.DataFrame({
+        'A': labels[first], 'B': labels[second],
+        'mean_A': mean[first], 'mean_B': mean[second],
+        'diff': diff, 'se': se, 'T': T, 'df': df, 'pval': pval, 'hedges': hedges,
+    })
+
+# RETURN GAMES-HOWELL TABLE FOR EVERY PAIR OF GROUPS IN A group_summary() DATAFRAME
+def games_howell_from_summary(summary):
+    labels = np.empty(len(summary), dtype=object)
+    labels[:] = list(summary.index)
+    first, second = np.triu_indices(len(summary), k=1)
+    k = np.full(len(first), len(summary))
+    return games_howell_pairs(labels, summary['n'], summary['mean'], summary['var'], first, second, k)
+
+# RETURN SAME TABLE AS pingouin.pairwise_gameshowell(data=data, dv=dv, between=between)
+def pairwise_gameshowell(data, dv, between):
+    return games_howell_from_summary(group_summary(data, dv, between))
+
+# RETURN GAMES-HOWELL TABLE FOR A {label: values} DICT (same as melting it and calling pairwise_gameshowell)
+def pairwise_gameshowell_from_groups(groups):
+    return games_howell_from_summary(summarize_groups(groups))
+
+# RETURN GAMES-HOWELL TABLE OF EVERY PAIR OF GROUPS WITHIN EACH STRATUM, FOR ALL STRATA AT ONCE
+# summary is indexed by (stratum, group) w/ n, mean and var columns, e.g. group_summary(data, dv, ['era', 'weight_class'])
+def games_howell_stratified(summary):
+    summary = summary[summary['n'] > 1].sort_index()
+    strata = summary.index.get_level_values(0).to_numpy()
+    labels = summary.index.get_level_values(-1).to_numpy(dtype=object)
+
+    first, second, k = pairs_within_strata(strata)
+    table = games_howell_pairs(labels, summary['n'], summary['mean'], summary['var'], first, second, k)
+    table.insert(0, summary.index.names[0] or 'stratum', strata[first])
+    return table
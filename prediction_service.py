@@ -0,0 +1,292 @@
+"""
+Author: Jason Gill
+
+Description:
+This file serves the fight result predictor over HTTP on localhost, so "who wins Red vs Blue" can be asked without
+launching a script. The latest saved model (see model_artifacts.py) stays in memory and each fighter's statistics
+from their most recent fight are cached as one row of a NumPy matrix, so a request's feature row is built by indexing
+instead of searching the dataset. Requests arriving at the same time are batched into one predict_proba call.
+
+GET  /predict?red=<name>&blue=<name>[&rounds=3]
+POST /predict  w/ a JSON list of {"red": <name>, "blue": <name>, "rounds": 3}
+GET  /metrics  (request count, batch sizes and p50/p99 latency in ms)
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import numpy as np
+
+import helper
+import model_artifacts
+import fight_result_predictor
+
+DEFAULT_ROUNDS = 3
+LATENCY_WINDOW = 10_000 # metrics are computed over the most recent requests only
+
+# ------------------------------------------------------------------------------------------
+
+# FIGHTER PROFILES
+# RETURN DICT W/ EVERY FIGHTER'S CORNER STATS (R_/B_ COLUMNS W/O THE PREFIX) FROM THEIR MOST RECENT FIGHT
+def build_fighter_profiles(fights_df, feature_columns):
+    stats = sorted({column[2:] for column in feature_columns if column.startswith(('R_', 'B_'))})
+
+    # one row per fighter per fight, newest fight first - the first row of each fighter is their latest profile
+    fighter_fights = pd.concat([
+        pd.DataFrame(fights_df[['R_' + stat for stat in stats]].to_numpy(dtype=float), columns=stats).assign(fighter=fights_df['R_fighter'].to_numpy(), date=fights_df['date'].to_numpy()),
+        pd.DataFrame(fights_df[['B_' + stat for stat in stats]].to_numpy(dtype=float), columns=stats).assign(fighter=fights_df['B_fighter'].to_numpy(), date=fights_df['date'].to_numpy()),
+    ], ignore_index=True)
+    fighter_fights['date'] = pd.to_datetime(fighter_fights['date'])
+    latest_fights = fighter_fights.sort_values('date', ascending=False, kind='stable').drop_duplicates('fighter')
+
+    return {
+        'stats': stats,
+        'fighter_rows': {fighter: row for row, fighter in enumerate(latest_fights['fighter'])},
+        'stat_matrix': latest_fights[stats].to_numpy(),
+    }
+
+# RETURN (COLUMN POSITIONS, PROFILE STAT INDICES) THAT COPY A CORNER'S PROFILE INTO THE FEATURE ROW
+def corner_column_map(feature_columns, stats, prefix):
+    stat_index = {stat: index for index, stat in enumerate(stats)}
+    positions = [position for position, column in enumerate(feature_columns) if column.startswith(prefix)]
+    return np.array(positions, dtype=int), np.array([stat_index[feature_columns[position][2:]] for position in positions], dtype=int)
+
+# RETURN (n_fights, n_features) MATRIX FOR (red, blue, rounds) FIGHTS W/ FIGHTERS ALREADY CONVERTED TO PROFILE ROWS
+def feature_rows(service, red_rows, blue_rows, rounds):
+    X = np.zeros((len(red_rows), len(service['feature_columns'])))
+    stat_matrix = service['profiles']['stat_matrix']
+
+    red_positions, red_stats = service['red_columns']
+    blue_positions, blue_stats = service['blue_columns']
+    X[:, red_positions] = stat_matrix[np.ix_(red_rows, red_stats)]
+    X[:, blue_positions] = stat_matrix[np.ix_(blue_rows, blue_stats)]
+
+    if service['rounds_position'] is not None:
+        X[:, service['rounds_position']] = rounds
+    return X
+
+# ------------------------------------------------------------------------------------------
+
+# MICRO-BATCHING
+# every request waits on its own event while a single worker thread collects whatever requests are queued
+# (up to max_batch, waiting at most max_wait seconds for more) and scores them w/ one predict_proba call
+def predict_batch(service, batch):
+    red_rows = [request['red_row'] for request in batch]
+    blue_rows = [request['blue_row'] for request in batch]
+    rounds = [request['rounds'] for request in batch]
+
+    probabilities = service['pipeline'].predict_proba(feature_rows(service, red_rows, blue_rows, rounds))
+    classes = service['pipeline'].classes_
+
+    for request, fight_probabilities in zip(batch, probabilities):
+        request['result'] = {
+            'red': request['red'],
+            'blue': request['blue'],
+            'predicted_winner': str(classes[fight_probabilities.argmax()]),
+            'probabilities': {str(winner): float(probability) for winner, probability in zip(classes, fight_probabilities)},
+        }
+
+def batching_worker(service):
+    while True:
+        batch = [service['requests'].get()]
+        deadline = time.perf_counter() + service['max_wait']
+        while len(batch) < service['max_batch']:
+            try:
+                batch.append(service['requests'].get(timeout=max(deadline - time.perf_counter(), 0)))
+            except queue.Empty:
+                break
+
+        try:
+            predict_batch(service, batch)
+        except Exception as error:
+            for request in batch:
+                request['error'] = str(error)
+
+        with service['metrics_lock']:
+            service['batch_sizes'].append(len(batch))
+        for request in batch:
+            request['done'].set()
+
+# RETURN NUMBER OF ROUNDS OF A REQUESTED FIGHT (DEFAULT_ROUNDS IF NOT GIVEN), RAISING ValueError IF IT ISN'T A POSITIVE NUMBER
+def fight_rounds(fight):
+    try:
+        rounds = float(fight.get('rounds', DEFAULT_ROUNDS))
+    except (TypeError, ValueError):
+        rounds = None
+    if rounds is None or not np.isfinite(rounds) or rounds <= 0:
+        raise ValueError('rounds must be a positive number, got ' + repr(fight['rounds']))
+    return rounds
+
+# RETURN PREDICTIONS FOR A LIST OF {"red", "blue", "rounds"} FIGHTS, WAITING UNTIL THE WORKER HAS SCORED THEM
+def predict_fights(service, fights):
+    fighter_rows = service['profiles']['fighter_rows']
+    unknown = sorted({name for fight in fights for name in (fight['red'], fight['blue']) if name not in fighter_rows})
+    if unknown:
+        raise KeyError('Unknown fighter(s): ' + ', '.join(unknown))
+
+    requests = []
+    for fight in fights:
+        request = {
+            'red': fight['red'],
+            'blue': fight['blue'],
+            'red_row': fighter_rows[fight['red']],
+            'blue_row': fighter_rows[fight['blue']],
+            'rounds': fight_rounds(fight),
+            'done': threading.Event(),
+        }
+        service['requests'].put(request)
+        requests.append(request)
+
+    for request in requests:
+        request['done'].wait()
+        if 'error' in request:
+            raise RuntimeError(request['error'])
+    return [request['result'] for request in requests]
+
+# ------------------------------------------------------------------------------------------
+
+# RETURN DICT W/ THE NUMBER OF REQUESTS, BATCH SIZES AND LATENCY PERCENTILES (ms) OF THE RECENT REQUESTS
+def latency_metrics(service):
+    with service['metrics_lock']:
+        latencies = np.array(service['latencies']) * 1000
+        batch_sizes = np.array(service['batch_sizes'])
+        requests_served = service['requests_served']
+
+    metrics = {'requests_served': requests_served, 'batches': len(batch_sizes)}
+    if len(latencies):
+        metrics.update({
+            'mean_batch_size': float(batch_sizes.mean()),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max()),
+        })
+    return metrics
+
+def record_latency(service, seconds):
+    with service['metrics_lock']:
+        service['latencies'].append(seconds)
+        service['requests_served'] += 1
+
+def make_request_handler(service):
+    class PredictionRequestHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def answer(self, fights, single):
+            start = time.perf_counter()
+            try:
+                results = predict_fights(service, fights)
+            except KeyError as error:
+                self.send_json(404, {'error': error.args[0]})
+                return
+            except (RuntimeError, ValueError) as error:
+                self.send_json(500, {'error': str(error)})
+                return
+            self.send_json(200, results[0] if single else results)
+            record_latency(service, time.perf_counter() - start)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/metrics':
+                self.send_json(200, latency_metrics(service))
+            elif url.path == '/predict':
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if 'red' not in query or 'blue' not in query:
+                    self.send_json(400, {'error': 'red and blue are required'})
+                    return
+                try:
+                    fight_rounds(query)
+                except ValueError as error:
+                    self.send_json(400, {'error': str(error)})
+                    return
+                self.answer([query], single=True)
+            else:
+                self.send_json(404, {'error': 'unknown path ' + url.path})
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/predict':
+                self.send_json(404, {'error': 'unknown path ' + self.path})
+                return
+            try:
+                fights = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if not all('red' in fight and 'blue' in fight for fight in fights):
+                    raise ValueError('every fight needs red and blue')
+                for fight in fights:
+                    fight_rounds(fight)
+            except (ValueError, TypeError) as error:
+                self.send_json(400, {'error': str(error)})
+                return
+            self.answer(fights, single=False)
+
+        def log_message(self, format, *args):
+            pass # the per-request log lines would dominate the latency
+
+    return PredictionRequestHandler
+
+# RETURN EVERYTHING THE SERVICE KEEPS IN MEMORY: MODEL, FIGHTER PROFILES, REQUEST QUEUE AND METRICS
+def load_service(preprocessed_data_csv='data_sets/preprocessed_data.csv', max_batch=64, max_wait_ms=2):
+    try:
+        artifact = model_artifacts.load_model_artifact(fight_result_predictor.MODEL_NAME)
+    except FileNotFoundError:
+        fight_result_predictor.train('exact', compare_backends=False) # no saved model yet - fit and save one
+        artifact = model_artifacts.load_model_artifact(fight_result_predictor.MODEL_NAME)
+
+    feature_columns = artifact['feature_columns']
+    profiles = build_fighter_profiles(helper.load_dataset(preprocessed_data_csv), feature_columns)
+
+    return {
+        'pipeline': artifact['pipeline'],
+        'feature_columns': feature_columns,
+        'profiles': profiles,
+        'red_columns': corner_column_map(feature_columns, profiles['stats'], 'R_'),
+        'blue_columns': corner_column_map(feature_columns, profiles['stats'], 'B_'),
+        'rounds_position': feature_columns.index('no_of_rounds') if 'no_of_rounds' in feature_columns else None,
+        'requests': queue.Queue(),
+        'max_batch': max_batch,
+        'max_wait': max_wait_ms / 1000,
+        'metrics_lock': threading.Lock(),
+        'latencies': deque(maxlen=LATENCY_WINDOW),
+        'batch_sizes': deque(maxlen=LATENCY_WINDOW),
+        'requests_served': 0,
+    }
+
+# RETURN A RUNNING SERVER (port 0 picks a free port, see server.server_address) - call server.shutdown() to stop it
+def start_server(service, host='127.0.0.1', port=0):
+    threading.Thread(target=batching_worker, args=(service,), daemon=True).start()
+    server = ThreadingHTTPServer((host, port), make_request_handler(service))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve fight result predictions on localhost')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8053)
+    parser.add_argument('--max-batch', type=int, default=64, help='most requests scored by one predict_proba call')
+    parser.add_argument('--max-wait-ms', type=float, default=2, help='how long a batch waits for more requests')
+    args = parser.parse_args()
+
+    service = load_service(max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    server = start_server(service, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Serving predictions for {len(service['profiles']['fighter_rows'])} fighters on http://{host}:{port} (Ctrl+C to stop)")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__=='__main__':
+    main()
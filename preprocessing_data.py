@@ -3,23 +3,58 @@ Author: Jason Gill
 
 Description:
 This file contains a preprocessing script for the `data.csv` dataset
+
+Running `python3 preprocessing_data.py --append <new_events.csv>` preprocesses only the fights in the given file that
+haven't been seen before (keyed by fighter pair and date) and appends them to `preprocessed_data.csv`, instead of
+redoing the whole history. Missing values in the new rows are filled with the running medians over every fight so far
 """
 
+import argparse
+
 import pandas as pd
 import helper
 
-def main():
+KEY_COLUMNS = ['R_fighter', 'B_fighter', 'date']
+PREPROCESSED_CSV = 'data_sets/preprocessed_data.csv'
+STATE_PATH = 'data_sets/preprocessed_data_state.pkl'
+
+def preprocess_all():
     df = pd.read_csv('data_sets/data.csv')
+    helper.remove_preprocessing_state(STATE_PATH)
+    state = helper.build_preprocessing_state(df, KEY_COLUMNS) # built before filling so it holds the original values
 
     numerical_columns = df.select_dtypes(include=['number'])
     for column in numerical_columns:
         helper.fill_na_with_median(df, column)
 
     # Write the DataFrame to a CSV file
+    df.to_csv(PREPROCESSED_CSV, index=False)
+    helper.save_preprocessing_state(state, STATE_PATH, PREPROCESSED_CSV)
+
+def preprocess_new_events(new_events_csv):
+    state = helper.load_preprocessing_state(STATE_PATH, PREPROCESSED_CSV)
+    if state is None:
+        raise SystemExit(f"{STATE_PATH} not found - run `python3 preprocessing_data.py` once before appending new events")
+
+    new_fights = helper.preprocess_new_rows(state, pd.read_csv(new_events_csv))
+
+    # only the new rows are written, the rest of the file is left untouched
+    new_fights.to_csv(PREPROCESSED_CSV, mode='a', header=False, index=False)
+    helper.save_preprocessing_state(state, STATE_PATH, PREPROCESSED_CSV)
+    print(f"Appended {len(new_fights)} new fights to data_sets/preprocessed_data.csv")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Preprocess data.csv into data_sets/preprocessed_data.csv')
+    parser.add_argument('--append', metavar='NEW_EVENTS_CSV', help='only preprocess and append the fights in this file that are not already preprocessed')
+    args = parser.parse_args(argv)
+
     helper.create_folder('data_sets')
     helper.create_folder('plots')
 
-    df.to_csv("data_sets/preprocessed_data.csv", index=False)
+    if args.append:
+        preprocess_new_events(args.append)
+    else:
+        preprocess_all()
 
 if __name__=='__main__':
     main()
@@ -3,14 +3,22 @@ Author: Jason Gill
 
 Description:
 This file contains a preprocessing script for the `raw_fighter_details.csv` dataset
+
+Running `python3 preprocessing_fighter_details.py --append <new_fighters.csv>` preprocesses only the fighters in the given
+file that haven't been seen before (keyed by fighter name) and appends them to `preprocessed_fighter_details.csv`, instead
+of redoing every fighter. Missing values in the new rows are filled with the running medians over every fighter so far
 """
 
+import argparse
+
 import pandas as pd
 import helper
 
-def main():
-    df = pd.read_csv('data_sets/raw_fighter_details.csv')
+KEY_COLUMNS = ['fighter_name']
+PREPROCESSED_CSV = 'data_sets/preprocessed_fighter_details.csv'
+STATE_PATH = 'data_sets/preprocessed_fighter_details_state.pkl'
 
+def convert_fighter_details_columns(df):
     df['Height'] = df['Height'].apply(helper.convert_foot_inches_to_inches)
     df['Weight'] = df['Weight'].str.replace(' lbs.', '', regex=True).astype(float) # remove lbs suffix
     df['Reach'] = df['Reach'].str.replace('"', '', regex=True).astype(float) # remove inch symbol
@@ -20,15 +28,46 @@ def main():
     for column in percentage_columns:
         df[column] = df[column].str.replace('%', '', regex=True).astype('float') / 100.0
 
+def preprocess_all():
+    df = pd.read_csv('data_sets/raw_fighter_details.csv')
+    convert_fighter_details_columns(df)
+    helper.remove_preprocessing_state(STATE_PATH)
+    state = helper.build_preprocessing_state(df, KEY_COLUMNS) # built before filling so it holds the original values
+
     numerical_columns = df.select_dtypes(include=['number'])
     for column in numerical_columns:
         helper.fill_na_with_median(df, column)
 
     # Write the DataFrame to a CSV file
+    df.to_csv(PREPROCESSED_CSV, index=False)
+    helper.save_preprocessing_state(state, STATE_PATH, PREPROCESSED_CSV)
+
+def preprocess_new_fighters(new_fighters_csv):
+    state = helper.load_preprocessing_state(STATE_PATH, PREPROCESSED_CSV)
+    if state is None:
+        raise SystemExit(f"{STATE_PATH} not found - run `python3 preprocessing_fighter_details.py` once before appending new fighters")
+
+    new_fighters = pd.read_csv(new_fighters_csv)
+    convert_fighter_details_columns(new_fighters)
+    new_fighters = helper.preprocess_new_rows(state, new_fighters)
+
+    # only the new rows are written, the rest of the file is left untouched
+    new_fighters.to_csv(PREPROCESSED_CSV, mode='a', header=False, index=False)
+    helper.save_preprocessing_state(state, STATE_PATH, PREPROCESSED_CSV)
+    print(f"Appended {len(new_fighters)} new fighters to data_sets/preprocessed_fighter_details.csv")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Preprocess raw_fighter_details.csv into data_sets/preprocessed_fighter_details.csv')
+    parser.add_argument('--append', metavar='NEW_FIGHTERS_CSV', help='only preprocess and append the fighters in this file that are not already preprocessed')
+    args = parser.parse_args(argv)
+
     helper.create_folder('data_sets')
     helper.create_folder('plots')
 
-    df.to_csv("data_sets/preprocessed_fighter_details.csv", index=False)
+    if args.append:
+        preprocess_new_fighters(args.append)
+    else:
+        preprocess_all()
 
 if __name__=='__main__':
     main()
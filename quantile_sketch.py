@@ -0,0 +1,104 @@
+"""
+Author: Jason Gill
+
+Description:
+This file contains a mergeable quantile sketch for the medians of datasets that are read piece by piece (in chunks, or a
+few new events at a time). A sketch counts every distinct value exactly while a column has at most SKETCH_EXACT_VALUES
+of them (so low-cardinality stats like knockdowns get their exact median) and otherwise falls back to log-spaced buckets
+w/ a bounded relative error (the buckets of DDSketch). Its size depends on the number of distinct values or buckets, not
+on the number of rows, and two sketches can be merged into one
+"""
+
+import numpy as np
+
+SKETCH_EXACT_VALUES = 1024 # distinct values counted exactly before a sketch switches to buckets
+SKETCH_RELATIVE_ACCURACY = 0.01 # bucketed quantiles are within 1% of a value in the data
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+
+# ------------------------------------------------------------------------------------------
+
+# QUANTILE SKETCH
+# a sketch is a dict: {'exact': True, 'counts': {value: count}} or
+# {'exact': False, 'positive': {bucket: count}, 'negative': {bucket: count}, 'zeros': count}
+def new_quantile_sketch():
+    return {'exact': True, 'counts': {}}
+
+def add_counts(counts, keys, key_counts):
+    for key, count in zip(keys.tolist(), key_counts.tolist()):
+        counts[key] = counts.get(key, 0) + count
+
+# bucket i holds the magnitudes in (gamma^(i-1), gamma^i]
+def bucket_indices(magnitudes):
+    return np.ceil(np.log(magnitudes) / np.log(SKETCH_GAMMA)).astype(np.int64)
+
+def bucket_value(index):
+    return 2 * SKETCH_GAMMA ** index / (SKETCH_GAMMA + 1)
+
+def add_to_buckets(sketch, values, value_counts):
+    for sign, store in [(1, 'positive'), (-1, 'negative')]:
+        side = sign * values > 0
+        if side.any():
+            buckets = bucket_indices(sign * values[side])
+            keys, inverse = np.unique(buckets, return_inverse=True)
+            add_counts(sketch[store], keys, np.bincount(inverse, weights=value_counts[side]).astype(np.int64))
+    sketch['zeros'] += int(value_counts[values == 0].sum())
+
+def to_buckets(sketch):
+    if not sketch['exact']:
+        return sketch
+    bucketed = {'exact': False, 'positive': {}, 'negative': {}, 'zeros': 0}
+    if sketch['counts']:
+        add_to_buckets(bucketed, np.array(list(sketch['counts']), dtype=float), np.array(list(sketch['counts'].values())))
+    return bucketed
+
+# RETURN SKETCH UPDATED W/ THE VALUES (NaN is skipped, like pandas' median)
+def update_sketch(sketch, values):
+    values = np.asarray(values, dtype=float)
+    values, value_counts = np.unique(values[~np.isnan(values)], return_counts=True)
+
+    if sketch['exact']:
+        add_counts(sketch['counts'], values, value_counts)
+        if len(sketch['counts']) > SKETCH_EXACT_VALUES:
+            sketch = to_buckets(sketch)
+    else:
+        add_to_buckets(sketch, values, value_counts)
+    return sketch
+
+# RETURN ONE SKETCH OF EVERYTHING TWO SKETCHES HAVE SEEN (e.g. sketches of different files or workers)
+def merge_sketches(a, b):
+    if a['exact'] and b['exact']:
+        merged = {'exact': True, 'counts': dict(a['counts'])}
+        for value, count in b['counts'].items():
+            merged['counts'][value] = merged['counts'].get(value, 0) + count
+        return to_buckets(merged) if len(merged['counts']) > SKETCH_EXACT_VALUES else merged
+
+    a, b = to_buckets(a), to_buckets(b)
+    merged = {'exact': False, 'positive': dict(a['positive']), 'negative': dict(a['negative']), 'zeros': a['zeros'] + b['zeros']}
+    for store in ['positive', 'negative']:
+        for bucket, count in b[store].items():
+            merged[store][bucket] = merged[store].get(bucket, 0) + count
+    return merged
+
+# RETURN (SORTED VALUES, COUNTS) THE SKETCH REPRESENTS
+def sketch_values(sketch):
+    if sketch['exact']:
+        values = np.array(sorted(sketch['counts']), dtype=float)
+        return values, np.array([sketch['counts'][value] for value in values.tolist()], dtype=np.int64)
+
+    negative = sorted(sketch['negative'], reverse=True)
+    positive = sorted(sketch['positive'])
+    values = np.concatenate([-bucket_value(np.array(negative, dtype=float)), [0.0], bucket_value(np.array(positive, dtype=float))])
+    counts = np.array([sketch['negative'][bucket] for bucket in negative] + [sketch['zeros']] + [sketch['positive'][bucket] for bucket in positive], dtype=np.int64)
+    return values[counts > 0], counts[counts > 0]
+
+# RETURN q-QUANTILE W/ LINEAR INTERPOLATION BETWEEN THE TWO NEAREST RANKS (same as pandas for an exact sketch)
+def sketch_quantile(sketch, q):
+    values, counts = sketch_values(sketch)
+    if counts.sum() == 0:
+        return np.nan
+
+    position = q * (counts.sum() - 1)
+    cumulative = np.cumsum(counts)
+    lower = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+    upper = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+    return lower + (upper - lower) * (position - np.floor(position))
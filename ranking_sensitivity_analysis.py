@@ -0,0 +1,44 @@
+"""
+Author: Vishaal Bharadwaj
+
+Description:
+The weights used for the pound for pound, striker and grappler rankings were picked by hand. Here we check how stable
+those top 10s are by re-ranking every fighter under thousands of random weight profiles (sampled uniformly from all
+weightings that sum to 1) and reporting how often each fighter makes the top 10 and how much their rank moves around.
+"""
+
+import os
+
+import helper
+import fighter_rankings
+import p4p_analysis
+import best_striker_analysis
+import best_grappler_analysis
+
+N_PROFILES = 10000
+TOP_K = 10
+
+def print_sweep(title, ufc_data, metrics, weights):
+    fighters, scaled_metrics = fighter_rankings.build_fighter_metric_matrix(ufc_data, metrics)
+    sweep_stats = fighter_rankings.weight_sensitivity_sweep(fighters, scaled_metrics, n_profiles=N_PROFILES, k=TOP_K, n_jobs=os.cpu_count())
+
+    # rank of every fighter under the hand-picked weights, to compare against
+    hand_picked_scores = fighter_rankings.score_weight_profiles(scaled_metrics, fighter_rankings.weight_profiles_to_matrix([weights], metrics))
+    sweep_stats['hand_picked_rank'] = fighter_rankings.rank_positions(hand_picked_scores)[sweep_stats.index, 0]
+
+    print(f"\n{title} - {N_PROFILES} random weight profiles")
+    print("Fighters most often in the top 10:")
+    print(sweep_stats.head(15))
+
+    print("How stable the hand-picked top 10 is:")
+    print(sweep_stats.sort_values(by='hand_picked_rank').head(TOP_K))
+
+def main():
+    ufc_data = helper.load_dataset('data_sets/preprocessed_data.csv')
+
+    print_sweep('Pound for pound', ufc_data, p4p_analysis.adjusted_relevant_columns, p4p_analysis.weights)
+    print_sweep('Striking', ufc_data, best_striker_analysis.striking_metrics, best_striker_analysis.weights_striking)
+    print_sweep('Grappling', ufc_data, best_grappler_analysis.grappling_metrics, best_grappler_analysis.weights_grappling)
+
+if __name__=='__main__':
+    main()
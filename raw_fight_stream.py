@@ -0,0 +1,104 @@
+"""
+Author: Jason Gill
+
+Description:
+This file is a streaming version of helper.fight_strike_stats_for_winners for raw fight exports too large to load at
+once. raw_total_fight_data.csv is read in chunks of a fixed number of rows and every chunk goes through a pipeline of
+generators: read -> remove draws -> fill missing numbers w/ the column medians -> parse the "X of Y" strings -> emit the
+winner's head/body/leg strikes. The medians need the whole file, so they come from a first pass that only updates a
+mergeable quantile sketch per column (quantile_sketch.py). Memory depends on the chunk size and the number of buckets,
+not on the number of fights
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+import numpy as np
+
+import helper
+import quantile_sketch
+
+CHUNK_ROWS = 50_000
+
+# ------------------------------------------------------------------------------------------
+
+# GENERATOR PIPELINE
+def read_raw_chunks(raw_total_fight_data_csv, chunk_rows=CHUNK_ROWS):
+    with pd.read_csv(raw_total_fight_data_csv, sep=';', chunksize=chunk_rows) as reader:
+        yield from reader
+
+def remove_draws(chunks):
+    for chunk in chunks:
+        yield chunk[~(chunk['Winner'] == 'Draw')]
+
+def fill_missing_with_medians(chunks, medians):
+    for chunk in chunks:
+        yield chunk.fillna(value={column: median for column, median in medians.items() if column in chunk.columns})
+
+def parse_chunks(chunks):
+    for chunk in chunks:
+        yield helper.parse_raw_fight_stats(chunk)
+
+def winner_strike_stat_chunks(chunks):
+    for chunk in chunks:
+        winner_is_red = (chunk['Winner'] == chunk['R_fighter']).to_numpy()
+        yield pd.DataFrame({
+            "Name": chunk['Winner'].to_numpy(),
+            "Head_strikes": np.where(winner_is_red, chunk['R_HEAD_landed'], chunk['B_HEAD_landed']),
+            "Body_strikes": np.where(winner_is_red, chunk['R_BODY_landed'], chunk['B_BODY_landed']),
+            "Leg_strikes": np.where(winner_is_red, chunk['R_LEG_landed'], chunk['B_LEG_landed']),
+            "Distance_strikes": np.where(winner_is_red, chunk['R_DISTANCE_landed'], chunk['B_DISTANCE_landed']),
+            "Clinch_strikes": np.where(winner_is_red, chunk['R_CLINCH_landed'], chunk['B_CLINCH_landed']),
+            "Ground_strikes": np.where(winner_is_red, chunk['R_GROUND_landed'], chunk['B_GROUND_landed']),
+        })
+
+# RETURN {column: MEDIAN} OF THE NUMERIC COLUMNS OF THE FIGHTS W/O DRAWS (first pass)
+# a column is only numeric if it is numeric in every chunk, like when the whole file is read at once
+def streamed_medians(raw_total_fight_data_csv, chunk_rows=CHUNK_ROWS):
+    sketches = {}
+    numeric_columns = None
+    for chunk in remove_draws(read_raw_chunks(raw_total_fight_data_csv, chunk_rows)):
+        chunk_numeric_columns = list(chunk.select_dtypes(include=['number']).columns)
+        numeric_columns = chunk_numeric_columns if numeric_columns is None else [column for column in numeric_columns if column in chunk_numeric_columns]
+        for column in chunk_numeric_columns:
+            sketches[column] = quantile_sketch.update_sketch(sketches.get(column, quantile_sketch.new_quantile_sketch()), chunk[column].to_numpy())
+
+    return {column: quantile_sketch.sketch_quantile(sketches[column], 0.5) for column in numeric_columns or []}
+
+# GENERATE DATAFRAMES W/ THE WINNER'S NAME AND HEAD/BODY/LEG (AND DISTANCE/CLINCH/GROUND) STRIKES OF EVERY FIGHT, ONE CHUNK AT A TIME (second pass)
+def stream_fight_strike_stats_for_winners(raw_total_fight_data_csv, chunk_rows=CHUNK_ROWS):
+    medians = streamed_medians(raw_total_fight_data_csv, chunk_rows)
+    chunks = read_raw_chunks(raw_total_fight_data_csv, chunk_rows)
+    yield from winner_strike_stat_chunks(parse_chunks(fill_missing_with_medians(remove_draws(chunks), medians)))
+
+# RETURN SAME DATAFRAME AS helper.fight_strike_stats_for_winners, READING THE RAW FILE IN CHUNKS
+def fight_strike_stats_for_winners(raw_total_fight_data_csv, chunk_rows=CHUNK_ROWS):
+    return pd.concat(stream_fight_strike_stats_for_winners(raw_total_fight_data_csv, chunk_rows), ignore_index=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream the winner strike stats out of the raw fight data in chunks')
+    parser.add_argument('--raw-csv', default='data_sets/raw_total_fight_data.csv')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--trace-memory', action='store_true', help='report the peak memory allocated (makes the run several times slower)')
+    args = parser.parse_args(argv)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    n_fights = 0
+    totals = np.zeros(3)
+    for chunk in stream_fight_strike_stats_for_winners(args.raw_csv, args.chunk_rows):
+        n_fights += len(chunk)
+        totals += chunk[['Head_strikes', 'Body_strikes', 'Leg_strikes']].sum().to_numpy()
+    seconds = time.perf_counter() - start
+
+    print(f"Streamed {n_fights} fights in {seconds:.2f}s")
+    if args.trace_memory:
+        print(f"Peak memory allocated: {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB")
+        tracemalloc.stop()
+    print(f"Average landed strikes of the winner: head {totals[0] / n_fights:.2f}, body {totals[1] / n_fights:.2f}, leg {totals[2] / n_fights:.2f}")
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Author: Jason Gill
+
+Description:
+This file contains the bootstrap and permutation engine used next to the scipy tests of the colour, stance, strike and
+takedown/knockdown analyses. The groups being compared are concatenated into one array and every replicate is a row of
+an index matrix into it: a permutation shuffles the whole row (the group sizes stay the same), a bootstrap redraws each
+group from itself. Statistics are computed for a whole chunk of rows at once w/ np.add.reduceat over the group
+boundaries, the chunks are spread over a process pool (run inline inside a worker of another pool, e.g. the analyses
+run concurrently by run_pipeline.py) and each chunk gets its own seed spawned from `seed`, so the
+result doesn't depend on the number of processes
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import rankdata
+
+N_REPLICATES = 10_000
+CHUNK_ELEMENTS = 2_000_000 # a chunk's index matrix holds about this many values (16 MB)
+
+# ------------------------------------------------------------------------------------------
+
+# STATISTICS
+# every statistic takes a (n_replicates, n_values) matrix of concatenated groups and the index where each group starts,
+# and returns one value per replicate
+def group_sizes(values, offsets):
+    return np.diff(np.append(offsets, values.shape[1]))
+
+def group_means(values, offsets):
+    return np.add.reduceat(values, offsets, axis=1) / group_sizes(values, offsets)
+
+def group_variances(values, offsets):
+    sizes = group_sizes(values, offsets)
+    means = group_means(values, offsets)
+    centered = values - np.repeat(means, sizes, axis=1)
+    return np.add.reduceat(centered ** 2, offsets, axis=1) / (sizes - 1)
+
+def mean_difference(values, offsets):
+    means = group_means(values, offsets)
+    return means[:, 0] - means[:, 1]
+
+# same as scipy's ttest_ind(equal_var=False)
+def welch_t(values, offsets):
+    sizes = group_sizes(values, offsets)
+    means = group_means(values, offsets)
+    variances = group_variances(values, offsets)
+    return (means[:, 0] - means[:, 1]) / np.sqrt(variances[:, 0] / sizes[0] + variances[:, 1] / sizes[1])
+
+# same as scipy's f_oneway
+def anova_f(values, offsets):
+    sizes = group_sizes(values, offsets)
+    means = group_means(values, offsets)
+    grand_means = values.mean(axis=1, keepdims=True)
+    between = (sizes * (means - grand_means) ** 2).sum(axis=1) / (len(sizes) - 1)
+    within = ((sizes - 1) * group_variances(values, offsets)).sum(axis=1) / (values.shape[1] - len(sizes))
+    return between / within
+
+# same as scipy's levene (center='median'): an ANOVA on every value's distance to its group median
+def levene_w(values, offsets):
+    sizes = group_sizes(values, offsets)
+    ends = np.append(offsets[1:], values.shape[1])
+    medians = np.column_stack([np.median(values[:, start:end], axis=1) for start, end in zip(offsets, ends)])
+    return anova_f(np.abs(values - np.repeat(medians, sizes, axis=1)), offsets)
+
+# Kruskal-Wallis H w/o the tie correction, for values that are already ranks. Permuting doesn't change which values are
+# tied, so the correction is the same for every permutation and the permutation p-value is the same w/ or w/o it
+def rank_h(ranks, offsets):
+    sizes = group_sizes(ranks, offsets)
+    n_values = ranks.shape[1]
+    rank_sums = np.add.reduceat(ranks, offsets, axis=1)
+    return 12 / (n_values * (n_values + 1)) * (rank_sums ** 2 / sizes).sum(axis=1) - 3 * (n_values + 1)
+
+# ------------------------------------------------------------------------------------------
+
+# RESAMPLING ENGINE
+def concatenate_groups(groups):
+    groups = [np.asarray(group, dtype=float) for group in groups]
+    sizes = np.array([len(group) for group in groups])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    return np.concatenate(groups), offsets, sizes
+
+# RETURN STATISTIC OF n_replicates PERMUTED OR BOOTSTRAPPED COPIES OF THE CONCATENATED GROUPS
+def resample_chunk(kind, values, offsets, statistic, n_replicates, seed):
+    rng = np.random.default_rng(seed)
+    n_values = len(values)
+
+    if kind == 'permutation':
+        index = rng.permuted(np.tile(np.arange(n_values), (n_replicates, 1)), axis=1) # every row shuffled on its own
+    else:
+        # each position draws uniformly from its own group: group start + floor(u * group size)
+        sizes = np.diff(np.append(offsets, n_values))
+        group_starts = np.repeat(offsets, sizes)
+        index = group_starts + (rng.random((n_replicates, n_values)) * np.repeat(sizes, sizes)).astype(np.int64)
+
+    return statistic(values[index], offsets)
+
+def resample(kind, values, offsets, statistic, n_replicates, seed, n_jobs):
+    chunk_size = max(1, CHUNK_ELEMENTS // len(values))
+    chunk_sizes = [chunk_size] * (n_replicates // chunk_size)
+    if n_replicates % chunk_size:
+        chunk_sizes.append(n_replicates % chunk_size)
+    chunk_seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    if n_jobs is None:
+        n_jobs = min(os.cpu_count(), len(chunk_sizes))
+    if multiprocessing.parent_process() is not None:
+        n_jobs = 1 # already a worker of a pool that keeps the CPUs busy (like plot_rendering.render_plots)
+    if n_jobs == 1:
+        replicates = [resample_chunk(kind, values, offsets, statistic, size, chunk_seed) for size, chunk_seed in zip(chunk_sizes, chunk_seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(resample_chunk, kind, values, offsets, statistic, size, chunk_seed) for size, chunk_seed in zip(chunk_sizes, chunk_seeds)]
+            replicates = [future.result() for future in futures]
+
+    return np.concatenate(replicates)
+
+# RETURN DICT W/ THE OBSERVED STATISTIC AND ITS PERMUTATION P-VALUE
+# alternative='greater' for statistics where large values are extreme (F, H, W), 'two-sided' compares absolute values (t, mean difference)
+def permutation_test(groups, statistic, alternative='greater', n_replicates=N_REPLICATES, seed=0, n_jobs=None):
+    values, offsets, _ = concatenate_groups(groups)
+    observed = statistic(values[None, :], offsets)[0]
+    replicates = resample('permutation', values, offsets, statistic, n_replicates, seed, n_jobs)
+
+    if alternative == 'two-sided':
+        extreme = np.abs(replicates) >= np.abs(observed) * (1 - 1e-12)
+    else:
+        extreme = replicates >= observed * (1 - 1e-12) # tolerance so replicates equal to the observed value count despite rounding
+    # the observed arrangement counts as one of the permutations, so the p-value is never 0
+    return {'statistic': observed, 'pvalue': (1 + extreme.sum()) / (1 + n_replicates), 'n_replicates': n_replicates}
+
+# RETURN DICT W/ THE OBSERVED STATISTIC, ITS BOOTSTRAP STANDARD ERROR AND PERCENTILE CONFIDENCE INTERVAL
+# statistics returning one value per group (e.g. group_means) give one interval per group
+def bootstrap_confidence_interval(groups, statistic, confidence=0.95, n_replicates=N_REPLICATES, seed=0, n_jobs=None):
+    values, offsets, _ = concatenate_groups(groups)
+    observed = statistic(values[None, :], offsets)[0]
+    replicates = resample('bootstrap', values, offsets, statistic, n_replicates, seed, n_jobs)
+
+    tail = (1 - confidence) / 2 * 100
+    return {
+        'statistic': observed,
+        'std_error': replicates.std(axis=0, ddof=1),
+        'ci_low': np.percentile(replicates, tail, axis=0),
+        'ci_high': np.percentile(replicates, 100 - tail, axis=0),
+        'n_replicates': n_replicates,
+    }
+
+# RETURN PERMUTATION TEST OF THE KRUSKAL-WALLIS H - the values are ranked once and only the ranks are permuted
+def kruskal_permutation_test(groups, n_replicates=N_REPLICATES, seed=0, n_jobs=None):
+    values, offsets, sizes = concatenate_groups(groups)
+    ranks = rankdata(values)
+    ranked_groups = np.split(ranks, np.cumsum(sizes)[:-1])
+    result = permutation_test(ranked_groups, rank_h, 'greater', n_replicates, seed, n_jobs)
+
+    tie_counts = np.unique(values, return_counts=True)[1]
+    result['statistic'] /= 1 - (tie_counts ** 3 - tie_counts).sum() / (len(values) ** 3 - len(values)) # report the same H as scipy's kruskal
+    return result
@@ -0,0 +1,146 @@
+"""
+Author: Jason Gill
+
+Description:
+This file runs the whole project (preprocessing, then every analysis/predictor from the README) in a single process.
+The datasets are loaded once before the analyses start, so every analysis shares the same in-memory copy, and the
+independent analyses run concurrently in a process pool. Per-stage timings are written to `data_sets/pipeline_timings.csv`
+"""
+
+import matplotlib
+matplotlib.use('Agg') # plots are only saved to files, never shown
+
+import argparse
+import contextlib
+import importlib
+import inspect
+import io
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import matplotlib.pyplot as plt
+
+import helper
+import plot_rendering
+
+PREPROCESSING_STAGES = ['preprocessing_data', 'preprocessing_fighter_details', 'fighter_index']
+
+# these don't depend on each other (see "Order of Execution" in the README)
+ANALYSIS_STAGES = [
+    'colour_win_analysis',
+    'effective_strikes_analysis',
+    'stance_analysis',
+    'p4p_analysis',
+    'best_grappler_analysis',
+    'best_striker_analysis',
+    'takedown_knockdown_analysis',
+    'strikeAcc_by_weight_analysis',
+    'finishes_by_weight_analysis',
+    'fight_result_predictor',
+    'win_ratio_predictor',
+]
+
+SHARED_DATASETS = [
+    ('data_sets/preprocessed_data.csv', ','),
+    ('data_sets/preprocessed_fighter_details.csv', ','),
+    ('data_sets/raw_total_fight_data.csv', ';'),
+]
+
+TIMINGS_CSV = 'data_sets/pipeline_timings.csv'
+
+def run_stage(stage):
+    # the stage's prints are captured so concurrent stages don't interleave their output
+    output = io.StringIO()
+    status = 'ok'
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(output):
+        try:
+            stage_main = importlib.import_module(stage).main
+            if 'argv' in inspect.signature(stage_main).parameters:
+                stage_main([]) # the stage's own options keep their defaults instead of parsing run_pipeline's arguments
+            else:
+                stage_main()
+        except Exception:
+            status = 'failed'
+            output.write(traceback.format_exc())
+        finally:
+            plt.close('all')
+
+    return stage, status, time.perf_counter() - start, output.getvalue()
+
+def print_stage_result(stage, status, seconds, output):
+    print(f"==================== {stage} ({status}, {seconds:.2f}s) ====================")
+    print(output)
+
+def preload_shared_datasets():
+    for csv_path, sep in SHARED_DATASETS:
+        if os.path.exists(csv_path):
+            helper.load_dataset(csv_path, sep=sep)
+
+def run_analyses(n_jobs):
+    if n_jobs == 1:
+        return [run_stage(stage) for stage in ANALYSIS_STAGES]
+
+    # with fork the workers inherit the already imported modules and loaded datasets instead of redoing that work
+    mp_context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context('fork')
+
+    results = []
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp_context) as executor:
+        futures = [executor.submit(run_stage, stage) for stage in ANALYSIS_STAGES]
+        for future in as_completed(futures):
+            results.append(future.result())
+            print_stage_result(*results[-1])
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the preprocessing and every analysis in one process')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='number of analyses to run at the same time (1 runs them in order)')
+    parser.add_argument('--skip-preprocessing', action='store_true', help='reuse the preprocessed datasets already in data_sets')
+    parser.add_argument('--compact', action='store_true', help='load the datasets w/ smaller dtypes (float32, int8/16, category) where no values are lost')
+    parser.add_argument('--force-plots', action='store_true', help='render every plot again, even the ones whose data hasn\'t changed')
+    args = parser.parse_args()
+    helper.COMPACT_DATASETS = args.compact
+    plot_rendering.FORCE_RENDER = args.force_plots
+
+    helper.create_folder('data_sets')
+    helper.create_folder('plots')
+
+    timings = []
+    pipeline_start = time.perf_counter()
+
+    if not args.skip_preprocessing:
+        for stage in PREPROCESSING_STAGES: # the analyses read what these write, so they run first and in order
+            result = run_stage(stage)
+            print_stage_result(*result)
+            timings.append(result[:3])
+
+    # importing every analysis and loading the data up front means it is only paid for once
+    start = time.perf_counter()
+    for stage in ANALYSIS_STAGES:
+        importlib.import_module(stage)
+    preload_shared_datasets()
+    timings.append(('import_and_load_datasets', 'ok', time.perf_counter() - start))
+    if args.compact:
+        print(helper.memory_usage_report().to_string(float_format='{:.2f}'.format))
+
+    results = run_analyses(args.jobs)
+    if args.jobs == 1:
+        for result in results:
+            print_stage_result(*result)
+    timings.extend(result[:3] for result in results)
+
+    timings.append(('total', 'ok', time.perf_counter() - pipeline_start))
+    timings_df = pd.DataFrame(timings, columns=['stage', 'status', 'seconds'])
+    timings_df.to_csv(TIMINGS_CSV, index=False)
+
+    print(timings_df.to_string(index=False))
+
+if __name__=='__main__':
+    main()
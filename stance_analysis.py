@@ -10,9 +10,10 @@ to compare the differences between how effective each stance type is compared to
 import pandas as pd
 import numpy as np
 from scipy import stats
-import pingouin as pg
 
 import helper
+import posthoc
+import resampling
 
 def get_unique_stances(stance_data):
     return stance_data['R_Stance'].unique() # B_Stance contains the same values
@@ -61,14 +62,22 @@ def main():
     print("Levene p-value:", levene_result.pvalue)
     print("Anova p-value:", anova_result.pvalue)
 
-    stance_win_ratios = pd.concat([orthodox, southpaw, switch], axis=1, keys=['orthodox', 'southpaw', 'switch'])    
-    melted_df = stance_win_ratios.melt().dropna()
+    # same comparisons w/o the normality assumption: permute the stance labels and bootstrap each stance's mean
+    stance_groups = [orthodox, southpaw, switch]
+    levene_permutation = resampling.permutation_test(stance_groups, resampling.levene_w)
+    anova_permutation = resampling.permutation_test(stance_groups, resampling.anova_f)
+    mean_ci = resampling.bootstrap_confidence_interval(stance_groups, resampling.group_means)
+
+    print("Permutation Levene p-value:", levene_permutation['pvalue'])
+    print("Permutation Anova p-value:", anova_permutation['pvalue'])
+    for stance, mean, low, high in zip(['orthodox', 'southpaw', 'switch'], mean_ci['statistic'], mean_ci['ci_low'], mean_ci['ci_high']):
+        print(f"Bootstrap 95% CI of mean sqrt(win ratio), {stance}: {mean:.4f} [{low:.4f}, {high:.4f}]")
 
     # games-howell handles unequal sample sizes much better than tukey
     # http://bayes.acs.unt.edu:8083/BayesContent/class/Jon/ISSS_SC/Module009/isss_m91_onewayanova/node7.html
-    posthoc = pg.pairwise_gameshowell(data=melted_df, dv='value', between='variable')
+    posthoc_result = posthoc.pairwise_gameshowell_from_groups({'orthodox': orthodox, 'southpaw': southpaw, 'switch': switch})
 
-    print(posthoc)
+    print(posthoc_result)
 
 if __name__=='__main__':
     main()
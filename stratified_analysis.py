@@ -0,0 +1,278 @@
+"""
+Author: Jason Gill
+
+Description:
+This file runs the Levene, Kruskal-Wallis, chi-square and Games-Howell tests of the weight class analyses separately
+for every stratum (e.g. every year, every Format, or every year x Format) in one pass. The data is grouped once by
+(strata..., group) and sorted, then the sufficient statistics of every test (group sizes, medians, absolute deviations,
+within-stratum ranks and tie counts, contingency table margins) are computed for all strata together w/ np.bincount,
+so adding strata doesn't mean filtering the whole dataset again for each one. Every statistic matches scipy's
+levene (center='median'), kruskal and chi2_contingency run on each stratum by itself
+"""
+
+import argparse
+
+import pandas as pd
+import numpy as np
+from scipy.stats import chi2, f
+
+import helper
+import posthoc
+
+STRATA_COLUMNS = ['weight_class', 'year', 'Format', 'location']
+FINISH_TYPES = ['Decision_Split', 'Decision_Unanimous', 'KO/TKO', 'Submission', 'TKO_Doctor_Stoppage']
+RAW_FIGHT_DATA_CSV = 'data_sets/raw_total_fight_data.csv'
+
+# ------------------------------------------------------------------------------------------
+
+# DATA PREPARATION
+# RETURN df W/ EVERY COLUMN OF `by` AVAILABLE: 'year' comes from the date, columns only in the raw fight data (e.g. Format)
+# are joined on the fighters and date
+def add_strata_columns(df, by):
+    df = df.copy()
+    if 'year' in by and 'year' not in df.columns:
+        df['year'] = pd.to_datetime(df['date']).dt.year
+
+    missing = [column for column in by if column not in df.columns]
+    if missing:
+        raw = helper.load_dataset(RAW_FIGHT_DATA_CSV, sep=';')
+        raw = raw[['R_fighter', 'B_fighter', 'date'] + missing].copy()
+        raw['date'] = pd.to_datetime(raw['date'])
+        raw = raw.drop_duplicates(subset=['R_fighter', 'B_fighter', 'date'])
+
+        df['fight_date'] = pd.to_datetime(df['date'])
+        df = df.merge(raw.rename(columns={'date': 'fight_date'}), on=['R_fighter', 'B_fighter', 'fight_date'], how='left')
+        df = df.drop(columns='fight_date')
+    return df
+
+# RETURN LONG DATAFRAME W/ ONE ROW PER FIGHTER PER FIGHT: R_<stat> AND B_<stat> BECOME <stat>
+# (all red corner rows come first, then all blue corner rows, both in the original order)
+def corner_values(df, stats, keep_columns):
+    corners = []
+    for corner in ['R', 'B']:
+        corner_df = df[keep_columns + [f'{corner}_{stat}' for stat in stats]]
+        corners.append(corner_df.set_axis(keep_columns + list(stats), axis=1))
+    return pd.concat(corners, ignore_index=True)
+
+# RETURN PERMUTATION SORTING BY codes, THEN BY value (value_order sorts the values, stable sorts of small integer codes
+# are radix sorts, so this is much faster than np.lexsort)
+def sort_by_codes(codes, value_order):
+    codes = codes.astype(np.min_scalar_type(codes.max()))
+    return value_order[np.argsort(codes[value_order], kind='stable')]
+
+# RETURN DICT W/ THE VALUES OF `value` SORTED BY (stratum, group, value) AND THE CODES/KEYS OF THEIR GROUPS AND STRATA
+# this is the only groupby, every test below works from its arrays
+def group_once(data, value, between, by):
+    data = data[by + [between, value]].dropna()
+    grouping = data.groupby(by + [between], observed=True, sort=True)
+    group_keys = grouping.size().index
+    group_of_row = grouping.ngroup().to_numpy()
+
+    # the groups are sorted by their strata first, so every stratum's groups are contiguous
+    strata_keys = group_keys.droplevel(-1)
+    stratum_of_group, strata = pd.factorize(strata_keys)
+
+    values = data[value].to_numpy(dtype=float)
+    value_order = np.argsort(values, kind='stable')
+    order = sort_by_codes(group_of_row, value_order)
+
+    # the ranks of the Kruskal-Wallis test need the values sorted by (stratum, value) as well
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    stratum_order = position[sort_by_codes(stratum_of_group[group_of_row], value_order)]
+
+    return {
+        'values': values[order],
+        'group': group_of_row[order],
+        'stratum': stratum_of_group[group_of_row[order]],
+        'stratum_order': stratum_order,
+        'stratum_of_group': stratum_of_group,
+        'group_labels': group_keys.get_level_values(-1),
+        'strata': strata,
+        'by': by,
+    }
+
+# RETURN DATAFRAME W/ ONE ROW PER STRATUM, INDEXED BY THE STRATUM COLUMNS
+def strata_frame(groups, columns):
+    index = groups['strata']
+    if not isinstance(index, pd.MultiIndex):
+        index = pd.Index(index, name=groups['by'][0])
+    else:
+        index = index.set_names(groups['by'])
+    return pd.DataFrame(columns, index=index)
+
+# ------------------------------------------------------------------------------------------
+
+# SUFFICIENT STATISTICS
+def group_counts(groups):
+    return np.bincount(groups['group'], minlength=len(groups['stratum_of_group']))
+
+def stratum_counts(groups):
+    return np.bincount(groups['stratum'], minlength=len(groups['strata']))
+
+def groups_per_stratum(groups):
+    return np.bincount(groups['stratum_of_group'], minlength=len(groups['strata']))
+
+# RETURN MEDIAN OF EVERY GROUP (the values are sorted within each group)
+def group_medians(groups):
+    n = group_counts(groups)
+    starts = np.concatenate([[0], np.cumsum(n)[:-1]])
+    return (groups['values'][starts + (n - 1) // 2] + groups['values'][starts + n // 2]) / 2
+
+# RETURN RANK OF EVERY VALUE WITHIN ITS STRATUM (ties get their average rank) AND EACH STRATUM'S sum(t^3 - t) OVER TIES
+def stratum_ranks(groups):
+    order = groups['stratum_order']
+    values = groups['values'][order]
+    stratum = groups['stratum'][order]
+
+    n = stratum_counts(groups)
+    stratum_starts = np.concatenate([[0], np.cumsum(n)[:-1]])
+    positions = np.arange(1, len(values) + 1) - stratum_starts[stratum]
+
+    # a run of ties starts wherever the stratum or the value changes
+    new_run = np.ones(len(values), dtype=bool)
+    new_run[1:] = (stratum[1:] != stratum[:-1]) | (values[1:] != values[:-1])
+    run = np.cumsum(new_run) - 1
+    run_sizes = np.bincount(run)
+    run_ranks = np.bincount(run, weights=positions) / run_sizes
+
+    ranks = np.empty(len(values))
+    ranks[order] = run_ranks[run]
+    ties = np.bincount(stratum[new_run], weights=run_sizes.astype(float) ** 3 - run_sizes, minlength=len(n))
+    return ranks, ties
+
+# ------------------------------------------------------------------------------------------
+
+# TESTS
+# RETURN (W, pvalue) OF LEVENE'S TEST (center='median') IN EVERY STRATUM: a one-way ANOVA on the absolute deviations
+def stratified_levene(groups):
+    n_group = group_counts(groups)
+    n_stratum = stratum_counts(groups)
+    k = groups_per_stratum(groups)
+
+    deviations = np.abs(groups['values'] - group_medians(groups)[groups['group']])
+    group_mean = np.bincount(groups['group'], weights=deviations, minlength=len(n_group)) / n_group
+    stratum_mean = np.bincount(groups['stratum'], weights=deviations, minlength=len(n_stratum)) / n_stratum
+
+    between = np.bincount(groups['stratum_of_group'], weights=n_group * (group_mean - stratum_mean[groups['stratum_of_group']]) ** 2, minlength=len(k))
+    within = np.bincount(groups['stratum'], weights=(deviations - group_mean[groups['group']]) ** 2, minlength=len(k))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        W = (n_stratum - k) / (k - 1) * between / within
+        pvalue = f.sf(W, k - 1, n_stratum - k)
+    return np.where(k > 1, W, np.nan), np.where(k > 1, pvalue, np.nan)
+
+# RETURN (H, pvalue) OF THE KRUSKAL-WALLIS TEST (tie corrected) IN EVERY STRATUM
+def stratified_kruskal(groups):
+    n_group = group_counts(groups)
+    n_stratum = stratum_counts(groups)
+    k = groups_per_stratum(groups)
+
+    ranks, ties = stratum_ranks(groups)
+    rank_sums = np.bincount(groups['group'], weights=ranks, minlength=len(n_group))
+    mean_square_ranks = np.bincount(groups['stratum_of_group'], weights=rank_sums ** 2 / n_group, minlength=len(k))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        H = 12 / (n_stratum * (n_stratum + 1)) * mean_square_ranks - 3 * (n_stratum + 1)
+        H /= 1 - ties / (n_stratum.astype(float) ** 3 - n_stratum)
+        pvalue = chi2.sf(H, k - 1)
+    return np.where(k > 1, H, np.nan), np.where(k > 1, pvalue, np.nan)
+
+# RETURN DATAFRAME W/ THE SIZE, LEVENE AND KRUSKAL-WALLIS RESULTS OF EVERY STRATUM
+def stratified_tests(data, value, between, by):
+    groups = group_once(data, value, between, by)
+    levene_W, levene_pvalue = stratified_levene(groups)
+    kruskal_H, kruskal_pvalue = stratified_kruskal(groups)
+    return strata_frame(groups, {
+        'groups': groups_per_stratum(groups),
+        'n': stratum_counts(groups),
+        'levene_W': levene_W,
+        'levene_pvalue': levene_pvalue,
+        'kruskal_H': kruskal_H,
+        'kruskal_pvalue': kruskal_pvalue,
+    })
+
+# RETURN GAMES-HOWELL TABLE OF EVERY PAIR OF GROUPS WITHIN EVERY STRATUM
+def stratified_games_howell(data, value, between, by):
+    groups = group_once(data, value, between, by)
+    n = group_counts(groups)
+    total = np.bincount(groups['group'], weights=groups['values'], minlength=len(n))
+    mean = total / n
+    squares = np.bincount(groups['group'], weights=(groups['values'] - mean[groups['group']]) ** 2, minlength=len(n))
+
+    summary = pd.DataFrame({'n': n, 'mean': mean, 'var': squares / (n - 1)},
+                           index=pd.MultiIndex.from_arrays([groups['stratum_of_group'], groups['group_labels']], names=['stratum', between]))
+    with np.errstate(divide='ignore', invalid='ignore'): # groups whose values are all the same give NaN, like pingouin
+        table = posthoc.games_howell_stratified(summary)
+
+    # replace the stratum codes w/ the stratum columns
+    strata = strata_frame(groups, {}).index.to_frame(index=False).iloc[table['stratum'].to_numpy()].reset_index(drop=True)
+    return pd.concat([strata, table.drop(columns='stratum').reset_index(drop=True)], axis=1)
+
+# RETURN DATAFRAME W/ THE CHI-SQUARE TEST OF INDEPENDENCE (same as chi2_contingency) BETWEEN `between` AND THE COUNT
+# COLUMNS IN EVERY STRATUM, e.g. finish types x weight class per year
+def stratified_chi_square(data, count_columns, between, by):
+    table = data.groupby(by + [between], observed=True, sort=True)[count_columns].sum()
+    strata_keys = table.index.droplevel(-1)
+    stratum_of_row, strata = pd.factorize(strata_keys)
+
+    observed = table.to_numpy(dtype=float)
+    row_totals = observed.sum(axis=1)
+    column_totals = np.zeros((len(strata), len(count_columns)))
+    np.add.at(column_totals, stratum_of_row, observed)
+    totals = column_totals.sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = row_totals[:, None] * column_totals[stratum_of_row] / totals[stratum_of_row, None]
+
+    # rows/columns w/o any counts don't count towards the degrees of freedom
+    nonzero_rows = np.bincount(stratum_of_row, weights=row_totals > 0, minlength=len(strata))
+    dof = (nonzero_rows - 1) * ((column_totals > 0).sum(axis=1) - 1)
+
+    # Yates' correction for 2x2 tables, like chi2_contingency
+    difference = expected - observed
+    correction = np.where(dof[stratum_of_row, None] == 1, np.sign(difference) * np.minimum(0.5, np.abs(difference)), 0)
+    corrected = observed + correction
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cells = np.where(expected > 0, (corrected - expected) ** 2 / expected, 0)
+    statistic = np.bincount(stratum_of_row, weights=cells.sum(axis=1), minlength=len(strata))
+
+    with np.errstate(invalid='ignore'):
+        pvalue = chi2.sf(statistic, dof)
+    groups = {'strata': strata, 'by': by}
+    return strata_frame(groups, {
+        'n': totals,
+        'dof': dof,
+        'chi2': np.where(dof > 0, statistic, np.nan),
+        'pvalue': np.where(dof > 0, pvalue, np.nan),
+    })
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the weight class tests separately for every stratum')
+    parser.add_argument('--by', nargs='+', default=['year'], help=f"columns to stratify by, e.g. {' '.join(STRATA_COLUMNS)}")
+    parser.add_argument('--between', default='weight_class', help='groups compared within each stratum')
+    parser.add_argument('--stat', default='avg_TD_pct', help='fighter statistic compared (R_/B_ prefixes are combined)')
+    args = parser.parse_args(argv)
+
+    data = add_strata_columns(helper.load_dataset('data_sets/preprocessed_data.csv'), args.by + [args.between])
+    fighters = corner_values(data, [args.stat], args.by + [args.between])
+
+    pd.set_option('display.width', 200)
+    print(f"Levene and Kruskal-Wallis tests of {args.stat} across {args.between}, by {' x '.join(args.by)}:")
+    print(stratified_tests(fighters, args.stat, args.between, args.by).to_string())
+
+    games_howell = stratified_games_howell(fighters, args.stat, args.between, args.by)
+    print(f"\nGames-Howell: {(games_howell['pval'] < 0.05).sum()} of {len(games_howell)} pairs differ significantly (p < 0.05)")
+    print(games_howell[games_howell['pval'] < 0.05].to_string(index=False))
+
+    fights = data.copy()
+    finishes = []
+    for finish in FINISH_TYPES:
+        fights[f'Total_win_by_{finish}'] = fights[f'R_win_by_{finish}'] + fights[f'B_win_by_{finish}']
+        finishes.append(f'Total_win_by_{finish}')
+    print(f"\nChi-square test of finish types x {args.between}, by {' x '.join(args.by)}:")
+    print(stratified_chi_square(fights, finishes, args.between, args.by).to_string())
+
+if __name__=='__main__':
+    main()
@@ -6,40 +6,82 @@ Our goal in this part of the project is to develop an ML model that is able to p
 given their fight statistics and information about their build (height, reach, etc.) 
 """
 
-import pandas as pd
+import argparse
+
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import make_pipeline
-from sklearn.preprocessing import MinMaxScaler
 from sklearn.neighbors import KNeighborsRegressor
 
+import fighter_index
 import helper
+import model_artifacts
+
+MODEL_NAME = 'win_ratio_predictor'
+DEFAULT_KNN_CONFIG = {'k': 5, 'weights': 'uniform', 'scaler': 'minmax'} # used until knn_search.py has saved a cross-validated one
+
+# PRINT THE PREDICTED WIN RATIO OF EVERY FIGHTER IN A CSV (same columns as preprocessed_fighter_details.csv)
+def predict_win_ratios(fighters_csv):
+    fighters_df = helper.load_dataset(fighters_csv, cache=False)
+    predictions = fighters_df[['fighter_name']].copy()
+    predictions['predicted_win_ratio'] = model_artifacts.predict_with_artifact(MODEL_NAME, fighters_df)
+    print(predictions.to_string(index=False))
+
+# RETURN (FEATURE DATAFRAME, WIN RATIOS) USED TO TRAIN THE MODEL
+def load_training_data():
+    fighter_win_loss = helper.fighter_win_loss_stats('data_sets/preprocessed_data.csv')
+    fighter_win_loss = fighter_index.add_fighter_ids(fighter_win_loss, {'Name': 'fighter_id'})
 
-def main():
-    fighter_win_ratios = helper.fighter_win_loss_stats('data_sets/preprocessed_data.csv')[['Name', 'Win_ratio']] # remove no. of wins and losses - only extract win ratio
+    # add up the wins/losses of every spelling of a fighter, then only keep the win ratio
+    fighter_win_ratios = fighter_win_loss.groupby('fighter_id', sort=False)[['Win_count', 'Lose_count']].sum().reset_index()
+    fighter_win_ratios['Win_ratio'] = fighter_win_ratios['Win_count'] / (fighter_win_ratios['Win_count'] + fighter_win_ratios['Lose_count'])
+    fighter_win_ratios = fighter_win_ratios[['fighter_id', 'Win_ratio']]
     # print(fighter_win_ratios)
 
-    fighters_df = pd.read_csv('data_sets/preprocessed_fighter_details.csv')
+    fighters_df = helper.load_dataset('data_sets/preprocessed_fighter_details.csv')
     fighters_df = fighters_df.drop(columns=['Stance', 'DOB'])
-    fighters_df = fighters_df.rename(columns={'fighter_name': 'Name'})
+    fighters_df = fighter_index.add_fighter_ids(fighters_df, {'fighter_name': 'fighter_id'})
     # print(fighter_df)
 
-    full_fighter_details = fighters_df.merge(fighter_win_ratios, on='Name')
+    # joined on the integer IDs, so a fighter spelled differently in the two datasets isn't dropped
+    full_fighter_details = fighters_df.merge(fighter_win_ratios, on='fighter_id')
     # print(full_fighter_details)
 
-    y = full_fighter_details['Win_ratio'].values
+    y = full_fighter_details['Win_ratio'].to_numpy()
 
-    stat_columns = full_fighter_details.select_dtypes(include=['number'])
-    X = stat_columns.values
+    # the win ratio is what we predict, so it can't also be a feature (and neither can the ID)
+    stat_columns = full_fighter_details.drop(columns=['Win_ratio', 'fighter_id']).select_dtypes(include=['number'])
+    return stat_columns, y
+
+# FIT THE MODEL ON THE PREPROCESSED FIGHTERS, PRINT ITS SCORE, PLOT IT AND SAVE IT AS THE NEXT ARTIFACT VERSION
+def train():
+    stat_columns, y = load_training_data()
+    X = stat_columns.to_numpy()
 
     X_train, X_valid, y_train, y_valid = train_test_split(X, y)
 
-    model = make_pipeline(MinMaxScaler(), KNeighborsRegressor(n_neighbors=5)) # 5 seems to give best results
+    knn_config = model_artifacts.load_knn_config(MODEL_NAME, DEFAULT_KNN_CONFIG)
+    model = make_pipeline(model_artifacts.KNN_SCALERS[knn_config['scaler']](), KNeighborsRegressor(n_neighbors=knn_config['k'], weights=knn_config['weights']))
     model.fit(X_train, y_train)
-    print('Model R-squared (R^2) Score:', model.score(X_valid, y_valid))
+    validation_score = model.score(X_valid, y_valid)
+    print(f"KNN w/ k={knn_config['k']}, weights={knn_config['weights']}, scaler={knn_config['scaler']}")
+    print('Model R-squared (R^2) Score:', validation_score)
 
     y_pred = model.predict(X_valid)
     
     helper.plot_win_ratio_predictor(X_valid, y_valid, y_pred)
 
+    artifact = model_artifacts.save_model_artifact(MODEL_NAME, model, stat_columns.columns, knn_config=knn_config, validation_score=validation_score, n_train_rows=len(X_train))
+    print(f"Saved {MODEL_NAME} version {artifact['version']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict a fighter's win ratio from their statistics and build")
+    parser.add_argument('--predict', metavar='CSV', help='score the fighters in CSV w/ the latest saved model instead of training')
+    args = parser.parse_args(argv)
+
+    if args.predict:
+        predict_win_ratios(args.predict)
+    else:
+        train()
+
 if __name__=='__main__':
     main()